@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from context_engineering.context.batch import role_codes, select_many
+from context_engineering.context.budget import Budget
+from context_engineering.context.packer import _priority_selection, _recency_indices
+from context_engineering.types import Message
+
+ROLES = ["user", "assistant", "tool", "assistant", "user", "developer"]
+
+
+def build_conversations(n_conv: int, length: int, seed: int = 0) -> list[list[Message]]:
+    rng = random.Random(seed)
+    convs = []
+    for _ in range(n_conv):
+        msgs = [Message(role="system", content="SYSTEM: policy must always remain.")]
+        msgs.extend(
+            Message(role=rng.choice(ROLES), content="x" * rng.randint(20, 400))
+            for _ in range(rng.randint(length // 2, length))
+        )
+        convs.append(msgs)
+    return convs
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="select_many vs a per-conversation loop over arrays.")
+    ap.add_argument("--conversations", type=int, default=5_000, help="Number of conversations.")
+    ap.add_argument("--length", type=int, default=200, help="Max messages per conversation.")
+    ap.add_argument("--max-chars", type=int, default=8_000, help="Budget per conversation.")
+    args = ap.parse_args()
+
+    convs = build_conversations(args.conversations, args.length)
+    n = len(convs)
+    budget = Budget(max_chars=args.max_chars)
+    print(f"{n} conversations, {sum(len(c) for c in convs)} messages (conversations/second)")
+
+    # Sizes and roles already extracted, as a columnar store would hold them.
+    roles = [[m.role for m in c] for c in convs]
+    sizes = [budget.sizes(c) for c in convs]
+    flat_sizes = np.array([s for c in sizes for s in c], dtype=np.int64)
+    flat_codes = role_codes(r for c in roles for r in c)
+    lengths = np.array([len(c) for c in convs], dtype=np.int64)
+
+    print(f"{'policy':>10} {'loop':>10} {'select_many':>12} {'speedup':>8}")
+    for policy, core in (("recency", _recency_indices), ("priority", _priority_selection)):
+        _, t_loop = timed(
+            lambda core=core: [core(r, s, budget.limit) for r, s in zip(roles, sizes)]
+        )
+        _, t_sel = timed(
+            lambda policy=policy: select_many(
+                flat_sizes, flat_codes, lengths, budget.limit, policy=policy
+            )
+        )
+        print(f"{policy:>10} {n / t_loop:>10.0f} {n / t_sel:>12.0f} {t_loop / t_sel:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+
+from context_engineering.context.bm25 import BM25Index
+from context_engineering.context.retrieval_bundle import RetrievedChunk
+
+
+def make_corpus(n: int, vocab: int = 50_000, seed: int = 0) -> list[RetrievedChunk]:
+    """Chunks of 20-60 words with a Zipf-like word distribution."""
+
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(vocab)]
+    weights = [1 / (i + 1) for i in range(vocab)]
+    pool = rng.choices(words, weights=weights, k=n * 40)
+    chunks = []
+    pos = 0
+    for i in range(n):
+        k = rng.randint(20, 60)
+        chunks.append(RetrievedChunk(chunk_id=f"doc{i}", text=" ".join(pool[pos : pos + k])))
+        pos = (pos + k) % (len(pool) - 60)
+    return chunks
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="BM25 index build, load and query latency.")
+    ap.add_argument("--chunks", type=int, default=1_000_000)
+    ap.add_argument("--queries", type=int, default=1_000)
+    ap.add_argument("--k", type=int, default=10)
+    args = ap.parse_args()
+
+    chunks = make_corpus(args.chunks)
+    t0 = time.perf_counter()
+    index = BM25Index.build(chunks)
+    t_build = time.perf_counter() - t0
+    del chunks
+
+    rng = random.Random(1)
+    # Queries mix rarer and mid-frequency terms, like keyword searches do.
+    queries = [
+        " ".join(f"w{rng.randint(50, 50_000 - 1)}" for _ in range(rng.randint(2, 4)))
+        for _ in range(args.queries)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        index.save(tmp)
+        t0 = time.perf_counter()
+        loaded = BM25Index.load(tmp)
+        t_load = time.perf_counter() - t0
+
+        loaded.top_k(queries[0], args.k)  # first query allocates the score buffer
+        latencies = []
+        for q in queries:
+            t0 = time.perf_counter()
+            loaded.top_k(q, args.k)
+            latencies.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        for q in queries[:100]:
+            loaded.search(q, k=args.k)
+        t_search = (time.perf_counter() - t0) / min(100, len(queries))
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1e3
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e3
+    print(f"{args.chunks:,} chunks, vocabulary {index.vocabulary_size:,}")
+    print(f"  build {t_build:6.1f} s   load (mmap) {t_load * 1e3:6.2f} ms")
+    print(f"  top_k: p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+    print(f"  search() incl. decoding the hits: {t_search * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
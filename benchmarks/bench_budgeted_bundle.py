@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from context_engineering.context.budget import Budget
+from context_engineering.context.injection import set_scan_cache
+from context_engineering.context.retrieval_bundle import (
+    RetrievedChunk,
+    bundle_retrieved_chunks,
+    bundle_retrieved_chunks_to_budget,
+)
+
+
+def make_results(n: int, dup_rate: float, seed: int = 0) -> list[RetrievedChunk]:
+    """Ranked retrieval results where about dup_rate of them mirror an earlier hit."""
+
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(2_000)]
+    chunks: list[RetrievedChunk] = []
+    for i in range(n):
+        if chunks and rng.random() < dup_rate:
+            # Mirror of an earlier page with a small edit (boilerplate, a changed date).
+            base = rng.choice(chunks).text.split(" ")
+            base[rng.randrange(len(base))] = "2024-01-01"
+            text = " ".join(base)
+        else:
+            text = " ".join(rng.choices(words, k=rng.randint(150, 400)))
+        chunks.append(RetrievedChunk(chunk_id=f"doc{i}", text=text, source="kb"))
+    return chunks
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Budgeted, deduplicated retrieval bundling.")
+    ap.add_argument("--chunks", type=int, default=200)
+    ap.add_argument("--dup-rate", type=float, default=0.4)
+    ap.add_argument("--max-chars", type=int, default=60_000)
+    args = ap.parse_args()
+    set_scan_cache(None)
+
+    chunks = make_results(args.chunks, args.dup_rate)
+    t0 = time.perf_counter()
+    plain = bundle_retrieved_chunks(chunks)
+    t_plain = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    res = bundle_retrieved_chunks_to_budget(chunks, max_chars=args.max_chars)
+    t_budget = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    no_dedupe = bundle_retrieved_chunks_to_budget(chunks, max_chars=args.max_chars, dedupe=False)
+    t_no_dedupe = time.perf_counter() - t0
+
+    measure = Budget.tokens(10**9).measure
+    print(f"{args.chunks} ranked chunks, {args.dup_rate:.0%} near-duplicates")
+    rows = [
+        ("everything", plain.bundled_text, t_plain, args.chunks, 0),
+        ("budget, no dedupe", no_dedupe.bundled_text, t_no_dedupe, len(no_dedupe.included), 0),
+        ("budget + dedupe", res.bundled_text, t_budget, len(res.included), len(res.deduplicated)),
+    ]
+    for name, text, elapsed, kept, dropped in rows:
+        print(
+            f"  {name:<18} {len(text):>9,} chars {measure(text, cache=False):>8,} tokens"
+            f"  kept {kept:>4}  deduped {dropped:>4}  {elapsed * 1e3:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from context_engineering.context.bulk_digest import digest_messages_parallel
+from context_engineering.context.digest import digest_messages, set_digest_cache
+from context_engineering.types import Message
+
+
+def build_archive(n: int, seed: int = 0) -> list[Message]:
+    rng = random.Random(seed)
+    return [
+        Message(
+            role=rng.choice(["user", "assistant", "tool"]),
+            content="".join(
+                rng.choice(["# Heading", "- bullet item", "1. step", "plain prose line"])
+                + f" {j}\n"
+                for j in range(rng.randint(5, 400))
+            ),
+        )
+        for _ in range(n)
+    ]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Bulk digest scaling over a process pool.")
+    ap.add_argument("--n", type=int, default=50_000, help="Messages in the archive.")
+    ap.add_argument("--max-chars", type=int, default=-1, help="Cap (<= 0: uncapped, worst case).")
+    ap.add_argument(
+        "--workers", default="1,2,4,8,16", help="Comma-separated worker counts to try."
+    )
+    args = ap.parse_args()
+
+    set_digest_cache(None)  # measure digesting, not cache hits (workers never use it)
+    msgs = build_archive(args.n)
+    mb = sum(len(m.content) for m in msgs) / 1e6
+    print(f"{args.n} messages, {mb:.1f} MB, {os.cpu_count()} CPUs")
+
+    t0 = time.perf_counter()
+    expected = digest_messages(msgs, max_chars_per_message=args.max_chars)
+    serial = time.perf_counter() - t0
+    print(f"{'workers':>8} {'s':>8} {'speedup':>8}")
+    print(f"{'serial':>8} {serial:>8.2f} {1.0:>7.2f}x")
+
+    for workers in (int(w) for w in args.workers.split(",")):
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pool.submit(int).result()  # pool start-up is not part of the job
+            t0 = time.perf_counter()
+            got = digest_messages_parallel(
+                msgs,
+                max_chars_per_message=args.max_chars,
+                workers=workers,
+                executor=pool,
+                min_parallel=0,
+            )
+            elapsed = time.perf_counter() - t0
+        assert got == expected
+        print(f"{workers:>8} {elapsed:>8.2f} {serial / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from context_engineering.context.chunker import chunk_files
+from context_engineering.context.retrieval_bundle import RetrievedChunk
+
+
+def write_corpus(directory: str, files: int, mb_per_file: float, seed: int = 0) -> list[str]:
+    """Markdown-ish files: headings every few paragraphs of word soup."""
+
+    rng = random.Random(seed)
+    words = [
+        "the",
+        "station",
+        "ramp",
+        "access",
+        "route",
+        "hotel",
+        "service",
+        "policy",
+        "data",
+        "report",
+        "level",
+    ]
+    paragraph = [" ".join(rng.choices(words, k=60)) + "\n\n" for _ in range(50)]
+    paths = []
+    for i in range(files):
+        path = os.path.join(directory, f"doc{i}.md")
+        target = int(mb_per_file * 1e6)
+        with open(path, "w", encoding="utf-8") as f:
+            written = 0
+            section = 0
+            while written < target:
+                block = f"## Section {section}\n\n" + "".join(rng.choices(paragraph, k=4))
+                f.write(block)
+                written += len(block)
+                section += 1
+        paths.append(path)
+    return paths
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Streaming chunker ingest throughput.")
+    ap.add_argument("--files", type=int, default=8)
+    ap.add_argument("--mb-per-file", type=float, default=8.0)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_corpus(tmp, args.files, args.mb_per_file)
+        total = sum(os.path.getsize(p) for p in paths) / 1e6
+        print(f"{args.files} files, {total:.0f} MB")
+
+        def read_and_split() -> int:
+            # The old ingestion: read the whole file, then slice it.
+            n = 0
+            for p in paths:
+                with open(p, encoding="utf-8") as f:
+                    text = f.read()
+                chunks = [
+                    RetrievedChunk(chunk_id=f"{p}#{i}", text=text[i : i + 2000], source=p)
+                    for i in range(0, len(text), 1800)
+                ]
+                n += len(chunks)
+            return n
+
+        rows = [
+            ("read whole + split", read_and_split),
+            ("streaming, in-process", lambda: sum(1 for _ in chunk_files(paths, workers=1))),
+        ]
+        if args.workers > 1:
+            rows.append(
+                (
+                    f"streaming, {args.workers} workers",
+                    lambda: sum(1 for _ in chunk_files(paths, workers=args.workers)),
+                )
+            )
+        for name, fn in rows:
+            t0 = time.perf_counter()
+            n = fn()
+            elapsed = time.perf_counter() - t0
+            # Memory in a second run: tracing slows everything down.
+            tracemalloc.start()
+            fn()
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+            print(
+                f"  {name:<24} {total / elapsed:7.1f} MB/s  {n:>7,} chunks  peak {peak:6.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from context_engineering.context.budget import Budget
+from context_engineering.context.buffer import ConversationBuffer
+from context_engineering.context.packer import pack_priority_first, pack_recency_first
+from context_engineering.types import Message
+
+ROLES = ["user", "assistant", "tool", "assistant"]
+
+
+def build_history(n: int, seed: int = 0) -> list[Message]:
+    rng = random.Random(seed)
+    msgs = [Message(role="system", content="SYSTEM: policy must always remain.")]
+    msgs.extend(
+        Message(role=rng.choice(ROLES), content="x" * rng.randint(20, 400)) for _ in range(n - 1)
+    )
+    return msgs
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="ConversationBuffer save/open/pack benchmark.")
+    ap.add_argument("--n", type=int, default=1_000_000, help="Messages in the history.")
+    ap.add_argument("--max-chars", type=int, default=32_000, help="Budget per pack.")
+    args = ap.parse_args()
+
+    msgs = build_history(args.n)
+    budget = Budget(max_chars=args.max_chars)
+    buf, t_build = timed(ConversationBuffer, msgs)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.cebuf")
+        _, t_save = timed(buf.save, path)
+        size_mb = os.path.getsize(path) / 1e6
+        opened, t_open = timed(ConversationBuffer.open, path)
+
+        print(f"{args.n} messages, {size_mb:.1f} MB file")
+        print(f"build {t_build:.2f}s  save {t_save:.2f}s  open {t_open * 1e3:.2f}ms")
+        print(f"{'policy':>10} {'list ms':>10} {'buffer ms':>10} {'opened ms':>10}")
+        for name, pack in (("priority", pack_priority_first), ("recency", pack_recency_first)):
+            _, a = timed(pack, msgs, budget)
+            _, b = timed(pack, buf, budget)
+            _, c = timed(pack, opened, budget)
+            print(f"{name:>10} {a * 1e3:>10.1f} {b * 1e3:>10.1f} {c * 1e3:>10.1f}")
+        opened.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+
+from bench_bm25 import make_corpus
+
+from context_engineering.context.dense import DenseIndex
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Dense memmap retriever: build time and QPS.")
+    ap.add_argument("--chunks", type=int, default=200_000)
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--queries", type=int, default=256)
+    ap.add_argument("--k", type=int, default=10)
+    args = ap.parse_args()
+
+    queries = [c.text[:80] for c in make_corpus(args.queries, seed=1)]
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        index = DenseIndex.build(make_corpus(args.chunks), tmp, dim=args.dim)
+        t_build = time.perf_counter() - t0
+        size = args.chunks * args.dim * 4 / 1e6
+        print(f"{args.chunks:,} chunks x {args.dim} dims ({size:.0f} MB memmap)")
+        print(f"  build {t_build:6.1f} s")
+
+        for batch in (1, 16, args.queries):
+            t0 = time.perf_counter()
+            done = 0
+            while done < args.queries:
+                index.top_k(queries[done : done + batch], args.k)
+                done += batch
+                if batch == 1 and done >= 16:
+                    break  # single queries scan the whole matrix each; 16 are enough
+            elapsed = time.perf_counter() - t0
+            print(f"  batch {batch:>4}: {done / elapsed:8.1f} queries/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+from context_engineering.context.digest import digest_file, digest_text_deterministic
+
+
+def search_results(n: int) -> str:
+    """Bullet-heavy tool output, the worst case for the old `ln not in keep` scan."""
+
+    return "# Results\n" + "".join(f"- result {i}: https://example.com/{i}\n" for i in range(n))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Deterministic digest throughput on bullet lists.")
+    ap.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated bullet counts.")
+    ap.add_argument("--max-chars", type=int, default=4000, help="Digest cap (<= 0: uncapped).")
+    args = ap.parse_args()
+
+    print(f"{'bullets':>9} {'MB':>7} {'text ms':>9} {'uncapped ms':>12} {'file ms':>9}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        text = search_results(n)
+        t0 = time.perf_counter()
+        digest_text_deterministic(text, max_chars=args.max_chars)
+        t1 = time.perf_counter()
+        digest_text_deterministic(text, max_chars=-1)
+        t2 = time.perf_counter()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            t3 = time.perf_counter()
+            digest_file(path, max_chars=args.max_chars)
+            t4 = time.perf_counter()
+        mb = len(text.encode()) / 1e6
+        print(
+            f"{n:>9} {mb:>7.2f} {(t1 - t0) * 1e3:>9.2f} {(t2 - t1) * 1e3:>12.2f}"
+            f" {(t4 - t3) * 1e3:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
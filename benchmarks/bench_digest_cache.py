@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from context_engineering.context.cache import DiskCache, LRUCache
+from context_engineering.context.digest import digest_messages, set_digest_cache
+from context_engineering.types import Message
+
+
+def build_history(n: int, seed: int = 0) -> list[Message]:
+    rng = random.Random(seed)
+    return [
+        Message(
+            role="tool",
+            content=f"# Result {i}\n"
+            + "".join(f"- item {j}: " + "x" * rng.randint(10, 80) + "\n" for j in range(40))
+            + "prose line\n" * rng.randint(0, 200),
+        )
+        for i in range(n)
+    ]
+
+
+def timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="digest_messages per turn: uncached vs cached.")
+    ap.add_argument("--n", type=int, default=2000, help="Messages in the history.")
+    ap.add_argument("--max-chars", type=int, default=600, help="max_chars_per_message.")
+    args = ap.parse_args()
+
+    msgs = build_history(args.n)
+
+    def turn() -> None:
+        digest_messages(msgs, max_chars_per_message=args.max_chars)
+
+    set_digest_cache(None)
+    uncached = timed(turn)
+
+    memory = LRUCache()
+    set_digest_cache(memory)
+    cold = timed(turn)
+    warm = timed(turn)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "digests.sqlite")
+        set_digest_cache(LRUCache(disk=DiskCache(path)))
+        timed(turn)
+        set_digest_cache(LRUCache(disk=DiskCache(path)))  # a restarted worker
+        restarted = timed(turn)
+
+    print(f"{args.n} messages, {sum(len(m.content) for m in msgs) / 1e6:.1f} MB")
+    print(f"uncached {uncached * 1e3:.1f}ms  cold {cold * 1e3:.1f}ms  warm {warm * 1e3:.1f}ms")
+    print(f"restarted worker (disk tier) {restarted * 1e3:.1f}ms  stats {memory.stats()}")
+
+
+if __name__ == "__main__":
+    main()
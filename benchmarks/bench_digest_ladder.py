@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from context_engineering.context.digest import digest_text_deterministic, set_digest_cache
+from context_engineering.context.ladder import digest_ladder
+
+
+def tool_output(n: int) -> str:
+    return "# Results\n" + "".join(f"- result {i}: https://example.com/{i}\n" for i in range(n))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Digest ladder vs one digest per budget.")
+    ap.add_argument("--messages", type=int, default=200)
+    ap.add_argument("--bullets", type=int, default=3000, help="Bullets per message.")
+    ap.add_argument("--picks", type=int, default=100_000, help="fit() calls to time.")
+    args = ap.parse_args()
+    set_digest_cache(None)  # time the work, not cache lookups
+
+    texts = [tool_output(args.bullets + i) for i in range(args.messages)]
+    caps = [64 << i for i in range(11)]  # 64 .. 64k chars
+
+    t0 = time.perf_counter()
+    for text in texts:
+        for cap in caps:
+            digest_text_deterministic(text, max_chars=cap)
+    t1 = time.perf_counter()
+    ladders = [digest_ladder(text, min_chars=64, max_chars=64 << 10) for text in texts]
+    t2 = time.perf_counter()
+    for i in range(args.picks):
+        ladders[i % len(ladders)].fit(i % 70_000)
+    t3 = time.perf_counter()
+
+    print(f"{len(caps)} budgets x {args.messages} messages")
+    print(f"  per-budget digests: {(t1 - t0) * 1e3:9.1f} ms")
+    print(f"  ladders (one pass): {(t2 - t1) * 1e3:9.1f} ms")
+    print(f"  fit(room):          {(t3 - t2) / args.picks * 1e6:9.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from context_engineering.context.digest import digest_text_deterministic, set_digest_cache
+from context_engineering.context.extractive import digest_text_extractive
+
+
+def mixed_document(size: int, seed: int = 0) -> str:
+    """Headings, bullets and prose lines over a 5k-word vocabulary, about `size` bytes."""
+
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = ["".join(rng.choices(letters, k=rng.randint(2, 9))) for _ in range(5000)]
+    lines: list[str] = []
+    total = 0
+    while total < size:
+        kind = rng.random()
+        if kind < 0.1:
+            line = "# " + " ".join(rng.choices(words, k=4))
+        elif kind < 0.5:
+            line = "- " + " ".join(rng.choices(words, k=rng.randint(3, 12)))
+        else:
+            line = ". ".join(
+                " ".join(rng.choices(words, k=rng.randint(4, 15))).capitalize() for _ in range(3)
+            ) + "."
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Extractive vs deterministic digest throughput.")
+    ap.add_argument("--sizes", default="100000,1000000,10000000", help="Comma-separated bytes.")
+    ap.add_argument("--max-chars", type=int, default=4000, help="Digest cap.")
+    args = ap.parse_args()
+    set_digest_cache(None)  # time the work, not cache lookups
+
+    print(f"{'MB':>7} {'extractive ms':>14} {'MB/s':>7} {'deterministic ms':>17}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        text = mixed_document(size)
+        t0 = time.perf_counter()
+        digest_text_extractive(text, max_chars=args.max_chars)
+        t1 = time.perf_counter()
+        digest_text_deterministic(text, max_chars=args.max_chars)
+        t2 = time.perf_counter()
+        mb = len(text.encode()) / 1e6
+        print(
+            f"{mb:>7.2f} {(t1 - t0) * 1e3:>14.1f} {mb / (t1 - t0):>7.1f}"
+            f" {(t2 - t1) * 1e3:>17.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
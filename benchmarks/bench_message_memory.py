@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import tracemalloc
+from collections.abc import Callable
+from types import MappingProxyType
+from typing import Any
+
+from context_engineering.types import CompactMessage, Message
+
+ROLES = [b"user", b"assistant", b"tool", b"assistant"]
+
+
+def measure(build: Callable[[], list[Any]]) -> int:
+    """Bytes still allocated by build() once it returns (its result is kept alive)."""
+
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Per-message memory of Message vs CompactMessage.")
+    ap.add_argument("--n", type=int, default=1_000_000, help="Messages per layout.")
+    args = ap.parse_args()
+    n = args.n
+
+    # Contents exist before measuring, so only per-message overhead is counted.
+    contents = [f"turn {i}: " + "x" * (i % 200) for i in range(n)]
+    text_bytes = sum(len(c) for c in contents)
+    shared_meta = MappingProxyType({"source": "import"})
+
+    def loaded(cls: type, meta: Callable[[], Any]) -> Callable[[], list[Any]]:
+        # Roles are decoded per message, like strings coming out of a file or socket.
+        def build() -> list[Any]:
+            return [
+                cls(role=ROLES[i & 3].decode(), content=c, meta=meta())
+                for i, c in enumerate(contents)
+            ]
+
+        return build
+
+    cases = [
+        ("no meta", loaded(Message, lambda: None), loaded(CompactMessage, lambda: None)),
+        (
+            "meta",
+            loaded(Message, lambda: {"source": "import"}),
+            loaded(CompactMessage, lambda: shared_meta),
+        ),
+    ]
+
+    print(f"{n} messages, {text_bytes / 1e6:.1f} MB of text (not counted)")
+    print(f"{'case':>8} {'Message MB':>11} {'Compact MB':>11} {'B/msg old':>10} {'B/msg new':>10}")
+    for name, old, new in cases:
+        a, b = measure(old), measure(new)
+        print(f"{name:>8} {a / 1e6:>11.1f} {b / 1e6:>11.1f} {a / n:>10.1f} {b / n:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from context_engineering.context.budget import Budget
+from context_engineering.context.packer import pack_priority_first, pack_recency_first
+from context_engineering.types import Message
+
+ROLES = ["user", "assistant", "tool", "assistant", "user", "developer"]
+
+
+def build_history(n: int, seed: int = 0) -> list[Message]:
+    rng = random.Random(seed)
+    msgs = [Message(role="system", content="SYSTEM: policy must always remain.")]
+    for _ in range(n - 1):
+        msgs.append(Message(role=rng.choice(ROLES), content="x" * rng.randint(20, 400)))
+    return msgs
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Packing engine scaling benchmark (chars-based).")
+    ap.add_argument(
+        "--sizes",
+        default="100,1000,10000,100000,1000000",
+        help="Comma-separated history lengths.",
+    )
+    ap.add_argument("--max-chars", type=int, default=32_000, help="Budget per pack.")
+    ap.add_argument("--repeat", type=int, default=3, help="Best-of repetitions per size.")
+    args = ap.parse_args()
+
+    budget = Budget(max_chars=args.max_chars)
+    print(f"{'messages':>10} {'recency ms':>12} {'priority ms':>12} {'ns/msg (prio)':>14}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        msgs = build_history(n)
+        t_rec = best_of(lambda msgs=msgs: pack_recency_first(msgs, budget), args.repeat)
+        t_pri = best_of(lambda msgs=msgs: pack_priority_first(msgs, budget), args.repeat)
+        print(f"{n:>10} {t_rec * 1e3:>12.2f} {t_pri * 1e3:>12.2f} {t_pri / n * 1e9:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
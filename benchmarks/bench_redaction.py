@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from context_engineering.context.tool_log import (
+    _REDACTIONS,
+    RedactionReport,
+    redact_secrets,
+    redact_secrets_report,
+    redact_secrets_stream,
+)
+
+
+def sequential_redact(text: str) -> str:
+    """The previous implementation: one full pat.sub pass (and copy) per rule."""
+
+    out = text
+    for label, pat in _REDACTIONS:
+        out = pat.sub(f"<{label}_REDACTED>", out)
+    return out
+
+
+def make_log(mb: float, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = [
+        f"2024-01-01T12:00:{i % 60:02d} INFO worker={i % 8} handled request id={i} in {i % 97}ms"
+        for i in range(5_000)
+    ]
+    secrets = [
+        "DEBUG auth header api_key=sk-FAKEFAKEFAKEFAKE0001",
+        "WARN config dump: password = hunter2",
+        "DEBUG token: eyJhbGciOiJIUzI1NiJ9.fake",
+    ]
+    out: list[str] = []
+    size = 0
+    while size < mb * 1e6:
+        line = rng.choice(secrets) if rng.random() < 0.001 else rng.choice(lines)
+        out.append(line + "\n")
+        size += len(line) + 1
+    return "".join(out)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Secret redaction on a large log.")
+    ap.add_argument("--mb", type=float, default=50.0)
+    ap.add_argument("--chunk", type=int, default=1 << 16)
+    args = ap.parse_args()
+
+    text = make_log(args.mb)
+    size = len(text) / 1e6
+    print(f"{size:.0f} MB log")
+
+    def streamed() -> str:
+        chunks = (text[i : i + args.chunk] for i in range(0, len(text), args.chunk))
+        return "".join(redact_secrets_stream(chunks, report=RedactionReport()))
+
+    expected = None
+    for name, fn in (
+        ("sequential pat.sub", lambda: sequential_redact(text)),
+        ("single pass", lambda: redact_secrets(text)),
+        ("single pass + report", lambda: redact_secrets_report(text)[0]),
+        ("streamed 64k chunks + report", streamed),
+    ):
+        t0 = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - t0
+        expected = expected or out
+        assert out == expected, name
+        print(f"  {name:<30} {elapsed:6.2f} s  {size / elapsed:7.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from context_engineering.context.cache import DiskCache, LRUCache
+from context_engineering.context.injection import set_scan_cache
+from context_engineering.context.retrieval_bundle import RetrievedChunk, bundle_retrieved_chunks
+
+
+def corpus(n: int, seed: int = 0) -> list[RetrievedChunk]:
+    rng = random.Random(seed)
+    words = [
+        "the",
+        "station",
+        "ramp",
+        "access",
+        "route",
+        "hotel",
+        "service",
+        "policy",
+        "data",
+        "report",
+        "token",
+    ]
+    return [
+        RetrievedChunk(
+            chunk_id=f"doc{i}",
+            source="kb",
+            text="\n".join(" ".join(rng.choices(words, k=12)) for _ in range(rng.randint(5, 40))),
+        )
+        for i in range(n)
+    ]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="bundle_retrieved_chunks with and without scan cache.")
+    ap.add_argument("--chunks", type=int, default=2000, help="Distinct chunks in the corpus.")
+    ap.add_argument("--queries", type=int, default=2000, help="Bundles to build.")
+    ap.add_argument("--k", type=int, default=8, help="Chunks per bundle.")
+    args = ap.parse_args()
+
+    docs = corpus(args.chunks)
+    rng = random.Random(1)
+    # Popular chunks are retrieved far more often (Zipf-like).
+    weights = [1 / (i + 1) for i in range(len(docs))]
+    queries = [rng.choices(docs, weights, k=args.k) for _ in range(args.queries)]
+
+    def run() -> float:
+        t0 = time.perf_counter()
+        for q in queries:
+            bundle_retrieved_chunks(q)
+        return time.perf_counter() - t0
+
+    set_scan_cache(None)
+    uncached = run()
+    memory = LRUCache()
+    set_scan_cache(memory)
+    cached = run()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scans.sqlite")
+        set_scan_cache(LRUCache(disk=DiskCache(path)))
+        run()
+        restarted_cache = LRUCache(disk=DiskCache(path))
+        set_scan_cache(restarted_cache)  # a restarted worker
+        restarted = run()
+
+    print(f"{args.queries} bundles x {args.k} chunks over {args.chunks} distinct chunks")
+    print(f"uncached  {uncached * 1e3:8.1f} ms")
+    print(f"memory    {cached * 1e3:8.1f} ms  hit rate {memory.stats().hit_rate:.1%}")
+    print(f"restarted {restarted * 1e3:8.1f} ms  hit rate {restarted_cache.stats().hit_rate:.1%}")
+
+
+if __name__ == "__main__":
+    main()
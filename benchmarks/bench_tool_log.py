@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from context_engineering.context.tool_log import ToolEvent, ToolLog, render_tool_transcript
+
+
+def make_event(i: int) -> ToolEvent:
+    return ToolEvent(
+        tool_name=f"search_{i % 5}",
+        tool_input=f"query {i} api key: sk-FAKEFAKEFAKE{i:06d}",
+        tool_output=("result row with some text\n" * (5 + i % 20)),
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Per-turn transcript rendering: list vs ToolLog.")
+    ap.add_argument("--turns", type=int, default=5_000)
+    ap.add_argument("--max-chars", type=int, default=4_000)
+    ap.add_argument("--max-events", type=int, default=10_000)
+    args = ap.parse_args()
+
+    # A session appends one tool event per turn and renders the transcript each turn.
+    events: list[ToolEvent] = []
+    t0 = time.perf_counter()
+    for i in range(args.turns):
+        events.append(make_event(i))
+        legacy = render_tool_transcript(events[-args.max_events :], max_chars=args.max_chars)
+    t_legacy = time.perf_counter() - t0
+
+    log = ToolLog(max_events=args.max_events)
+    t0 = time.perf_counter()
+    for i in range(args.turns):
+        log.append(make_event(i))
+        out = log.render(max_chars=args.max_chars)
+    t_log = time.perf_counter() - t0
+    assert out == legacy
+
+    print(f"{args.turns:,} turns, transcript capped at {args.max_chars:,} chars")
+    for name, elapsed in (
+        ("render_tool_transcript(list)", t_legacy),
+        ("ToolLog.append + render", t_log),
+    ):
+        print(f"  {name:<29} {elapsed:7.2f} s  {elapsed / args.turns * 1e6:8.1f} us/turn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from context_engineering.context.tool_log import ToolEvent, render_tool_transcript
+from context_engineering.context.tool_store import ToolEventStore
+
+T0 = datetime(2024, 1, 1)
+
+
+def make_event(i: int) -> ToolEvent:
+    return ToolEvent(
+        tool_name=f"search_{i % 5}",
+        tool_input=f"query {i}",
+        tool_output="result row with some text\n" * (2 + i % 10),
+        created_at=T0 + timedelta(seconds=i),
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="On-disk tool-event store: appends and reads.")
+    ap.add_argument("--events", type=int, default=500_000)
+    ap.add_argument("--newest", type=int, default=50)
+    args = ap.parse_args()
+
+    events = [make_event(i) for i in range(args.events)]
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        with ToolEventStore(tmp) as store:
+            store.extend(events)
+        t_append = time.perf_counter() - t0
+        size = os.path.getsize(os.path.join(tmp, "events.log")) / 1e6
+        del events
+
+        t0 = time.perf_counter()
+        store = ToolEventStore(tmp)
+        t_open = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        recent = store.newest(args.newest)
+        transcript = render_tool_transcript(recent, max_chars=4_000)
+        t_newest = time.perf_counter() - t0
+
+        mid = T0 + timedelta(seconds=args.events // 2)
+        t0 = time.perf_counter()
+        window = store.between(mid, mid + timedelta(minutes=5))
+        t_range = time.perf_counter() - t0
+        store.close()
+
+    print(f"{args.events:,} events, {size:.0f} MB log")
+    print(f"  append                {args.events / t_append:10,.0f} events/s")
+    print(f"  reopen                {t_open * 1e3:10.2f} ms")
+    print(f"  newest + transcript   {t_newest * 1e3:10.2f} ms  ({len(transcript)} chars)")
+    print(f"  5-minute range        {t_range * 1e3:10.2f} ms  ({len(window)} events)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from context_engineering.context.budget import Budget
+from context_engineering.context.packer import pack_value_weighted
+from context_engineering.types import Message
+
+ROLES = ["user", "assistant", "tool", "assistant"]
+
+
+def build_history(n: int, seed: int = 0) -> tuple[list[Message], list[float]]:
+    rng = random.Random(seed)
+    msgs = [Message(role="system", content="SYSTEM: policy must always remain.")]
+    msgs.extend(
+        Message(role=rng.choice(ROLES), content="x" * rng.randint(20, 400)) for _ in range(n - 1)
+    )
+    values = [rng.random() for _ in msgs]
+    return msgs, values
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Value-weighted (knapsack) packing benchmark.")
+    ap.add_argument("--sizes", default="40,100,1000,10000,100000", help="History lengths.")
+    ap.add_argument("--max-chars", type=int, default=32_000, help="Budget per pack.")
+    args = ap.parse_args()
+
+    budget = Budget(max_chars=args.max_chars)
+    # With the defaults, solve_knapsack is exact up to 40 competing messages.
+    print(f"{'messages':>10} {'solver':>8} {'ms':>10} {'kept/bound':>11}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        msgs, values = build_history(n)
+        t0 = time.perf_counter()
+        result = pack_value_weighted(msgs, budget, values)
+        elapsed = time.perf_counter() - t0
+        solver = "exact" if result.exact else "greedy"
+        ratio = result.kept_value / result.value_upper_bound if result.value_upper_bound else 1.0
+        print(f"{n:>10} {solver:>8} {elapsed * 1e3:>10.2f} {ratio:>11.4f}")
+
+
+if __name__ == "__main__":
+    main()
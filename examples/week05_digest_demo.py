@@ -49,6 +49,12 @@ def main() -> None:
     ap = argparse.ArgumentParser(description="Week 5: deterministic context digestion demo")
     ap.add_argument("--max-chars", type=int, default=600, help="Total context budget")
     ap.add_argument("--digest-per", type=int, default=180, help="Max chars per message after digest")
+    ap.add_argument(
+        "--algorithm",
+        choices=["deterministic", "extractive"],
+        default="deterministic",
+        help="Digest algorithm (extractive needs NumPy)",
+    )
     args = ap.parse_args()
 
     msgs = build_long_messages()
@@ -62,7 +68,9 @@ def main() -> None:
     print_context(packed0.packed)
     print(f"\nFinal chars: {packed0.final_chars} (budget={budget.max_chars})")
 
-    digested = digest_messages(msgs, max_chars_per_message=args.digest_per)
+    digested = digest_messages(
+        msgs, max_chars_per_message=args.digest_per, algorithm=args.algorithm
+    )
     print("\n=== DIGESTED (per-message) ===")
     print_context(digested)
 
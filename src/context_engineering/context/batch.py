@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from itertools import repeat
+from typing import Any, Literal
+
+try:  # NumPy is optional: pip install "context-engineering-labs[fast]"
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without the extra
+    np = None  # type: ignore[assignment]
+
+Policy = Literal["recency", "priority"]
+
+_SYSTEM, _DEVELOPER, _USER, _ASSISTANT, _TOOL, _OTHER = range(6)
+_ROLE_CODES = {
+    "system": _SYSTEM,
+    "developer": _DEVELOPER,
+    "user": _USER,
+    "assistant": _ASSISTANT,
+    "tool": _TOOL,
+}
+
+# Below this many conversations still competing at a given step, a per-conversation
+# Python loop is cheaper than another round of array operations.
+_VECTOR_MIN = 32
+
+
+def _require_numpy() -> Any:
+    if np is None:
+        raise ImportError(
+            "select_many needs NumPy. Install it with: pip install 'context-engineering-labs[fast]'"
+        )
+    return np
+
+
+def _first_per_group(groups: Any, positions: Any) -> tuple[Any, Any]:
+    """(group id, first position) for each run of equal ids in the sorted `groups` array."""
+
+    heads = np.flatnonzero(np.diff(groups, prepend=-1))
+    return groups[heads], positions[heads]
+
+
+@dataclass(frozen=True)
+class BatchSelection:
+    accepted: Any  # bool array over the flattened messages
+    totals: Any  # int64 array: packed size per conversation, in budget units
+    first_system: dict[int, int]  # conversation -> flat index of its first system message
+
+
+def role_codes(roles: Iterable[str]) -> Any:
+    """Encode role strings as the small integer codes select_many expects."""
+
+    _require_numpy()
+    roles = list(roles)
+    codes = map(_ROLE_CODES.get, roles, repeat(_OTHER))
+    return np.fromiter(codes, dtype=np.int8, count=len(roles))
+
+
+def select_many(
+    sizes: Any, codes: Any, lengths: Any, limit: int, *, policy: Policy = "recency"
+) -> BatchSelection:
+    """Priority or recency selection for many conversations at once, on arrays.
+
+    `sizes` (in budget units) and `codes` (see role_codes; a ConversationBuffer's
+    char_lengths / role_codes work as is) cover all conversations back to back;
+    `lengths` gives the number of messages in each. The accepted messages and
+    totals are those of pack_recency_first / pack_priority_first per
+    conversation. For Message lists, call those per conversation: reading sizes
+    and roles off the messages costs more than the selection itself.
+
+    Each conversation's candidates are laid out in policy order (running
+    counts for recency, one stable radix sort by group for priority), then:
+    1) a segmented cumulative sum accepts every candidate up to the first one
+       that overflows the budget (in typical histories that is most of them)
+    2) the remaining first-fit steps run column by column across all
+       conversations at once, with boolean masks deciding what still fits
+    3) once few conversations are left competing, they finish in a plain loop
+    """
+
+    _require_numpy()
+    if policy not in ("recency", "priority"):
+        raise ValueError(f"Unknown policy: {policy!r}")
+
+    sizes = np.asarray(sizes, dtype=np.int64)
+    codes = np.asarray(codes, dtype=np.int8)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    n_conv = len(lengths)
+    n = len(sizes)
+
+    starts = np.zeros(n_conv, dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    conv = np.repeat(np.arange(n_conv, dtype=np.int64), lengths)
+
+    is_system = codes == _SYSTEM
+    sys_positions = np.flatnonzero(is_system)
+    sys_conv, sys0 = _first_per_group(conv[sys_positions], sys_positions)
+
+    def running_count(mask: Any) -> tuple[Any, Any]:
+        """Inclusive count of `mask` within each conversation, plus per-conversation totals."""
+
+        c = np.concatenate(([0], np.cumsum(mask)))
+        before = c[starts]
+        return c[1:] - before[conv], c[starts + lengths] - before
+
+    total = np.zeros(n_conv, dtype=np.int64)
+    accepted = np.zeros(n, dtype=bool)
+
+    # Place every candidate at its slot in its conversation's policy order.
+    if policy == "recency":
+        # The first system message is kept unconditionally; other system messages
+        # are neither packed nor dropped.
+        total[sys_conv] = sizes[sys0]
+        accepted[sys0] = True
+        eligible = ~is_system
+        seen, counts = running_count(eligible)
+        slot = counts[conv] - seen  # newest first
+    else:
+        user_positions = np.flatnonzero(codes == _USER)[::-1]
+        _, latest_user = _first_per_group(conv[user_positions], user_positions)
+        group = np.full(n, 4, dtype=np.int8)
+        group[codes == _DEVELOPER] = 1
+        group[codes == _TOOL] = 3
+        group[latest_user] = 2
+        group[sys0] = 0
+        eligible = np.ones(n, dtype=bool)
+        counts = lengths
+        # Stable sort by group (a radix sort for int8): within a group, messages
+        # stay in (conversation, position) order, so a message's rank in its
+        # group is its distance from the start of its (group, conversation) run.
+        perm = np.argsort(group, kind="stable")
+        key = group[perm].astype(np.int64) * n_conv + conv[perm]
+        size_gc = np.bincount(key, minlength=5 * n_conv)
+        rank = np.arange(n, dtype=np.int64) - (np.cumsum(size_gc) - size_gc)[key]
+        # groups 0-3 keep chronological order, group 4 (the fill) goes newest first
+        fill = key >= 4 * n_conv
+        rank[fill] = size_gc[key[fill]] - 1 - rank[fill]
+        offset_gc = np.cumsum(size_gc.reshape(5, n_conv), axis=0) - size_gc.reshape(5, n_conv)
+        slot = np.empty(n, dtype=np.int64)
+        slot[perm] = offset_gc.ravel()[key] + rank
+
+    ostarts = np.cumsum(counts) - counts
+    cand = np.flatnonzero(eligible)
+    order = np.empty(len(cand), dtype=np.int64)
+    order[ostarts[conv[cand]] + slot[cand]] = cand
+    oconv = conv[order]
+    osize = sizes[order]
+
+    # 1) accept the prefix that fits without skipping anything
+    csum = np.cumsum(osize)
+    before = np.concatenate(([0], csum))[ostarts]
+    over = np.flatnonzero(total[oconv] + csum - before[oconv] > limit)
+    first_fail = counts.copy()
+    fail_conv, fail_at = _first_per_group(oconv[over], over)
+    first_fail[fail_conv] = fail_at - ostarts[fail_conv]
+    taken = np.arange(len(order)) - ostarts[oconv] < first_fail[oconv]
+    total += np.bincount(oconv[taken], weights=osize[taken], minlength=n_conv).astype(np.int64)
+
+    # 2) first-fit with skipping, one slot (column) at a time across conversations.
+    # A conversation competes at slot r when first_fail < r < counts.
+    width = int(counts.max(initial=0)) + 1
+    live = first_fail + 1 < counts
+    events = np.bincount(first_fail[live] + 1, minlength=width) - np.bincount(
+        counts[live], minlength=width
+    )
+    competing = np.cumsum(events)
+    busy = np.flatnonzero(competing >= _VECTOR_MIN)
+    r = int(first_fail[live].min()) + 1 if live.any() else width
+    r_end = int(busy[-1]) + 1 if len(busy) else r
+    while r < r_end:
+        act = np.flatnonzero((first_fail < r) & (counts > r))
+        idx = ostarts[act] + r
+        s = osize[idx]
+        fits = s <= limit - total[act]
+        taken[idx[fits]] = True
+        total[act[fits]] += s[fits]
+        r += 1
+
+    # 3) finish the stragglers with a scalar loop
+    stragglers = np.flatnonzero(live & (counts > r)).tolist()
+    if stragglers:
+        taken_list = taken.tolist()
+        osize_list = osize.tolist()
+        for ci in stragglers:
+            lo = int(ostarts[ci]) + max(r, int(first_fail[ci]) + 1)
+            hi = int(ostarts[ci] + counts[ci])
+            t = int(total[ci])
+            for j in range(lo, hi):
+                if t + osize_list[j] <= limit:
+                    taken_list[j] = True
+                    t += osize_list[j]
+            total[ci] = t
+        taken = np.array(taken_list, dtype=bool)
+
+    accepted[order[taken]] = True
+
+    return BatchSelection(
+        accepted=accepted,
+        totals=total,
+        first_system=dict(zip(sys_conv.tolist(), sys0.tolist())),
+    )
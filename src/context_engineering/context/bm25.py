@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from collections.abc import Iterable
+from typing import Any
+
+from context_engineering.context.retrieval_bundle import RetrievedChunk
+
+try:  # NumPy is optional: pip install "context-engineering-labs[fast]"
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without the extra
+    np = None  # type: ignore[assignment]
+
+# Bump whenever the on-disk layout or the tokenizer changes.
+_BM25_VERSION = "bm25-v1"
+
+_TOKEN = re.compile(r"\w+")
+_ARRAYS = (
+    "term_hashes",
+    "term_offsets",
+    "doc_ids",
+    "impacts",
+    "text_offsets",
+    "id_offsets",
+    "source_offsets",
+)
+_BLOBS = ("texts", "ids", "sources")
+
+
+def _require_numpy() -> Any:
+    if np is None:
+        raise ImportError(
+            "BM25Index needs NumPy. Install it with: pip install 'context-engineering-labs[fast]'"
+        )
+    return np
+
+
+def _tokens(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def _term_hash(term: str) -> int:
+    # Stable across processes (unlike hash()), so saved indexes stay valid.
+    digest = hashlib.blake2b(term.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _blob(values: list[str]) -> tuple[bytes, Any]:
+    encoded = [v.encode("utf-8", "surrogatepass") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return b"".join(encoded), offsets
+
+
+class BM25Index:
+    """In-process BM25 retriever over RetrievedChunk-shaped documents.
+
+    The index is a term -> postings map in flat arrays:
+    - term_hashes: sorted 64-bit hashes of the vocabulary (searchsorted lookup)
+    - term_offsets: where each term's postings start in doc_ids/impacts
+    - doc_ids / impacts: per posting, the document and its precomputed BM25
+      term score (idf and length normalization already applied)
+    A query only adds up impacts of its terms' postings and takes the top k
+    with argpartition; no per-document work. Chunk text, ids and sources are
+    stored as UTF-8 blobs and only decoded for the hits.
+
+    save() writes one .npy/.bin file per array; load() memory-maps them, so
+    opening even a large index is instant and pages load on demand.
+    """
+
+    def __init__(self, arrays: dict[str, Any], *, k1: float, b: float) -> None:
+        _require_numpy()
+        self.k1 = k1
+        self.b = b
+        self._a = arrays
+        self._local = threading.local()
+
+    def __len__(self) -> int:
+        return len(self._a["text_offsets"]) - 1
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._a["term_hashes"])
+
+    @classmethod
+    def build(
+        cls, chunks: Iterable[RetrievedChunk], *, k1: float = 1.2, b: float = 0.75
+    ) -> BM25Index:
+        """Index chunks (in order; results refer back to them by position)."""
+
+        _require_numpy()
+        vocab: dict[str, int] = {}
+        term_ids = array("i")
+        doc_ids = array("i")
+        tfs = array("i")
+        lengths = array("i")
+        texts: list[str] = []
+        ids: list[str] = []
+        sources: list[str] = []
+        for doc, c in enumerate(chunks):
+            words = _tokens(c.text)
+            lengths.append(len(words))
+            for term, tf in Counter(words).items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(doc)
+                tfs.append(tf)
+            texts.append(c.text)
+            ids.append(c.chunk_id)
+            # "\0" marks a missing source; an empty one stays "".
+            sources.append("\0" if c.source is None else c.source)
+
+        n_docs = len(lengths)
+        t = np.frombuffer(term_ids, dtype=np.int32)
+        d = np.frombuffer(doc_ids, dtype=np.int32)
+        tf = np.frombuffer(tfs, dtype=np.int32).astype(np.float32)
+        dl = np.frombuffer(lengths, dtype=np.int32).astype(np.float32)
+        avgdl = float(dl.mean()) if n_docs and dl.sum() else 1.0
+
+        # Postings grouped by term, terms in hash order; doc order kept within a term.
+        hashes = np.array([_term_hash(term) for term in vocab], dtype=np.uint64)
+        term_order = np.argsort(hashes, kind="stable")
+        rank = np.empty_like(term_order)
+        rank[term_order] = np.arange(len(term_order))
+        order = np.argsort(rank[t], kind="stable")
+        df = np.bincount(t, minlength=len(vocab))[term_order]
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=offsets[1:])
+
+        # Lucene-style BM25: idf stays positive for very common terms.
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = k1 * (1 - b + b * dl / avgdl)
+        d = d[order]
+        tf = tf[order]
+        impacts = np.repeat(idf, df) * tf * (k1 + 1) / (tf + norm[d])
+
+        texts_blob, text_offsets = _blob(texts)
+        ids_blob, id_offsets = _blob(ids)
+        sources_blob, source_offsets = _blob(sources)
+        arrays = {
+            "term_hashes": hashes[term_order],
+            "term_offsets": offsets,
+            "doc_ids": d,
+            "impacts": impacts.astype(np.float32),
+            "text_offsets": text_offsets,
+            "id_offsets": id_offsets,
+            "source_offsets": source_offsets,
+            "texts": np.frombuffer(texts_blob, dtype=np.uint8),
+            "ids": np.frombuffer(ids_blob, dtype=np.uint8),
+            "sources": np.frombuffer(sources_blob, dtype=np.uint8),
+        }
+        return cls(arrays, k1=k1, b=b)
+
+    def save(self, path: str | os.PathLike[str]) -> None:
+        """Write the index into directory `path` (created if missing)."""
+
+        os.makedirs(path, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), self._a[name])
+        for name in _BLOBS:
+            with open(os.path.join(path, f"{name}.bin"), "wb") as f:
+                f.write(self._a[name].tobytes())
+        meta = {"version": _BM25_VERSION, "k1": self.k1, "b": self.b, "docs": len(self)}
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, path: str | os.PathLike[str]) -> BM25Index:
+        """Memory-map an index written by save()."""
+
+        _require_numpy()
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != _BM25_VERSION:
+            raise ValueError(f"{os.fspath(path)}: unsupported BM25 index {meta.get('version')!r}")
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in _ARRAYS
+        }
+        for name in _BLOBS:
+            blob = os.path.join(path, f"{name}.bin")
+            # np.memmap cannot map an empty file.
+            if os.path.getsize(blob):
+                arrays[name] = np.memmap(blob, dtype=np.uint8, mode="r")
+            else:
+                arrays[name] = np.zeros(0, dtype=np.uint8)
+        return cls(arrays, k1=meta["k1"], b=meta["b"])
+
+    def _scratch(self) -> Any:
+        # Per-thread score accumulator, all zeros between queries.
+        scores = getattr(self._local, "scores", None)
+        if scores is None:
+            scores = self._local.scores = np.zeros(len(self), dtype=np.float32)
+        return scores
+
+    def top_k(self, query: str, k: int = 10) -> tuple[Any, Any]:
+        """(document positions, scores) of the best k matches, best first.
+
+        Ties break by document position. Documents matching no query term are
+        never returned, so fewer than k results are possible.
+        """
+
+        a = self._a
+        hashes = a["term_hashes"]
+        postings: list[tuple[Any, Any, int]] = []
+        if len(hashes):
+            for term, count in Counter(_tokens(query)).items():
+                h = np.uint64(_term_hash(term))
+                i = int(np.searchsorted(hashes, h))
+                if i < len(hashes) and hashes[i] == h:
+                    lo, hi = int(a["term_offsets"][i]), int(a["term_offsets"][i + 1])
+                    postings.append((a["doc_ids"][lo:hi], a["impacts"][lo:hi], count))
+        if not postings or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        scores = self._scratch()
+        try:
+            # Doc ids are unique within a term, so fancy-index += is exact.
+            for docs, impacts, count in postings:
+                scores[docs] += impacts * count if count > 1 else impacts
+            if len(postings) == 1:
+                cand = np.asarray(postings[0][0])
+            else:
+                cand = np.concatenate([p[0] for p in postings])
+            s = scores[cand]
+            # A doc appears at most once per term, so the best k * terms
+            # entries hold the best k distinct docs. Keep every entry tied with
+            # the last of them too, so the lexsort below sees all tied docs.
+            m = min(len(cand), k * len(postings))
+            if m < len(cand):
+                keep = s >= np.partition(s, len(s) - m)[len(s) - m]
+                cand, s = cand[keep], s[keep]
+            docs, first = np.unique(cand, return_index=True)
+            s = s[first]
+            best = np.lexsort((docs, -s))[:k]
+            return docs[best].astype(np.int64), s[best]
+        finally:
+            for docs, _, _ in postings:
+                scores[docs] = 0
+
+    def chunk(self, doc: int) -> RetrievedChunk:
+        """The indexed chunk at position `doc`."""
+
+        source = self._decode("sources", "source_offsets", doc)
+        return RetrievedChunk(
+            chunk_id=self._decode("ids", "id_offsets", doc),
+            text=self._decode("texts", "text_offsets", doc),
+            source=None if source == "\0" else source,
+        )
+
+    def _decode(self, blob: str, offsets: str, doc: int) -> str:
+        off = self._a[offsets]
+        lo, hi = int(off[doc]), int(off[doc + 1])
+        return self._a[blob][lo:hi].tobytes().decode("utf-8", "surrogatepass")
+
+    def search(self, query: str, *, k: int = 10) -> list[RetrievedChunk]:
+        """The best k chunks for `query`, ready for bundle_retrieved_chunks."""
+
+        docs, _ = self.top_k(query, k)
+        return [self.chunk(int(doc)) for doc in docs]
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
 
+from collections.abc import Iterable, Sequence
 from dataclasses import dataclass
-from typing import Iterable
+from operator import attrgetter
+from typing import Literal
 
 
+from context_engineering.context.buffer import ConversationBuffer, MessageViews
+from context_engineering.context.tokens import TokenCounter, Tokenizer
 from context_engineering.types import Message
 
 
@@ -12,10 +16,79 @@ from context_engineering.types import Message
 
 @dataclass(frozen=True)
 class Budget:
-    max_chars: int
+    """A context budget measured in characters (default) or tokens.
 
+    Set exactly one of `max_chars` or `max_tokens`. Token budgets carry a
+    TokenCounter that memoizes per-message counts for the life of the budget.
+    """
 
+    max_chars: int | None = None
+    max_tokens: int | None = None
+    counter: TokenCounter | None = None
 
+    def __post_init__(self) -> None:
+        if (self.max_chars is None) == (self.max_tokens is None):
+            raise ValueError("Budget needs exactly one of max_chars or max_tokens")
+        if self.max_tokens is not None and self.counter is None:
+            object.__setattr__(self, "counter", TokenCounter())
 
-def size_chars(messages: Iterable[Message]) -> int:
-    return sum(len(m.content) for m in messages)
\ No newline at end of file
+    @classmethod
+    def tokens(cls, max_tokens: int, tokenizer: Tokenizer | None = None) -> Budget:
+        return cls(max_tokens=max_tokens, counter=TokenCounter(tokenizer))
+
+    @property
+    def unit(self) -> Literal["chars", "tokens"]:
+        return "chars" if self.max_tokens is None else "tokens"
+
+    @property
+    def limit(self) -> int:
+        return self.max_chars if self.max_tokens is None else self.max_tokens  # type: ignore[return-value]
+
+    def measure(self, text: str, *, cache: bool = True) -> int:
+        """Size of `text` in this budget's unit.
+
+        Use cache=False for throwaway strings (e.g. truncation candidates).
+        """
+
+        if self.counter is None:
+            return len(text)
+        if cache:
+            return self.counter.count(text)
+        return self.counter.tokenizer.count(text)
+
+    def sizes(self, messages: Iterable[Message] | ConversationBuffer) -> Sequence[int]:
+        if isinstance(messages, ConversationBuffer):
+            if self.counter is None:
+                return messages.char_lengths
+            contents = messages.contents()
+        else:
+            contents = map(attrgetter("content"), messages)
+        if self.counter is None:
+            return list(map(len, contents))
+        return list(map(self.counter.count, contents))
+
+    def truncate(self, text: str, limit: int) -> str:
+        """Longest `prefix.rstrip() + "…"` of text that measures <= limit."""
+
+        if self.counter is None:
+            return text[: max(0, limit - 1)].rstrip() + "…"
+
+        def fits(k: int) -> bool:
+            return self.measure(text[:k].rstrip() + "…", cache=False) <= limit
+
+        lo, hi = 0, len(text)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if fits(mid):
+                lo = mid
+            else:
+                hi = mid - 1
+        return text[:lo].rstrip() + "…"
+
+
+
+
+def size_chars(messages: Iterable[Message] | ConversationBuffer) -> int:
+    if isinstance(messages, (ConversationBuffer, MessageViews)):
+        return messages.num_chars
+    return sum(len(m.content) for m in messages)
@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import repeat
+from typing import Any, Self, overload
+
+from context_engineering.types import Message
+
+# Role codes are positions in this tuple; they match batch.role_codes, so
+# role_codes / char_lengths can be passed straight to select_many. Roles outside
+# the tuple get codes >= len(_ROLES), which select_many treats as "other".
+_ROLES = ("system", "developer", "user", "assistant", "tool")
+
+# File layout (all integers in native byte order, recorded in the header):
+#   header | offsets int64[n + 1] | chars int64[n] | roles uint8[n] | pad to 8 |
+#   arena (UTF-8) | trailer (JSON: role table, names, meta)
+_MAGIC = b"CEBUF1"
+# magic, byte order, n, total chars, arena bytes, trailer bytes
+_HEADER = struct.Struct("=6s2sqqqq")
+_BYTE_ORDER = b"LE" if sys.byteorder == "little" else b"BE"
+
+
+class MessageView:
+    """Lazy, read-only view of one message in a ConversationBuffer.
+
+    Has the same fields as Message; `content` is decoded from the arena on
+    access, while `length` and `role` come straight from the arrays.
+    """
+
+    __slots__ = ("_buf", "_i")
+
+    def __init__(self, buf: ConversationBuffer, i: int) -> None:
+        self._buf = buf
+        self._i = i
+
+    @property
+    def role(self) -> str:
+        return self._buf.role(self._i)
+
+    @property
+    def content(self) -> str:
+        return self._buf.content(self._i)
+
+    @property
+    def content_bytes(self) -> memoryview:
+        return self._buf.content_bytes(self._i)
+
+    @property
+    def length(self) -> int:
+        return self._buf.char_lengths[self._i]
+
+    @property
+    def name(self) -> str | None:
+        return self._buf._names.get(self._i)
+
+    @property
+    def meta(self) -> dict[str, Any] | None:
+        return self._buf._meta.get(self._i)
+
+    def to_message(self) -> Message:
+        return Message(
+            role=self.role,  # type: ignore[arg-type]
+            content=self.content,
+            name=self.name,
+            meta=self.meta,
+        )
+
+    def __repr__(self) -> str:
+        return f"MessageView(index={self._i}, role={self.role!r}, length={self.length})"
+
+
+class MessageViews(Sequence[MessageView]):
+    """A selection of buffer messages, held as an index array.
+
+    Packers return these for ConversationBuffer input, so a result over a huge
+    history costs 8 bytes per message instead of one object per message.
+    Compares equal to any sequence with the same messages.
+    """
+
+    __slots__ = ("_buf", "indices")
+
+    def __init__(self, buf: ConversationBuffer, indices: Iterable[int]) -> None:
+        self._buf = buf
+        self.indices = array("q", indices)
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    @overload
+    def __getitem__(self, i: int) -> MessageView: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> MessageViews: ...
+
+    def __getitem__(self, i: int | slice) -> MessageView | MessageViews:
+        if isinstance(i, slice):
+            return MessageViews(self._buf, self.indices[i])
+        return MessageView(self._buf, self.indices[i])
+
+    def __iter__(self) -> Iterator[MessageView]:
+        return map(MessageView, repeat(self._buf), self.indices)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            a.role == b.role and a.content == b.content and a.name == b.name and a.meta == b.meta
+            for a, b in zip(self, other)
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    @property
+    def num_chars(self) -> int:
+        chars = self._buf.char_lengths
+        return sum(map(chars.__getitem__, self.indices))
+
+    def __repr__(self) -> str:
+        return f"MessageViews({len(self)} messages)"
+
+
+class ConversationBuffer:
+    """Columnar message history: one UTF-8 text arena plus per-message arrays.
+
+    Per message it stores a byte offset, a char length and a role code
+    (25 bytes), instead of a Message object per turn. Names and meta are
+    rare and live in sparse dicts. Indexing returns MessageView objects;
+    content_bytes gives a zero-copy memoryview into the arena.
+
+    size_chars, compute_stats, Budget.sizes and the packers recognize a
+    buffer and work on the arrays directly, without building Message objects;
+    the packers return MessageViews (index arrays) as packed/dropped.
+
+    save() writes the arrays and arena to a file and open() memory-maps it
+    back: opening costs O(1) reads regardless of size (plus the JSON trailer
+    for names/meta), and pages load on first touch. Opened buffers are
+    read-only.
+    """
+
+    def __init__(self, messages: Iterable[Message] = ()) -> None:
+        self._arena: Any = bytearray()
+        self._offsets: Any = array("q", [0])
+        self._chars: Any = array("q")
+        self._codes: Any = array("B")
+        self._role_table: list[str] = list(_ROLES)
+        self._role_index = {r: i for i, r in enumerate(_ROLES)}
+        self._names: dict[int, str] = {}
+        self._meta: dict[int, dict[str, Any]] = {}
+        self._total_chars = 0
+        self._mmap: mmap.mmap | None = None
+        self.extend(messages)
+
+    # building
+
+    def append(
+        self,
+        role: str,
+        content: str,
+        *,
+        name: str | None = None,
+        meta: dict[str, Any] | None = None,
+    ) -> None:
+        if self._mmap is not None:
+            raise TypeError("ConversationBuffer opened from a file is read-only")
+        code = self._role_index.get(role)
+        if code is None:
+            if len(self._role_table) > 255:
+                raise ValueError("ConversationBuffer supports at most 256 distinct roles")
+            code = len(self._role_table)
+            self._role_table.append(role)
+            self._role_index[role] = code
+        i = len(self._chars)
+        self._arena += content.encode("utf-8")
+        self._offsets.append(len(self._arena))
+        self._chars.append(len(content))
+        self._codes.append(code)
+        self._total_chars += len(content)
+        if name is not None:
+            self._names[i] = name
+        if meta is not None:
+            self._meta[i] = meta
+
+    def extend(self, messages: Iterable[Message]) -> None:
+        for m in messages:
+            self.append(m.role, m.content, name=m.name, meta=m.meta)  # type: ignore[arg-type]
+
+    # access
+
+    def __len__(self) -> int:
+        return len(self._chars)
+
+    def __getitem__(self, i: int) -> MessageView:
+        n = len(self._chars)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("ConversationBuffer index out of range")
+        return MessageView(self, i)
+
+    def __iter__(self) -> Iterator[MessageView]:
+        return map(MessageView, repeat(self), range(len(self)))
+
+    @property
+    def num_chars(self) -> int:
+        return self._total_chars
+
+    @property
+    def char_lengths(self) -> Any:
+        """Char length per message (int64 array or memoryview)."""
+
+        return self._chars
+
+    @property
+    def role_codes(self) -> Any:
+        """Role code per message (uint8 array or memoryview); see batch.role_codes."""
+
+        return self._codes
+
+    def take(self, indices: Iterable[int]) -> MessageViews:
+        return MessageViews(self, indices)
+
+    def role(self, i: int) -> str:
+        return self._role_table[self._codes[i]]
+
+    def roles(self) -> list[str]:
+        """Role string per message. The strings are shared, only the list is new."""
+
+        return list(map(self._role_table.__getitem__, self._codes))
+
+    def content_bytes(self, i: int) -> memoryview:
+        """Zero-copy UTF-8 bytes of message i.
+
+        While a view is alive the buffer cannot grow (or close), so release it
+        (or let it go out of scope) before appending.
+        """
+
+        return memoryview(self._arena)[self._offsets[i] : self._offsets[i + 1]]
+
+    def content(self, i: int) -> str:
+        return str(self._arena[self._offsets[i] : self._offsets[i + 1]], "utf-8")
+
+    def contents(self) -> Iterator[str]:
+        return map(self.content, range(len(self)))
+
+    # persistence
+
+    def save(self, path: str | os.PathLike[str]) -> None:
+        """Write the buffer to `path` in the format open() maps. Meta must be JSON-serializable."""
+
+        n = len(self)
+        trailer = json.dumps(
+            {
+                "roles": self._role_table,
+                "names": {str(i): v for i, v in self._names.items()},
+                "meta": {str(i): v for i, v in self._meta.items()},
+            }
+        ).encode("utf-8")
+        arena = memoryview(self._arena)[: self._offsets[n]]
+        with open(path, "wb") as f:
+            f.write(
+                _HEADER.pack(
+                    _MAGIC, _BYTE_ORDER, n, self._total_chars, len(arena), len(trailer)
+                )
+            )
+            f.write(memoryview(self._offsets).cast("B"))
+            f.write(memoryview(self._chars).cast("B"))
+            f.write(memoryview(self._codes).cast("B"))
+            f.write(b"\0" * (-n % 8))
+            f.write(arena)
+            f.write(trailer)
+
+    @classmethod
+    def open(cls, path: str | os.PathLike[str]) -> ConversationBuffer:
+        """Memory-map a file written by save(). The arrays and arena are not copied."""
+
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mm) < _HEADER.size:
+            raise ValueError(f"{path}: not a ConversationBuffer file")
+        magic, order, n, total, arena_len, trailer_len = _HEADER.unpack_from(mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path}: not a ConversationBuffer file")
+        if order != _BYTE_ORDER:
+            raise ValueError(f"{path}: written on a machine with a different byte order")
+
+        view = memoryview(mm)
+        pos = _HEADER.size
+        offsets = view[pos : pos + 8 * (n + 1)].cast("q")
+        pos += 8 * (n + 1)
+        chars = view[pos : pos + 8 * n].cast("q")
+        pos += 8 * n
+        codes = view[pos : pos + n]
+        pos += n + (-n % 8)
+        arena = view[pos : pos + arena_len]
+        pos += arena_len
+        trailer = json.loads(bytes(view[pos : pos + trailer_len]))
+
+        buf = cls.__new__(cls)
+        buf._arena = arena
+        buf._offsets = offsets
+        buf._chars = chars
+        buf._codes = codes
+        buf._role_table = trailer["roles"]
+        buf._role_index = {r: i for i, r in enumerate(buf._role_table)}
+        buf._names = {int(i): v for i, v in trailer["names"].items()}
+        buf._meta = {int(i): v for i, v in trailer["meta"].items()}
+        buf._total_chars = total
+        buf._mmap = mm
+        return buf
+
+    def close(self) -> None:
+        """Release the file mapping of an opened buffer (views into it become invalid)."""
+
+        if self._mmap is not None:
+            for name in ("_arena", "_offsets", "_chars", "_codes"):
+                getattr(self, name).release()
+            self._mmap.close()
+            self._mmap = None
+            self._arena, self._offsets = bytearray(), array("q", [0])
+            self._chars, self._codes = array("q"), array("B")
+            self._names, self._meta, self._total_chars = {}, {}, 0
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import chain, repeat
+
+from context_engineering.context.budget import Budget
+from context_engineering.context.digest import _with_digest, digest_messages, digest_text_to_budget
+from context_engineering.context.tokens import TokenCounter
+from context_engineering.types import Message
+
+# Below this many messages, starting workers and pickling costs more than it saves.
+_MIN_PARALLEL = 2_000
+# Batches per worker: enough to even out uneven batches without per-message IPC.
+_BATCHES_PER_WORKER = 4
+
+
+def _digest_batch(
+    contents: list[str], budget: Budget
+) -> list[tuple[str, int | None, int | None]]:
+    """Worker side: (digest text, original tokens, digest tokens) per content.
+
+    Skips the digest cache: a forked worker inherits the parent's, including
+    a DiskCache connection and lock that must not be shared across processes.
+    """
+
+    out: list[tuple[str, int | None, int | None]] = []
+    for content in contents:
+        text = digest_text_to_budget(content, budget, cache=False).text
+        if budget.unit == "tokens":
+            out.append((text, budget.measure(content), budget.measure(text)))
+        else:
+            out.append((text, None, None))
+    return out
+
+
+def digest_messages_parallel(
+    messages: list[Message],
+    *,
+    max_chars_per_message: int | None = None,
+    budget_per_message: Budget | None = None,
+    workers: int | None = None,
+    batch_size: int | None = None,
+    executor: Executor | None = None,
+    min_parallel: int = _MIN_PARALLEL,
+) -> list[Message]:
+    """digest_messages for bulk jobs, spread over a process pool.
+
+    Same arguments and the same output (order, content, meta["digest"]) as
+    digest_messages. Contents are sent to workers in batches (default: about
+    four per worker) so pickling is paid per batch, not per message, and only
+    the digest text comes back.
+
+    Inputs smaller than `min_parallel`, or workers=1 without an executor, run
+    in-process. Pass `executor` to reuse a pool across calls instead of
+    starting one; `workers` then only sizes the batches.
+    Token budgets need a picklable tokenizer; workers get fresh counters.
+    """
+
+    if (max_chars_per_message is None) == (budget_per_message is None):
+        raise ValueError("Pass exactly one of max_chars_per_message or budget_per_message")
+    budget = budget_per_message or Budget(max_chars=max_chars_per_message)
+
+    n = len(messages)
+    workers = workers or os.cpu_count() or 1
+    if n < min_parallel or (executor is None and workers <= 1):
+        return digest_messages(messages, budget_per_message=budget)
+
+    if budget.unit == "tokens":
+        # Ship the tokenizer, not the parent's (possibly large) count cache.
+        counter = TokenCounter(budget.counter.tokenizer)  # type: ignore[union-attr]
+        budget = Budget(max_tokens=budget.max_tokens, counter=counter)
+    if batch_size is None:
+        batch_size = max(1, -(-n // (workers * _BATCHES_PER_WORKER)))
+    batches = [
+        [m.content for m in messages[i : i + batch_size]] for i in range(0, n, batch_size)
+    ]
+
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_digest_batch, batches, repeat(budget)))
+    else:
+        results = list(executor.map(_digest_batch, batches, repeat(budget)))
+
+    return [
+        _with_digest(m, text, original_tokens, digest_tokens)
+        for m, (text, original_tokens, digest_tokens) in zip(
+            messages, chain.from_iterable(results)
+        )
+    ]
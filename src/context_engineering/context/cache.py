@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    disk_hits: int  # misses in memory that the disk tier answered
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups answered by either tier (0.0 before any lookup)."""
+
+        lookups = self.hits + self.disk_hits + self.misses
+        return (self.hits + self.disk_hits) / lookups if lookups else 0.0
+
+
+def content_key(namespace: str, content: str, *params: object) -> str:
+    """Cache key for `content`: namespace (name + algorithm version), params, BLAKE2b digest."""
+
+    digest = hashlib.blake2b(content.encode("utf-8", "surrogatepass"), digest_size=16)
+    return ":".join([namespace, *map(str, params), digest.hexdigest()])
+
+
+class DiskCache:
+    """SQLite-backed key/value tier, so cached entries survive process restarts.
+
+    Safe to share between threads. Several processes can point at the same
+    file; SQLite serializes the writes (WAL mode).
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = os.fspath(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT)")
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?)", (key, value))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM cache")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class LRUCache:
+    """Bounded in-memory str -> str cache with LRU eviction and an optional disk tier.
+
+    Evicts least recently used entries once either `max_entries` or
+    `max_bytes` (key + value object sizes) is exceeded. A memory miss falls
+    through to `disk` when given; disk hits are promoted back into memory and
+    every set() is written through. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 10_000,
+        max_bytes: int = 64 << 20,
+        disk: DiskCache | None = None,
+    ) -> None:
+        if max_entries <= 0 or max_bytes <= 0:
+            raise ValueError("max_entries and max_bytes must be positive")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self._data: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = self._disk_hits = self._misses = self._evictions = 0
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+                self._hits += 1
+                return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                with self._lock:
+                    self._disk_hits += 1
+                    self._insert(key, value)
+                return value
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._insert(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def get_or_compute(self, key: str, compute: Callable[[], str]) -> str:
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def _insert(self, key: str, value: str) -> None:
+        old = self._data.pop(key, None)
+        if old is not None:
+            self._bytes -= sys.getsizeof(key) + sys.getsizeof(old)
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        if size > self.max_bytes:
+            return  # would evict everything and still not fit
+        self._data[key] = value
+        self._bytes += size
+        while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+            k, v = self._data.popitem(last=False)
+            self._bytes -= sys.getsizeof(k) + sys.getsizeof(v)
+            self._evictions += 1
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                disk_hits=self._disk_hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._data),
+                bytes=self._bytes,
+            )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        """Drop the in-memory entries and reset the counters (the disk tier is kept)."""
+
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self._hits = self._disk_hits = self._misses = self._evictions = 0
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import os
+import re
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from functools import partial
+
+from context_engineering.context.retrieval_bundle import RetrievedChunk
+
+# Characters read from a file per step.
+_READ = 1 << 20
+# Reads per pool task: a worker hands back the chunks of this many steps.
+_PART_READS = 1
+# Per file being chunked in a pool, finished parts held before its turn comes.
+_AHEAD = 2
+# Markdown heading at the start of a line; a heading cut goes right after the "\n".
+_HEADING = re.compile(r"\n#{1,6}[ \t]")
+
+
+def _cut(buf: str, pos: int, max_chars: int, align_headings: bool) -> tuple[int, bool]:
+    """(end of the chunk starting at buf[pos], whether it ends before a heading)."""
+
+    if align_headings:
+        # The last heading in the second half of the window, so chunks stay
+        # at least half full.
+        last = None
+        for last in _HEADING.finditer(buf, pos + max_chars // 2, pos + max_chars):
+            pass
+        if last is not None:
+            return last.start() + 1, True
+    return pos + max_chars, False
+
+
+class _Chunker:
+    """chunk_text_stream state between pieces: the unchunked tail and its offset."""
+
+    def __init__(
+        self,
+        source: str,
+        max_chars: int,
+        overlap: int,
+        align_headings: bool,
+        tail: str = "",
+        start: int = 0,
+    ) -> None:
+        if max_chars <= 0 or not 0 <= overlap < max_chars:
+            raise ValueError("Need max_chars > 0 and 0 <= overlap < max_chars")
+        self.source = source
+        self.max_chars = max_chars
+        self.overlap = overlap
+        self.align_headings = align_headings
+        self.tail = tail
+        self.start = start  # offset of tail[0] in the whole text
+
+    def feed(self, piece: str) -> Iterator[RetrievedChunk]:
+        # Chunks advance a cursor; the text is only re-sliced once per piece.
+        buf = self.tail + piece
+        pos = 0  # start of the next chunk in buf
+        while len(buf) - pos > self.max_chars:
+            end, at_heading = _cut(buf, pos, self.max_chars, self.align_headings)
+            yield RetrievedChunk(
+                chunk_id=f"{self.source}#{self.start}", text=buf[pos:end], source=self.source
+            )
+            step = end - pos if at_heading else end - pos - self.overlap
+            pos += step
+            self.start += step
+        self.tail = buf[pos:]
+
+    def finish(self) -> Iterator[RetrievedChunk]:
+        if self.tail:
+            yield RetrievedChunk(
+                chunk_id=f"{self.source}#{self.start}", text=self.tail, source=self.source
+            )
+            self.tail = ""
+
+
+def chunk_text_stream(
+    pieces: Iterable[str],
+    *,
+    source: str,
+    max_chars: int = 2000,
+    overlap: int = 200,
+    align_headings: bool = True,
+) -> Iterator[RetrievedChunk]:
+    """Split text arriving in pieces into chunks of at most max_chars.
+
+    Chunks are fixed-size windows where each starts `overlap` chars before the
+    previous one ended. With align_headings, a chunk instead ends just before
+    the last markdown heading line in its second half, and the next chunk
+    starts at that heading (no overlap is needed there).
+
+    chunk_id is f"{source}#{offset}", offset being the chunk's first character
+    in the whole text, so ids are stable across runs and re-chunking the same
+    text. Only about max_chars plus one piece is held in memory.
+    """
+
+    chunker = _Chunker(source, max_chars, overlap, align_headings)
+    for piece in pieces:
+        yield from chunker.feed(piece)
+    yield from chunker.finish()
+
+
+def chunk_file(
+    path: str | os.PathLike[str],
+    *,
+    source: str | None = None,
+    encoding: str = "utf-8",
+    max_chars: int = 2000,
+    overlap: int = 200,
+    align_headings: bool = True,
+) -> Iterator[RetrievedChunk]:
+    """chunk_text_stream over a file read in buffered steps, never whole.
+
+    `source` defaults to the path. Newlines are kept as in the file, so
+    offsets index into its decoded text.
+    """
+
+    source = os.fspath(path) if source is None else source
+    with open(path, encoding=encoding, newline="") as f:
+        yield from chunk_text_stream(
+            iter(partial(f.read, _READ), ""),
+            source=source,
+            max_chars=max_chars,
+            overlap=overlap,
+            align_headings=align_headings,
+        )
+
+
+# Where a file part starts: text-mode seek cookie, unchunked tail, its offset.
+_Resume = tuple[int, str, int]
+
+
+def _chunk_part(
+    path: str,
+    resume: _Resume,
+    *,
+    encoding: str,
+    max_chars: int,
+    overlap: int,
+    align_headings: bool,
+) -> tuple[list[RetrievedChunk], _Resume | None]:
+    """Worker side: the chunks of a file's next _PART_READS read steps.
+
+    Also returns where the part after it starts, or None at the end of the file.
+    """
+
+    cookie, tail, start = resume
+    chunker = _Chunker(path, max_chars, overlap, align_headings, tail=tail, start=start)
+    chunks: list[RetrievedChunk] = []
+    with open(path, encoding=encoding, newline="") as f:
+        f.seek(cookie)
+        for _ in range(_PART_READS):
+            piece = f.read(_READ)
+            if not piece:
+                chunks.extend(chunker.finish())
+                return chunks, None
+            chunks.extend(chunker.feed(piece))
+        return chunks, (f.tell(), chunker.tail, chunker.start)
+
+
+class _FileParts:
+    """Driver side: one file being chunked part by part in a pool."""
+
+    __slots__ = ("path", "ready", "resume", "running")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.ready: deque[list[RetrievedChunk]] = deque()
+        self.running: Future | None = None
+        self.resume: _Resume | None = (0, "", 0)  # None once the last part is in
+
+    def advance(self, submit: Callable[[str, _Resume], Future]) -> None:
+        """Collect a finished part; start the next unless _AHEAD parts wait."""
+
+        if self.running is not None and self.running.done():
+            chunks, self.resume = self.running.result()
+            self.ready.append(chunks)
+            self.running = None
+        if self.running is None and self.resume is not None and len(self.ready) < _AHEAD:
+            self.running = submit(self.path, self.resume)
+
+    @property
+    def finished(self) -> bool:
+        return self.running is None and self.resume is None and not self.ready
+
+
+def _pool_chunks(
+    executor: Executor, paths: list[str], window: int, options: dict[str, object]
+) -> Iterator[RetrievedChunk]:
+    """Chunks of `paths` in order, with at most `window` files in flight."""
+
+    def submit(path: str, resume: _Resume) -> Future:
+        return executor.submit(_chunk_part, path, resume, **options)  # type: ignore[arg-type]
+
+    todo = iter(paths)
+    active: deque[_FileParts] = deque()
+    while True:
+        while len(active) < window and (path := next(todo, None)) is not None:
+            active.append(_FileParts(path))
+        if not active:
+            return
+        for f in active:
+            f.advance(submit)
+        head = active[0]
+        if head.ready:
+            yield from head.ready.popleft()
+        elif head.finished:
+            active.popleft()
+        else:
+            wait([f.running for f in active if f.running is not None], return_when=FIRST_COMPLETED)
+
+
+def chunk_files(
+    paths: Iterable[str | os.PathLike[str]],
+    *,
+    workers: int | None = None,
+    executor: Executor | None = None,
+    encoding: str = "utf-8",
+    max_chars: int = 2000,
+    overlap: int = 200,
+    align_headings: bool = True,
+) -> Iterator[RetrievedChunk]:
+    """chunk_file over many files, spread over a process pool.
+
+    Chunks come back in file order, then offset order, with the same ids as
+    chunk_file. Workers chunk a file in parts of one read step (1M chars) and
+    resume where the previous part stopped, so a task hands back a bounded
+    batch however large the file is. At most 2 * workers files are in flight,
+    each with one running part and up to two finished ones, so memory stays
+    bounded too. A single file, or workers=1 without an executor, runs
+    in-process; pass `executor` to reuse a pool.
+    """
+
+    paths = [os.fspath(p) for p in paths]
+    options: dict[str, object] = {
+        "encoding": encoding,
+        "max_chars": max_chars,
+        "overlap": overlap,
+        "align_headings": align_headings,
+    }
+    workers = workers or os.cpu_count() or 1
+    if len(paths) < 2 or (executor is None and workers <= 1):
+        for p in paths:
+            yield from chunk_file(p, **options)  # type: ignore[arg-type]
+        return
+
+    window = 2 * workers
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from _pool_chunks(pool, paths, window, options)
+    else:
+        yield from _pool_chunks(executor, paths, window, options)
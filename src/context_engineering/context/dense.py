@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import json
+import os
+from array import array
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+from context_engineering.context.retrieval_bundle import RetrievedChunk
+
+try:  # NumPy is optional: pip install "context-engineering-labs[fast]"
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without the extra
+    np = None  # type: ignore[assignment]
+
+# Bump whenever the embedding or the on-disk layout changes.
+_DENSE_VERSION = "dense-v1"
+
+# Chunks embedded and written per step while building.
+_BUILD_BATCH = 4096
+# Upper bound on the query x block score matrix during a scan.
+_SCORE_BYTES = 32 << 20
+_NGRAMS = (3, 4)
+# Odd 64-bit multipliers, one per n-gram length, so 3- and 4-grams do not collide.
+_MIX = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F)
+_BLOBS = ("texts", "ids", "sources")
+
+
+def _require_numpy() -> Any:
+    if np is None:
+        raise ImportError(
+            "DenseIndex needs NumPy. Install it with: pip install 'context-engineering-labs[fast]'"
+        )
+    return np
+
+
+def embed_texts(texts: Sequence[str], *, dim: int = 256) -> Any:
+    """Deterministic offline embeddings: hashed character 3- and 4-grams.
+
+    Each text is lowercased with whitespace collapsed; its UTF-8 byte n-grams
+    are hashed into `dim` signed buckets and the vector is L2-normalized, so
+    a dot product is the cosine similarity. All texts are embedded in one
+    vectorized pass. Returns a float32 array of shape (len(texts), dim).
+    """
+
+    _require_numpy()
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    if not texts:
+        return out
+    encoded = [
+        (" " + " ".join(t.lower().split()) + " ").encode("utf-8", "surrogatepass") for t in texts
+    ]
+    ends = np.cumsum([len(e) for e in encoded])
+    b = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+
+    flat = np.zeros(len(texts) * dim, dtype=np.float64)
+    for n, mix in zip(_NGRAMS, _MIX):
+        if len(b) < n:
+            continue
+        h = np.zeros(len(b) - n + 1, dtype=np.uint64)
+        for j in range(n):
+            h = (h << np.uint64(8)) | b[j : len(b) - n + 1 + j]
+        # Keep only n-grams inside one text.
+        start = np.arange(len(h))
+        doc = np.searchsorted(ends, start, side="right")
+        valid = start + n <= ends[doc]
+        h = h[valid] * np.uint64(mix)
+        doc = doc[valid]
+        bucket = ((h >> np.uint64(32)) % np.uint64(dim)).astype(np.int64)
+        sign = 1.0 - 2.0 * ((h >> np.uint64(31)) & np.uint64(1)).astype(np.float64)
+        flat += np.bincount(doc * dim + bucket, weights=sign, minlength=len(flat))
+
+    out[:] = flat.reshape(len(texts), dim)
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    np.divide(out, norms, out=out, where=norms > 0)
+    return out
+
+
+def _best_columns(scores: Any, k: int) -> Any:
+    """Columns of the k best scores per row; ties at the k-th go to lower columns."""
+
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    picked = np.take_along_axis(scores, part, axis=1)
+    kth = picked.min(axis=1, keepdims=True)
+    # argpartition keeps an arbitrary subset of the scores tied at the k-th
+    # place; redo the rows where it had to choose.
+    redo = (scores == kth).sum(axis=1) > (picked == kth).sum(axis=1)
+    if redo.any():
+        s, t = scores[redo], kth[redo]
+        above, tied = s > t, s == t
+        room = k - above.sum(axis=1, keepdims=True)
+        keep = above | (tied & (np.cumsum(tied, axis=1) <= room))
+        part[redo] = np.nonzero(keep)[1].reshape(len(s), k)
+    return part
+
+
+class DenseIndex:
+    """Dense retriever over a memory-mapped float32 embedding matrix.
+
+    Files in the index directory:
+    - embeddings.f32: row i is embed_texts(chunk i's text), raw float32
+    - texts.bin, ids.bin, sources.bin and offsets.npy: the chunks, UTF-8
+    - meta.json: version, dim and row count
+
+    top_k scores a batch of queries with one matrix multiply per block of
+    rows and keeps the running best k per query with a partition, so memory
+    stays bounded (about _SCORE_BYTES plus one block) however large the
+    matrix is; the OS pages blocks in and out of the memmap.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        _require_numpy()
+        self.path = os.fspath(path)
+        with open(os.path.join(self.path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != _DENSE_VERSION:
+            raise ValueError(f"{self.path}: unsupported dense index {meta.get('version')!r}")
+        self.dim: int = meta["dim"]
+        self._n: int = meta["rows"]
+        self._offsets = np.load(os.path.join(self.path, "offsets.npy"), mmap_mode="r")
+        self._blobs = [self._map(f"{name}.bin", np.uint8) for name in _BLOBS]
+        self.embeddings = self._map("embeddings.f32", np.float32).reshape(self._n, self.dim)
+
+    def _map(self, name: str, dtype: Any) -> Any:
+        path = os.path.join(self.path, name)
+        # np.memmap cannot map an empty file.
+        if os.path.getsize(path):
+            return np.memmap(path, dtype=dtype, mode="r")
+        return np.zeros(0, dtype=dtype)
+
+    def __len__(self) -> int:
+        return self._n
+
+    @classmethod
+    def build(
+        cls,
+        chunks: Iterable[RetrievedChunk],
+        path: str | os.PathLike[str],
+        *,
+        dim: int = 256,
+    ) -> DenseIndex:
+        """Embed chunks into directory `path` and open the result.
+
+        Chunks are embedded and appended in batches, so building needs memory
+        for one batch, not the corpus.
+        """
+
+        _require_numpy()
+        os.makedirs(path, exist_ok=True)
+        at = os.path.join
+        # Per chunk: byte offsets into texts/ids/sources.
+        offsets = {name: array("q", [0]) for name in _BLOBS}
+        rows = 0
+        with (
+            open(at(path, "embeddings.f32"), "wb") as emb,
+            open(at(path, "texts.bin"), "wb") as texts,
+            open(at(path, "ids.bin"), "wb") as ids,
+            open(at(path, "sources.bin"), "wb") as sources,
+        ):
+            files = {"texts": texts, "ids": ids, "sources": sources}
+            batch: list[RetrievedChunk] = []
+
+            def flush() -> None:
+                emb.write(embed_texts([c.text for c in batch], dim=dim).tobytes())
+                for c in batch:
+                    # "\0" marks a missing source; an empty one stays "".
+                    source = "\0" if c.source is None else c.source
+                    for name, value in zip(_BLOBS, (c.text, c.chunk_id, source)):
+                        data = value.encode("utf-8", "surrogatepass")
+                        files[name].write(data)
+                        offsets[name].append(offsets[name][-1] + len(data))
+                batch.clear()
+
+            for c in chunks:
+                batch.append(c)
+                rows += 1
+                if len(batch) == _BUILD_BATCH:
+                    flush()
+            if batch:
+                flush()
+
+        table = np.stack([np.frombuffer(offsets[name], dtype=np.int64) for name in _BLOBS])
+        np.save(os.path.join(path, "offsets.npy"), table)
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": _DENSE_VERSION, "dim": dim, "rows": rows}, f)
+        return cls(path)
+
+    def top_k(
+        self, queries: Sequence[str], k: int = 10, *, block_rows: int | None = None
+    ) -> tuple[Any, Any]:
+        """(row indexes, scores), each of shape (len(queries), min(k, len(self))).
+
+        Rows are sorted best first per query; ties break by row index.
+        """
+
+        q = embed_texts(queries, dim=self.dim)
+        k = max(0, min(k, self._n))
+        n_q = len(queries)
+        best_i = np.zeros((n_q, 0), dtype=np.int64)
+        best_s = np.zeros((n_q, 0), dtype=np.float32)
+        if k == 0 or n_q == 0:
+            return best_i, best_s
+        if block_rows is None:
+            block_rows = max(k, _SCORE_BYTES // (4 * max(n_q, self.dim)))
+
+        for lo in range(0, self._n, block_rows):
+            block = np.asarray(self.embeddings[lo : lo + block_rows])
+            scores = q @ block.T
+            if scores.shape[1] > k:
+                part = _best_columns(scores, k)
+                scores = np.take_along_axis(scores, part, axis=1)
+            else:
+                part = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+            cand_i = np.concatenate((best_i, part + lo), axis=1)
+            cand_s = np.concatenate((best_s, scores), axis=1)
+            if cand_i.shape[1] > k:
+                keep = np.lexsort((cand_i, -cand_s), axis=1)[:, :k]
+                cand_i = np.take_along_axis(cand_i, keep, axis=1)
+                cand_s = np.take_along_axis(cand_s, keep, axis=1)
+            best_i, best_s = cand_i, cand_s
+
+        order = np.lexsort((best_i, -best_s), axis=1)
+        return np.take_along_axis(best_i, order, axis=1), np.take_along_axis(best_s, order, axis=1)
+
+    def chunk(self, row: int) -> RetrievedChunk:
+        """The indexed chunk at `row`."""
+
+        text, chunk_id, source = (
+            blob[int(off[row]) : int(off[row + 1])].tobytes().decode("utf-8", "surrogatepass")
+            for blob, off in zip(self._blobs, self._offsets)
+        )
+        return RetrievedChunk(
+            chunk_id=chunk_id, text=text, source=None if source == "\0" else source
+        )
+
+    def search(self, queries: Sequence[str], *, k: int = 10) -> list[list[RetrievedChunk]]:
+        """The best k chunks per query, each list ready for bundle_retrieved_chunks."""
+
+        rows, _ = self.top_k(queries, k)
+        return [[self.chunk(int(r)) for r in row] for row in rows]
@@ -1,10 +1,19 @@
 from __future__ import annotations
 
+import codecs
+import mmap
+import os
 import re
+from collections.abc import Callable, Iterable, Iterator
 from dataclasses import dataclass
+from typing import Literal
 
+from context_engineering.context.budget import Budget
+from context_engineering.context.cache import LRUCache, content_key
 from context_engineering.types import Message
 
+DigestAlgorithm = Literal["deterministic", "extractive"]
+
 
 @dataclass(frozen=True)
 class DigestResult:
@@ -16,6 +25,17 @@ class DigestResult:
 _heading = re.compile(r"^\s{0,3}#{1,6}\s+.+")
 _bullet = re.compile(r"^\s{0,8}([-*]|\d+\.)\s+.+")
 
+# Characters str.splitlines() breaks on.
+_LINE_BREAKS = "\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029"
+_CHUNK = 1 << 16
+
+# Bump whenever digest output changes, so cached digests (memory or disk) are not reused.
+_DIGEST_VERSION = "digest-v1"
+# Off by default: a capped digest stops early and costs O(max_chars), while a
+# cache key hashes the whole text, so caching only pays off for repeated
+# texts that are not much longer than the cap (or slow digests).
+_digest_cache: LRUCache | None = None
+
 
 def digest_text_deterministic(text: str, *, max_chars: int) -> DigestResult:
     """Deterministically compress text to <= max_chars.
@@ -30,27 +50,157 @@ def digest_text_deterministic(text: str, *, max_chars: int) -> DigestResult:
     3) If any content was dropped, append an ellipsis marker (…)
     4) If still too long, hard truncate to max_chars and end with …
 
-    This is intentionally naive but stable.
+    This is intentionally naive but stable. It runs in linear time and stops
+    matching lines as soon as the kept text is longer than max_chars; see
+    digest_stream / digest_file for inputs that are not in memory.
+
+    With a digest cache installed (see set_digest_cache; off by default),
+    results are memoized by content hash, max_chars and _DIGEST_VERSION.
+    """
+
+    cache = _digest_cache
+    if cache is None:
+        return _digest_text(text, max_chars)
+    key = content_key(_DIGEST_VERSION, text, max_chars)
+    out = cache.get(key)
+    if out is None:
+        d = _digest_text(text, max_chars)
+        cache.set(key, d.text)
+        return d
+    return DigestResult(text=out, original_chars=len(text), digest_chars=len(out))
+
+
+def get_digest_cache() -> LRUCache | None:
+    return _digest_cache
+
+
+def set_digest_cache(cache: LRUCache | None) -> None:
+    """Install the process-wide digest cache; None (the default) turns caching off.
+
+    Every lookup hashes the whole content, which costs more than a capped
+    digest of a long text (that digest stops after about max_chars), so
+    enable it for workloads that re-digest the same moderate-size texts, or
+    for the extractive digest. Pass LRUCache(disk=DiskCache(path)) to keep
+    digests across restarts.
+    """
+
+    global _digest_cache
+    _digest_cache = cache
+
+
+def _digest_text(text: str, max_chars: int) -> DigestResult:
+    chunks = (text[i : i + _CHUNK] for i in range(0, len(text), _CHUNK))
+    return _digest_chunks(chunks, max_chars, len(text))
+
+
+def digest_stream(chunks: Iterable[str], *, max_chars: int) -> DigestResult:
+    """digest_text_deterministic over text that arrives in pieces.
+
+    `chunks` are consecutive pieces of the text (file reads, lines with their
+    endings, ...); the result equals digest_text_deterministic("".join(chunks)).
+    Only one chunk plus the kept lines are held in memory.
     """
 
-    original_chars = len(text)
+    return _digest_chunks(chunks, max_chars)
+
+
+def digest_file(
+    path: str | os.PathLike[str], *, max_chars: int, encoding: str = "utf-8"
+) -> DigestResult:
+    """digest_text_deterministic over a file, memory-mapped and decoded incrementally."""
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return _digest_chunks((), max_chars)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            decoder = codecs.getincrementaldecoder(encoding)()
+
+            def decoded() -> Iterator[str]:
+                for i in range(0, len(mm), _CHUNK):
+                    yield decoder.decode(mm[i : i + _CHUNK])
+                yield decoder.decode(b"", final=True)
+
+            return _digest_chunks(decoded(), max_chars)
+
+
+def _lines(chunks: Iterable[str], counted: list[int]) -> Iterator[str]:
+    """Lines (with endings) of the concatenated chunks; adds each chunk's length to counted[0].
+
+    A "\r\n" split across two chunks comes out as an extra empty line, which
+    the digest ignores.
+    """
+
+    pending: list[str] = []
+    for chunk in chunks:
+        counted[0] += len(chunk)
+        parts = chunk.splitlines(True)
+        if not parts:
+            continue
+        if len(parts) == 1 and chunk[-1] not in _LINE_BREAKS:
+            pending.append(chunk)  # still inside one long line
+            continue
+        if pending:
+            parts[0] = "".join(pending) + parts[0]
+            pending = []
+        if parts[-1][-1] not in _LINE_BREAKS:
+            pending.append(parts.pop())
+        yield from parts
+    if pending:
+        yield "".join(pending)
+
+
+def _digest_chunks(
+    chunks: Iterable[str], max_chars: int, length: int | None = None
+) -> DigestResult:
+    out, original_chars, stopped = _kept_text(chunks, max_chars, length)
+    if stopped:
+        out = out[: max_chars - 1].rstrip() + "…"
+    else:
+        out = _finish(out, original_chars, max_chars)
+    return DigestResult(text=out, original_chars=original_chars, digest_chars=len(out))
+
 
-    lines = [ln.rstrip() for ln in text.splitlines()]
-    non_empty = [ln for ln in lines if ln.strip()]
+def _kept_text(
+    chunks: Iterable[str], max_chars: int, length: int | None = None
+) -> tuple[str, int, bool]:
+    """(kept lines joined, original chars, stopped early) before the finishing step.
+
+    When stopped, the joined text is a prefix of the uncapped one that is
+    already longer than max_chars. `length` is the total length of the chunks
+    when already known (an in-memory string); otherwise the rest of the
+    chunks is read to count it.
+    """
 
+    chunks = iter(chunks)
+    counted = [0]
     keep: list[str] = []
+    seen: set[str] = set()
+    size = 0  # len("\n".join(keep).strip()); kept lines never end in whitespace
+    stopped = False
 
-    # First 6 non-empty lines preserve the "opening" context.
-    keep.extend(non_empty[:6])
+    if max_chars != 0:
+        for line in _lines(chunks, counted):
+            ln = line.rstrip()
+            if not ln:
+                continue
+            # First 6 non-empty lines preserve the "opening" context.
+            # Headings + bullets preserve structured content.
+            if len(keep) >= 6 and (ln in seen or not (_heading.match(ln) or _bullet.match(ln))):
+                continue
+            size = size + 1 + len(ln) if keep else len(ln.lstrip())
+            keep.append(ln)
+            seen.add(ln)
+            if 0 < max_chars < size:
+                # Everything from here on can only end up past the hard cap.
+                stopped = True
+                break
 
-    # Headings + bullets preserve structured content.
-    for ln in lines:
-        if _heading.match(ln) or _bullet.match(ln):
-            if ln not in keep:
-                keep.append(ln)
+    if length is None:
+        length = counted[0] + sum(map(len, chunks))
+    return "\n".join(keep).strip(), length, stopped
 
-    out = "\n".join(keep).strip()
 
+def _finish(out: str, original_chars: int, max_chars: int) -> str:
     # If we dropped anything (lossy digest), mark it clearly.
     # This helps students see "compression happened" even when under budget.
     if original_chars > len(out) and max_chars > 0:
@@ -67,28 +217,120 @@ def digest_text_deterministic(text: str, *, max_chars: int) -> DigestResult:
         out = out[: max(0, max_chars - 1)].rstrip() + "…"
     elif max_chars == 0:
         out = ""
+    return out
 
-    return DigestResult(text=out, original_chars=original_chars, digest_chars=len(out))
 
+def _digest_functions(
+    algorithm: DigestAlgorithm,
+) -> tuple[Callable[..., DigestResult], Callable[[str, int], DigestResult]]:
+    """(cached digest(text, *, max_chars), uncached digest(text, max_chars)) for an algorithm."""
 
-def digest_messages(messages: list[Message], *, max_chars_per_message: int) -> list[Message]:
-    """Return a message list where each message content is deterministically digested."""
-
-    out: list[Message] = []
-    for m in messages:
-        d = digest_text_deterministic(m.content, max_chars=max_chars_per_message)
-        out.append(
-            Message(
-                role=m.role,
-                content=d.text,
-                name=m.name,
-                meta={
-                    **(m.meta or {}),
-                    "digest": {
-                        "original_chars": d.original_chars,
-                        "digest_chars": d.digest_chars,
-                    },
-                },
-            )
+    if algorithm == "deterministic":
+        return digest_text_deterministic, _digest_text
+    if algorithm == "extractive":
+        from context_engineering.context.extractive import (
+            _extract,
+            _require_numpy,
+            digest_text_extractive,
         )
-    return out
+
+        _require_numpy()
+        return digest_text_extractive, _extract
+    raise ValueError(f"Unknown digest algorithm: {algorithm!r}")
+
+
+def digest_text_to_budget(
+    text: str,
+    budget: Budget,
+    *,
+    algorithm: DigestAlgorithm = "deterministic",
+    cache: bool = True,
+) -> DigestResult:
+    """Digest text so it fits a (char or token) budget.
+
+    Char budgets map straight onto the digest's max_chars. For token budgets
+    we binary-search the largest char cap whose digest still fits; the
+    deterministic digest at any cap is a prefix of the full digest, so its
+    token count grows with it (extractive digests are only checked to fit).
+    cache=False leaves the digest cache alone, e.g. in pool workers.
+    """
+
+    digest, probe = _digest_functions(algorithm)
+    if budget.unit == "chars":
+        return digest(text, max_chars=budget.limit) if cache else probe(text, budget.limit)
+
+    # Probe digests bypass the cache; only the final one is stored.
+    def fits(cap: int) -> bool:
+        d = probe(text, cap)
+        return budget.measure(d.text, cache=False) <= budget.limit
+
+    lo, hi = 0, len(text) + 1
+    if fits(hi):
+        lo = hi
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if fits(mid):
+            lo = mid
+        else:
+            hi = mid - 1
+    return digest(text, max_chars=lo) if cache else probe(text, lo)
+
+
+def digest_message(
+    message: Message, budget: Budget, *, algorithm: DigestAlgorithm = "deterministic"
+) -> Message:
+    """Digest one message to fit `budget`, recording sizes under meta["digest"].
+
+    The result has the same class as `message` (Message or CompactMessage).
+    """
+
+    d = digest_text_to_budget(message.content, budget, algorithm=algorithm)
+    if budget.unit == "tokens":
+        return _with_digest(
+            message, d.text, budget.measure(message.content), budget.measure(d.text)
+        )
+    return _with_digest(message, d.text)
+
+
+def _with_digest(
+    message: Message,
+    text: str,
+    original_tokens: int | None = None,
+    digest_tokens: int | None = None,
+) -> Message:
+    """Copy of `message` with digest `text` and the meta["digest"] annotation."""
+
+    info = {"original_chars": len(message.content), "digest_chars": len(text)}
+    if original_tokens is not None:
+        info["original_tokens"] = original_tokens
+        info["digest_tokens"] = digest_tokens
+    return type(message)(
+        role=message.role,
+        content=text,
+        name=message.name,
+        meta={
+            **(message.meta or {}),
+            "digest": info,
+        },
+    )
+
+
+def digest_messages(
+    messages: list[Message],
+    *,
+    max_chars_per_message: int | None = None,
+    budget_per_message: Budget | None = None,
+    algorithm: DigestAlgorithm = "deterministic",
+) -> list[Message]:
+    """Return a message list where each message content is deterministically digested.
+
+    Pass either `max_chars_per_message` or a per-message Budget (which may be
+    token-based). Token budgets add token counts to the digest annotation.
+    algorithm="extractive" uses digest_text_extractive (needs NumPy).
+    """
+
+    if (max_chars_per_message is None) == (budget_per_message is None):
+        raise ValueError("Pass exactly one of max_chars_per_message or budget_per_message")
+    budget = budget_per_message or Budget(max_chars=max_chars_per_message)
+
+    return [digest_message(m, budget, algorithm=algorithm) for m in messages]
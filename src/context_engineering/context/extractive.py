@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+from typing import Any
+
+from context_engineering.context.cache import content_key
+from context_engineering.context.digest import DigestResult, get_digest_cache
+from context_engineering.context.knapsack import solve_knapsack
+
+try:  # NumPy is optional: pip install "context-engineering-labs[fast]"
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without the extra
+    np = None  # type: ignore[assignment]
+
+# Bump whenever the selection changes, so cached digests are not reused.
+_EXTRACTIVE_VERSION = "extractive-v2"
+
+# Hashing runs over blocks of about this many bytes to bound temporary arrays.
+_BLOCK = 1 << 20
+# Density-ranked candidates handed to the knapsack, in multiples of the budget.
+_CANDIDATE_BUDGETS = 2
+_HEADING_BOOST = 1.5
+
+_P = 1099511628211  # odd multiplier for the polynomial word hash
+_P_INV = pow(_P, -1, 1 << 64)
+
+
+def _tables() -> tuple[Any, Any, Any, Any]:
+    word = np.zeros(256, dtype=bool)
+    for lo, hi in ((48, 57), (65, 90), (97, 122), (128, 255)):
+        word[lo : hi + 1] = True
+    word[ord("_")] = True
+    space = np.zeros(256, dtype=bool)
+    space[list(b" \t\n\r\v\f")] = True
+    letter = np.zeros(256, dtype=bool)
+    for lo, hi in ((65, 90), (97, 122), (128, 255)):
+        letter[lo : hi + 1] = True
+    lower = np.arange(256, dtype=np.uint64)
+    lower[65:91] += 32
+    return word, space, letter, lower
+
+
+_WORD = _SPACE = _LETTER = _LOWER = None
+if np is not None:
+    _WORD, _SPACE, _LETTER, _LOWER = _tables()
+
+
+def _require_numpy() -> Any:
+    if np is None:
+        raise ImportError(
+            "digest_text_extractive needs NumPy. "
+            "Install it with: pip install 'context-engineering-labs[fast]'"
+        )
+    return np
+
+
+def _word_hashes(b: Any, starts: Any, ends: Any) -> Any:
+    """64-bit polynomial hash of each (lowercased) word b[starts[i]:ends[i]].
+
+    Prefix sums of c * P**i give any substring's hash times P**start, which
+    the inverse power removes. Done per block so temporaries stay small.
+    """
+
+    out = np.empty(len(starts), dtype=np.uint64)
+    n = len(b)
+    pw = ipw = np.empty(0, dtype=np.uint64)
+    w0 = 0
+    a = 0
+    while w0 < len(starts):
+        # Blocks end on a word end, so no word straddles two blocks.
+        w1 = int(np.searchsorted(ends, min(a + _BLOCK, n), side="right"))
+        w1 = max(w1, w0 + 1)
+        z = int(ends[w1 - 1])
+        m = z - a
+        if m > len(pw):
+            pw, ipw = _powers(_P, m), _powers(_P_INV, m)
+        prefix = np.zeros(m + 1, dtype=np.uint64)
+        np.cumsum(_LOWER[b[a:z]] * pw[:m], out=prefix[1:])
+        ws, we = starts[w0:w1] - a, ends[w0:w1] - a
+        out[w0:w1] = (prefix[we] - prefix[ws]) * ipw[ws]
+        w0, a = w1, z
+    return out
+
+
+def _powers(base: int, m: int) -> Any:
+    """base**i mod 2**64 for i in range(m)."""
+
+    pw = np.empty(m, dtype=np.uint64)
+    pw[0] = 1
+    pw[1:] = base
+    return np.cumprod(pw, out=pw)
+
+
+def _sorted_unique(keys: Any) -> Any:
+    # np.unique can be far slower than a plain sort on large uint64 arrays.
+    keys = np.sort(keys)
+    if len(keys) < 2:
+        return keys
+    return keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+
+
+def _extract(text: str, max_chars: int) -> DigestResult:
+    original_chars = len(text)
+    if max_chars == 0:
+        return DigestResult(text="", original_chars=original_chars, digest_chars=0)
+
+    raw = text.encode("utf-8", "surrogatepass")
+    b = np.frombuffer(raw, dtype=np.uint8)
+    n = len(b)
+
+    # Units: lines, further split after sentence punctuation that follows a letter.
+    newline = b == 10
+    body = b[1:-1]
+    stops = np.flatnonzero(((body == 46) | (body == 33) | (body == 63)) & (b[2:] == 32))
+    stops += 1
+    stops = stops[_LETTER[b[stops - 1]]]
+    cuts = np.sort(np.concatenate((np.flatnonzero(newline), stops)))
+    starts = np.concatenate(([0], cuts + 1))
+    ends = np.concatenate((cuts + 1, [n]))
+    line_of = np.concatenate(([0], np.cumsum(newline[cuts])))
+
+    # Strip each unit down to its non-space span.
+    solid = np.flatnonzero(~_SPACE[b])
+    if len(solid) == 0:
+        return DigestResult(text="", original_chars=original_chars, digest_chars=0)
+    first = np.searchsorted(solid, starts)
+    last = np.searchsorted(solid, ends) - 1
+    keep = first <= last
+    s = solid[first[keep]]
+    e = solid[last[keep]] + 1
+    line_of = line_of[keep]
+    n_units = len(s)
+
+    # Char lengths: bytes minus UTF-8 continuation bytes.
+    cont = np.flatnonzero((b & 0xC0) == 0x80)
+    chars = (e - s) - (np.searchsorted(cont, e) - np.searchsorted(cont, s))
+
+    # Words and the unit each belongs to.
+    word = _WORD[b]
+    edge = np.diff(word.astype(np.int8), prepend=0, append=0)
+    w_start = np.flatnonzero(edge == 1)
+    w_end = np.flatnonzero(edge == -1)
+    values = np.zeros(n_units)
+    duplicate = np.zeros(n_units, dtype=bool)
+    if len(w_start):
+        hashes = _word_hashes(b, w_start, w_end)
+        unit = np.searchsorted(s, w_start, side="right") - 1
+
+        # TF-IDF over units: each distinct term in a unit scores its smoothed idf.
+        if n_units < 1 << 24:
+            shift = np.uint64(24)
+            pairs = _sorted_unique((hashes >> shift << shift) | unit.astype(np.uint64))
+            p_term = pairs >> shift
+            p_unit = (pairs & np.uint64((1 << 24) - 1)).astype(np.int64)
+        else:
+            order = np.lexsort((unit, hashes))
+            h, u = hashes[order], unit[order]
+            new_pair = np.ones(len(h), dtype=bool)
+            new_pair[1:] = (h[1:] != h[:-1]) | (u[1:] != u[:-1])
+            p_term, p_unit = h[new_pair], u[new_pair]
+        new_term = np.flatnonzero(np.diff(p_term, prepend=p_term[:1] + np.uint64(1)))
+        df = np.diff(np.append(new_term, len(p_term)))
+        idf = np.log((1 + n_units) / (1 + df))
+        values = np.bincount(p_unit, weights=np.repeat(idf, df), minlength=n_units)
+
+        # Repeated units (same words in the same order) only count once.
+        heads = np.flatnonzero(np.diff(unit, prepend=-1))
+        run = np.diff(np.append(heads, len(unit)))
+        rank = np.arange(len(unit)) - np.repeat(heads, run)
+        mixed = hashes * (rank.astype(np.uint64) * np.uint64(2) + np.uint64(1))
+        signature = np.zeros(n_units, dtype=np.uint64)
+        signature[unit[heads]] = np.add.reduceat(mixed, heads)
+        signature ^= chars.astype(np.uint64) * np.uint64(_P)
+        _, first_seen = np.unique(signature, return_index=True)
+        duplicate[:] = True
+        duplicate[first_seen] = False
+        values[duplicate] = 0.0
+
+    # Position features: the opening and headings carry the most context.
+    values *= 1.0 + 1.0 / (1.0 + np.arange(n_units))
+    values[b[s] == 35] *= _HEADING_BOOST
+
+    if max_chars < 0:
+        chosen = np.arange(n_units)
+    else:
+        # Joined units cost len + 1 (separator or the trailing "…").
+        weights = chars + 1
+        total = int(weights.sum())
+        if total - 1 <= max_chars and not duplicate.any():
+            chosen = np.arange(n_units)
+        else:
+            cand = np.flatnonzero((values > 0) & (weights <= max_chars))
+            order = cand[np.argsort(-values[cand] / weights[cand], kind="stable")]
+            reach = np.searchsorted(
+                np.cumsum(weights[order]), _CANDIDATE_BUDGETS * max_chars, side="right"
+            )
+            order = np.sort(order[: reach + 1])
+            solution = solve_knapsack(
+                weights[order].tolist(), values[order].tolist(), max_chars
+            )
+            chosen = order[solution.chosen]
+
+    if len(chosen) == 0:
+        # Nothing fits whole: hard-truncate the most valuable unit.
+        best = int(np.argmax(values))
+        unit_text = raw[s[best] : e[best]].decode("utf-8", "surrogatepass")
+        out = unit_text[: max(0, max_chars - 1)].rstrip() + "…"
+    else:
+        out = _join(raw, s, e, line_of, chosen.tolist(), truncated=len(chosen) < n_units)
+    return DigestResult(text=out, original_chars=original_chars, digest_chars=len(out))
+
+
+def _join(raw: bytes, s: Any, e: Any, line_of: Any, chosen: list[int], *, truncated: bool) -> str:
+    """Chosen units in order: sentences of one line rejoin with " ", lines with "\n"."""
+
+    parts: list[str] = []
+    prev = -2
+    for u in chosen:
+        if parts:
+            same_line = u == prev + 1 and line_of[u] == line_of[prev]
+            parts.append(" " if same_line else "\n")
+        parts.append(raw[s[u] : e[u]].decode("utf-8", "surrogatepass"))
+        prev = u
+    if truncated:
+        parts.append("…")
+    return "".join(parts)
+
+
+def digest_text_extractive(text: str, *, max_chars: int) -> DigestResult:
+    """Score-ranked extractive digest: the most informative lines/sentences under max_chars.
+
+    Text is split into units (lines, and sentences within long prose lines),
+    then scored with vectorized features:
+    - TF-IDF: each distinct word in a unit adds its smoothed idf, so
+      boilerplate repeated across units is worth little
+    - exact repeats of an earlier unit are worth nothing
+    - position: earlier units and headings get a boost
+    The best subset under the budget is a 0/1 knapsack (solve_knapsack over
+    the density-ranked candidates), emitted in original order and followed by
+    "…" when anything was left out.
+
+    Deterministic and offline (NumPy, no models). max_chars == 0 gives "",
+    max_chars < 0 keeps every unit. Results go through the digest cache.
+    """
+
+    _require_numpy()
+    cache = get_digest_cache()
+    if cache is None:
+        return _extract(text, max_chars)
+    key = content_key(_EXTRACTIVE_VERSION, text, max_chars)
+    out = cache.get(key)
+    if out is None:
+        d = _extract(text, max_chars)
+        cache.set(key, d.text)
+        return d
+    return DigestResult(text=out, original_chars=len(text), digest_chars=len(out))
@@ -1,44 +1,458 @@
 from __future__ import annotations
 
+import codecs
+import hashlib
+import json
+import mmap
+import os
 import re
-from dataclasses import dataclass
+from bisect import bisect_right
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, replace
+from heapq import merge
+from itertools import accumulate
+
+from context_engineering.context.cache import LRUCache, content_key
 
 
 @dataclass(frozen=True)
 class InjectionFinding:
     kind: str
     snippet: str
+    # Offsets of the pattern match in the scanned text (-1 when unknown).
+    start: int = -1
+    end: int = -1
+
+
+@dataclass(frozen=True)
+class ScanRule:
+    kind: str
+    pattern: re.Pattern[str]
+    # Lowercase literals that every match of `pattern` starts with. The scanner
+    # only tries the pattern where one occurs; empty means search everywhere.
+    keywords: tuple[str, ...] = ()
 
 
 # Heuristic patterns. These are intentionally simple for a course.
-_PATTERNS: list[tuple[str, re.Pattern[str]]] = [
-    (
+DEFAULT_RULES: tuple[ScanRule, ...] = (
+    ScanRule(
         "override-instructions",
-        re.compile(r"\b(ignore|disregard|override)\b.{0,80}\b(instruction|system|developer|previous)\b", re.I | re.S),
+        re.compile(
+            r"\b(ignore|disregard|override)\b.{0,80}\b(instruction|system|developer|previous)\b",
+            re.IGNORECASE | re.DOTALL,
+        ),
+        ("ignore", "disregard", "override"),
     ),
-    (
+    ScanRule(
         "roleplay-system",
-        re.compile(r"\byou are (now|no longer)\b.{0,60}\b(system|developer)\b", re.I | re.S),
+        re.compile(
+            r"\byou are (now|no longer)\b.{0,60}\b(system|developer)\b", re.IGNORECASE | re.DOTALL
+        ),
+        ("you are",),
     ),
-    (
+    ScanRule(
         "exfiltrate-secrets",
-        re.compile(r"\b(api\s*key|secret|password|token)\b", re.I),
+        re.compile(r"\b(api\s*key|secret|password|token)\b", re.IGNORECASE),
+        ("api", "secret", "password", "token"),
     ),
-    (
+    ScanRule(
         "tool-abuse",
-        re.compile(r"\b(call|use|invoke)\b.{0,40}\b(tool|function)\b", re.I | re.S),
+        re.compile(r"\b(call|use|invoke)\b.{0,40}\b(tool|function)\b", re.IGNORECASE | re.DOTALL),
+        ("call", "use", "invoke"),
     ),
-]
+)
+
+
+def _rules_version(*parts: object) -> str:
+    """Short hash of a rule set, part of every cache key for its results."""
+
+    data = json.dumps(parts, sort_keys=True, default=list).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+# Up to this many distinct keywords, one str.find pass per keyword beats a
+# combined regex; above it the scanner builds a keyword trie.
+_FIND_MAX_KEYWORDS = 32
+# Characters re.IGNORECASE matches against ASCII letters that str.lower() leaves alone.
+_RE_I_ASCII = str.maketrans({"ı": "i", "ſ": "s", "İ": "i"})
+
+# Streaming scans hold back this many chars, so matches crossing chunk
+# boundaries are seen whole; see InjectionScanner.scan_stream.
+_HOLD = 512
+_CHUNK = 1 << 16
+
+_DROP_LINE = re.compile(
+    r"(ignore|disregard|override|system prompt|developer message|api\s*key|password|secret|token)",
+    re.IGNORECASE,
+)
+_DROP_KEYWORDS = (
+    "ignore",
+    "disregard",
+    "override",
+    "system prompt",
+    "developer message",
+    "api",
+    "password",
+    "secret",
+    "token",
+)
+
+# Bump the "-v1" parts whenever scan or sanitize output changes for the same rules.
+_SANITIZE_VERSION = "sanitize-v1-" + _rules_version(
+    _DROP_LINE.pattern, _DROP_LINE.flags, _DROP_KEYWORDS
+)
+# Off by default: a cache key hashes the whole text, which costs about as much
+# as the scan, so caching only pays off when the same texts come back.
+_scan_cache: LRUCache | None = None
+# Line breaks str.splitlines() honors besides "\n".
+_OTHER_BREAKS = re.compile("[\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+
+
+def _fold(text: str) -> str | None:
+    """Lowercased text with the same offsets, or None if keyword finds could miss a match.
+
+    re.I also matches "ı" and "ſ" against ASCII letters, and some characters
+    lowercase to more than one, so such texts use the regex prefilter instead.
+    """
+
+    if text.isascii():
+        return text.lower()
+    lowered = text.lower()
+    if len(lowered) != len(text) or "ı" in text or "ſ" in text:
+        return None
+    return lowered
+
+
+def _keyword_trie(keywords: Iterable[str]) -> str:
+    """Regex matching the longest of `keywords` at a position, shaped as a trie.
+
+    Alternatives at each level start with different characters, so matching
+    costs the keyword length, not the number of keywords.
+    """
+
+    root: dict[str, dict] = {}
+    for k in keywords:
+        node = root
+        for ch in k:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: dict[str, dict]) -> str:
+        alts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(root)
+
+
+def _find_all(haystack: str, needle: str) -> Iterator[int]:
+    i = haystack.find(needle)
+    while i >= 0:
+        yield i
+        i = haystack.find(needle, i + 1)
+
+
+class InjectionScanner:
+    """Compiled multi-rule injection scanner.
+
+    One prefilter pass finds every keyword occurrence; each rule's full
+    pattern is then only tried, anchored, at its own keyword hits, and rules
+    without hits are skipped. With few keywords the prefilter is one str.find
+    per keyword over the lowercased text (memory speed); larger rule sets
+    (rule packs) use a single trie-shaped regex instead, so the cost grows
+    with the text, not the number of keywords. Rules without keywords run
+    their pattern over the whole text.
+
+    Results match running each pattern with re.search / re.finditer.
+    """
+
+    def __init__(self, rules: Iterable[ScanRule] = DEFAULT_RULES) -> None:
+        self.rules = tuple(rules)
+        self.keywords = tuple(sorted({k for r in self.rules for k in r.keywords}))
+        self.keyword_set = frozenset(self.keywords)
+        for k in self.keywords:
+            if k != k.lower() or not k:
+                raise ValueError(f"Scanner keywords must be non-empty and lowercase: {k!r}")
+        self.version = "scan-v1-" + _rules_version(
+            [(r.kind, r.pattern.pattern, r.pattern.flags, r.keywords) for r in self.rules]
+        )
+        self._by_keyword: dict[str, list[int]] = {k: [] for k in self.keywords}
+        for i, r in enumerate(self.rules):
+            for k in set(r.keywords):
+                self._by_keyword[k].append(i)
+        self._unfiltered = [i for i, r in enumerate(self.rules) if not r.keywords]
+
+        if len(self.keywords) <= _FIND_MAX_KEYWORDS:
+            # For texts _fold rejects: the same occurrences, found with re.I semantics.
+            self._fallback = {
+                k: re.compile(f"(?={re.escape(k)})", re.IGNORECASE) for k in self.keywords
+            }
+        else:
+            # The trie captures the longest keyword at each offset; shorter keywords
+            # that are prefixes of it start there too.
+            trie = _keyword_trie(self.keywords)
+            self._trie = re.compile(f"(?=({trie}))")
+            self._trie_i = re.compile(f"(?=({trie}))", re.IGNORECASE)
+            kws = set(self.keywords)
+            self._prefixes = {
+                k: [k[:n] for n in range(1, len(k) + 1) if k[:n] in kws] for k in self.keywords
+            }
+
+    def _hits(self, text: str, folded: str | None | bool = False) -> dict[str, list[int]]:
+        """Start offsets of every (possibly overlapping) occurrence of each keyword found.
+
+        `folded` is _fold(text) when the caller already has it.
+        """
+
+        if folded is False:
+            folded = _fold(text)
+        if len(self.keywords) <= _FIND_MAX_KEYWORDS:
+            if folded is not None:
+                found = {k: list(_find_all(folded, k)) for k in self.keywords}
+            else:
+                found = {
+                    k: [m.start() for m in r.finditer(text)] for k, r in self._fallback.items()
+                }
+            return {k: v for k, v in found.items() if v}
+
+        hits: dict[str, list[int]] = {}
+        prefixes = self._prefixes
+        if folded is not None:
+            for m in self._trie.finditer(folded):
+                for k in prefixes[m.group(1)]:
+                    hits.setdefault(k, []).append(m.start())
+        else:
+            for m in self._trie_i.finditer(text):
+                for k in prefixes[m.group(1).translate(_RE_I_ASCII).lower()]:
+                    hits.setdefault(k, []).append(m.start())
+        return hits
+
+    def _active(self, hits: dict[str, list[int]]) -> list[int]:
+        """Indices of the rules that can match: those with keyword hits, plus unfiltered ones."""
+
+        if len(hits) == len(self.keywords) and not self._unfiltered:
+            return list(range(len(self.rules)))
+        by_keyword = self._by_keyword
+        return sorted({i for k in hits for i in by_keyword[k]}.union(self._unfiltered))
+
+    def _candidates(self, rule: ScanRule, hits: dict[str, list[int]]) -> Iterable[int] | None:
+        if not rule.keywords:
+            return None
+        if len(rule.keywords) == 1:
+            return hits.get(rule.keywords[0], ())
+        return merge(*(hits.get(k, ()) for k in rule.keywords))
+
+    def _matches(
+        self,
+        rule: ScanRule,
+        text: str,
+        hits: dict[str, list[int]],
+        pos: int = 0,
+        stop: int | None = None,
+    ) -> Iterator[re.Match[str]]:
+        """Same matches as rule.pattern.finditer(text, pos), up to those starting at `stop`."""
+
+        stop = len(text) + 1 if stop is None else stop
+        candidates = self._candidates(rule, hits)
+        if candidates is None:
+            for m in rule.pattern.finditer(text, pos):
+                if m.start() >= stop:
+                    return
+                yield m
+            return
+        for p in candidates:
+            if p < pos:
+                continue
+            if p >= stop:
+                return
+            m = rule.pattern.match(text, p)
+            if m is not None:
+                yield m
+                pos = max(m.end(), p + 1)
+
+    @staticmethod
+    def _finding(rule: ScanRule, text: str, m: re.Match[str]) -> InjectionFinding:
+        snippet = text[m.start() : min(len(text), m.end() + 40)]
+        return InjectionFinding(
+            kind=rule.kind, snippet=snippet.strip(), start=m.start(), end=m.end()
+        )
+
+    def scan(self, text: str) -> list[InjectionFinding]:
+        """The first match of each rule, in rule order (what scan_for_injection returns)."""
+
+        hits = self._hits(text)
+        findings: list[InjectionFinding] = []
+        for i in self._active(hits):
+            rule = self.rules[i]
+            m = next(self._matches(rule, text, hits), None)
+            if m is not None:
+                findings.append(self._finding(rule, text, m))
+        return findings
+
+    def scan_all(self, text: str) -> list[InjectionFinding]:
+        """Every non-overlapping match of every rule, ordered by offset (then rule order)."""
+
+        hits = self._hits(text)
+        found = [
+            (m.start(), i, self._finding(self.rules[i], text, m))
+            for i in self._active(hits)
+            for m in self._matches(self.rules[i], text, hits)
+        ]
+        found.sort(key=lambda f: (f[0], f[1]))
+        return [f for _, _, f in found]
+
+    def scan_stream(
+        self, chunks: Iterable[str], *, hold: int = _HOLD
+    ) -> Iterator[InjectionFinding]:
+        """scan_all over text that arrives in pieces, with offsets into the whole text.
+
+        Chunks are scanned in a window that keeps the last `hold` chars of the
+        text seen so far. A match is only reported once it starts before the
+        held tail (or the text has ended), so matches that cross chunk
+        boundaries, including the `.{0,80}` gaps, are found exactly once.
+        Memory stays at about hold + one chunk.
+
+        Findings equal scan_all(whole text) as long as every match plus its
+        40-char snippet tail fits in `hold` chars (the default rules need about
+        150). Longer matches, e.g. a huge whitespace run in "api   key", can be
+        missed or get a shorter snippet.
+        """
+
+        if hold < 1:
+            raise ValueError("hold must be positive")
+        rule_pos = [0] * len(self.rules)  # global offset where each rule's next match may start
+        base = 0  # global offset of window[0]
+        done = 0  # matches starting before this global offset have been reported
+        pieces: list[str] = []
+        size = 0
+        chunks = iter(chunks)
+        final = False
+        while not final:
+            chunk = next(chunks, None)
+            if chunk is None:
+                final = True
+            else:
+                pieces.append(chunk)
+                size += len(chunk)
+                if size < 2 * hold:
+                    continue  # batch small chunks so the tail is not rescanned per chunk
+            window = "".join(pieces)
+            cut = base + len(window) if final else base + len(window) - hold
+            if cut <= done:
+                continue
+
+            hits = self._hits(window)
+            found = []
+            for i in self._active(hits):
+                rule = self.rules[i]
+                pos = max(rule_pos[i], done) - base
+                for m in self._matches(rule, window, hits, pos, cut - base):
+                    found.append((m.start(), i, self._finding(rule, window, m)))
+                    rule_pos[i] = base + max(m.end(), m.start() + 1)
+            found.sort(key=lambda f: (f[0], f[1]))
+            for _, _, f in found:
+                yield replace(f, start=f.start + base, end=f.end + base)
+
+            # Keep one char before the cut: \b at the cut looks behind it.
+            keep = cut - 1 - base
+            pieces = [window[keep:]]
+            size = len(pieces[0])
+            base += keep
+            done = cut
+
+    def detect(self, text: str) -> bool:
+        """True if any rule matches; stops at the first match."""
+
+        return self._detect(text, self._hits(text))
+
+    def _detect(self, text: str, hits: dict[str, list[int]]) -> bool:
+        return any(
+            next(self._matches(self.rules[i], text, hits), None) for i in self._active(hits)
+        )
+
+
+_SCANNER = InjectionScanner()
+
+
+def get_scan_cache() -> LRUCache | None:
+    return _scan_cache
+
+
+def set_scan_cache(cache: LRUCache | None) -> None:
+    """Install the process-wide scan/sanitize cache; None (the default) turns caching off.
+
+    Enable it for workloads that see the same texts again (re-retrieved
+    chunks, replays). Pass LRUCache(disk=DiskCache(path)) to keep results
+    across restarts.
+    Hit rates are in get_scan_cache().stats().
+    """
+
+    global _scan_cache
+    _scan_cache = cache
 
 
 def scan_for_injection(text: str) -> list[InjectionFinding]:
-    findings: list[InjectionFinding] = []
-    for kind, pat in _PATTERNS:
-        m = pat.search(text)
-        if m:
-            snippet = text[m.start() : min(len(text), m.end() + 40)]
-            findings.append(InjectionFinding(kind=kind, snippet=snippet.strip()))
-    return findings
+    """First finding per rule kind.
+
+    With a scan cache installed (see set_scan_cache; off by default), results
+    are memoized by content hash and the rule-set version, so changing the
+    rules never returns stale results.
+    """
+
+    cache, scanner = _scan_cache, _SCANNER
+    if cache is None:
+        return scanner.scan(text)
+    key = content_key(scanner.version, text)
+    data = cache.get(key)
+    if data is None:
+        findings = scanner.scan(text)
+        cache.set(key, json.dumps([[f.kind, f.snippet, f.start, f.end] for f in findings]))
+        return findings
+    return [InjectionFinding(*f) for f in json.loads(data)]
+
+
+def has_injection(text: str) -> bool:
+    if _scan_cache is None:
+        return _SCANNER.detect(text)
+    return bool(scan_for_injection(text))
+
+
+def scan_all_injections(text: str) -> list[InjectionFinding]:
+    """Every finding with offsets, not just the first per kind."""
+
+    return _SCANNER.scan_all(text)
+
+
+def scan_injection_stream(
+    chunks: Iterable[str], *, hold: int = _HOLD
+) -> Iterator[InjectionFinding]:
+    """scan_all_injections over consecutive pieces of a text (see InjectionScanner.scan_stream)."""
+
+    return _SCANNER.scan_stream(chunks, hold=hold)
+
+
+def scan_injection_file(
+    path: str | os.PathLike[str], *, encoding: str = "utf-8", hold: int = _HOLD
+) -> list[InjectionFinding]:
+    """scan_all_injections over a file, memory-mapped and decoded incrementally.
+
+    Offsets are in characters of the decoded text.
+    """
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            decoder = codecs.getincrementaldecoder(encoding)()
+
+            def decoded() -> Iterator[str]:
+                for i in range(0, len(mm), _CHUNK):
+                    yield decoder.decode(mm[i : i + _CHUNK])
+                yield decoder.decode(b"", final=True)
+
+            return list(_SCANNER.scan_stream(decoded(), hold=hold))
 
 
 def sanitize_retrieved_text(text: str) -> str:
@@ -51,17 +465,74 @@ def sanitize_retrieved_text(text: str) -> str:
     Strategy:
     - drop lines containing high-risk phrases
     - preserve everything else
+
+    Only lines holding one of the phrases' leading keywords are searched.
+    With a scan cache installed, results are memoized like scan_for_injection's.
+    """
+
+    cache = _scan_cache
+    if cache is None:
+        return _sanitize(text)
+    return cache.get_or_compute(content_key(_SANITIZE_VERSION, text), lambda: _sanitize(text))
+
+
+def _sanitize(
+    text: str,
+    folded: str | None | bool = False,
+    searched: frozenset[str] = frozenset(),
+    known: dict[str, list[int]] | None = None,
+) -> str:
+    """sanitize_retrieved_text without the cache.
+
+    `folded` is _fold(text) if already known. `known` holds keyword hits
+    already found in it for the keywords in `searched` (a scanner's _hits),
+    so those are not searched again.
+    """
+
+    if folded is False:
+        folded = _fold(text)
+    if folded is None:
+        kept = [line for line in text.splitlines() if not _DROP_LINE.search(line)]
+        return "\n".join(kept).strip()
+
+    known = known or {}
+    hits = [
+        p
+        for k in _DROP_KEYWORDS
+        for p in (known.get(k, ()) if k in searched else _find_all(folded, k))
+    ]
+    if not hits and not _OTHER_BREAKS.search(text):
+        # Only "\n" breaks and nothing to drop: joining the lines gives the text back.
+        return text.strip()
+    lines = text.splitlines()
+    if hits:
+        ends = list(accumulate(map(len, text.splitlines(True))))
+        flagged = {bisect_right(ends, p) for p in hits}
+        drop = {i for i in flagged if _DROP_LINE.search(lines[i])}
+        if drop:
+            lines = [line for i, line in enumerate(lines) if i not in drop]
+    return "\n".join(lines).strip()
+
+
+def scan_and_sanitize(text: str) -> tuple[bool, str]:
+    """(has_injection(text), sanitize_retrieved_text(text)) in one go.
+
+    Both share one lowercase pass over the text and one scan-cache entry.
     """
 
-    drop_line = re.compile(
-        r"(ignore|disregard|override|system prompt|developer message|api\s*key|password|secret|token)",
-        re.I,
-    )
+    cache, scanner = _scan_cache, _SCANNER
+    if cache is None:
+        return _scan_and_sanitize(text, scanner)
+    key = content_key(f"{scanner.version}:{_SANITIZE_VERSION}", text)
+    data = cache.get(key)
+    if data is None:
+        flagged, cleaned = _scan_and_sanitize(text, scanner)
+        cache.set(key, ("1" if flagged else "0") + cleaned)
+        return flagged, cleaned
+    return data[0] == "1", data[1:]
 
-    cleaned_lines: list[str] = []
-    for line in text.splitlines():
-        if drop_line.search(line):
-            continue
-        cleaned_lines.append(line)
 
-    return "\n".join(cleaned_lines).strip()
+def _scan_and_sanitize(text: str, scanner: InjectionScanner) -> tuple[bool, str]:
+    folded = _fold(text)
+    hits = scanner._hits(text, folded)
+    return scanner._detect(text, hits), _sanitize(text, folded, scanner.keyword_set, hits)
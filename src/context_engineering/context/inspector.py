@@ -9,6 +9,7 @@ from rich.console import Console
 from rich.table import Table
 
 
+from context_engineering.context.buffer import ConversationBuffer
 from context_engineering.types import Message
 
 
@@ -22,7 +23,9 @@ class ContextStats:
 
 
 
-def compute_stats(messages: Iterable[Message]) -> ContextStats:
+def compute_stats(messages: Iterable[Message] | ConversationBuffer) -> ContextStats:
+    if isinstance(messages, ConversationBuffer):
+        return ContextStats(num_messages=len(messages), num_chars=messages.num_chars)
     msgs = list(messages)
     return ContextStats(
         num_messages=len(msgs),
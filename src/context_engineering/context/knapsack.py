@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+# Stride-sample size used to estimate the greedy density cut-off.
+_SAMPLE = 1024
+
+
+@dataclass(frozen=True)
+class KnapsackSolution:
+    chosen: list[int]  # item indices, ascending
+    value: float
+    upper_bound: float  # no selection can be worth more than this
+    exact: bool
+
+
+def _solve_exact(weights: Sequence[int], values: Sequence[float], capacity: int) -> list[int]:
+    """0/1 knapsack by dynamic programming over capacity: O(n * capacity) time and bytes."""
+
+    best = [0.0] * (capacity + 1)
+    keep: list[bytearray] = []
+    for w, v in zip(weights, values):
+        row = bytearray(capacity + 1)
+        if v > 0 and w <= capacity:
+            for c in range(capacity, w - 1, -1):
+                cand = best[c - w] + v
+                if cand > best[c]:
+                    best[c] = cand
+                    row[c] = 1
+        keep.append(row)
+
+    chosen: list[int] = []
+    c = capacity
+    for i in range(len(keep) - 1, -1, -1):
+        if keep[i][c]:
+            chosen.append(i)
+            c -= weights[i]
+    chosen.reverse()
+    return chosen
+
+
+def _solve_sparse(
+    weights: Sequence[int], values: Sequence[float], capacity: int, items: Sequence[int]
+) -> list[int]:
+    """0/1 knapsack over `items` by DP over reachable weight sums.
+
+    Only the Pareto frontier is kept: weight sums in increasing order, each
+    with a strictly higher value than every lighter one (and the chosen
+    items as a bitmask). Adding an item merges the frontier with its shifted
+    copy in one pass, so the cost is O(n * frontier), independent of the
+    capacity; the frontier stays at a few hundred sums for typical inputs.
+    """
+
+    fw, fv, fm = [0], [0.0], [0]
+    for k, i in enumerate(items):
+        w, v, bit = weights[i], values[i], 1 << k
+        na = len(fw)
+        nb = 0  # sums that still fit with item i added
+        while nb < na and fw[nb] + w <= capacity:
+            nb += 1
+        nw: list[int] = []
+        nv: list[float] = []
+        nm: list[int] = []
+        a = b = 0
+        best = -1.0
+        while a < na or b < nb:
+            if b >= nb or (a < na and fw[a] <= fw[b] + w):
+                x, y, m = fw[a], fv[a], fm[a]
+                a += 1
+            else:
+                x, y, m = fw[b] + w, fv[b] + v, fm[b] | bit
+                b += 1
+            if y > best:
+                if nw and nw[-1] == x:
+                    nv[-1], nm[-1] = y, m
+                else:
+                    nw.append(x)
+                    nv.append(y)
+                    nm.append(m)
+                best = y
+        fw, fv, fm = nw, nv, nm
+
+    mask = fm[-1]
+    return sorted(i for k, i in enumerate(items) if mask >> k & 1)
+
+
+def _density(weights: Sequence[int], values: Sequence[float], i: int) -> float:
+    # Zero-weight items have infinite density and always go first.
+    return values[i] / weights[i] if weights[i] else float("inf")
+
+
+def _solve_greedy(
+    weights: Sequence[int], values: Sequence[float], capacity: int
+) -> tuple[list[int], float]:
+    """Ratio-greedy with the best-single-item fix-up, plus the LP upper bound.
+
+    The result is worth at least half the optimum and at most max(values) less.
+
+    Only the density prefix that can matter is sorted: a stride sample estimates
+    the density above which items add up to several budgets' worth of weight,
+    and one O(n) filter keeps just those. If the estimate undershoots we fall
+    back to sorting everything, so the cost is O(n + m log m) for the m items
+    near the top, worst case O(n log n).
+    """
+
+    candidates = [
+        i for i, (w, v) in enumerate(zip(weights, values)) if v > 0 and w <= capacity
+    ]
+    if not candidates:
+        return [], 0.0
+
+    top = candidates
+    if len(candidates) > 4 * _SAMPLE:
+        step = len(candidates) // _SAMPLE
+        sample = sorted(
+            candidates[::step], key=lambda i: _density(weights, values, i), reverse=True
+        )
+        acc = 0
+        for i in sample:
+            acc += weights[i] * step
+            if acc >= 4 * capacity:
+                threshold = _density(weights, values, i)
+                pruned = [j for j in candidates if values[j] >= threshold * weights[j]]
+                if sum(weights[j] for j in pruned) > capacity:
+                    top = pruned
+                break
+
+    top = sorted(top, key=lambda i: _density(weights, values, i), reverse=True)
+    min_weight = min(weights[i] for i in top)
+
+    chosen: list[int] = []
+    value = 0.0
+    room = capacity
+    bound: float | None = None
+    for i in top:
+        w = weights[i]
+        if w <= room:
+            chosen.append(i)
+            value += values[i]
+            room -= w
+        elif bound is None:
+            # First item that does not fit: the fractional (LP) optimum takes part of it.
+            bound = value + values[i] * room / w
+        if room < min_weight and bound is not None:
+            break
+    if bound is None:
+        # Everything in `top` fit, which means `top` is all candidates.
+        bound = value
+
+    best_value = max(values[i] for i in candidates)
+    if best_value > value:
+        single = next(i for i in candidates if values[i] == best_value)
+        chosen, value = [single], best_value
+
+    chosen.sort()
+    return chosen, bound
+
+
+def solve_knapsack(
+    weights: Sequence[int],
+    values: Sequence[float],
+    capacity: int,
+    *,
+    exact_cells: int = 200_000,
+    exact_items: int = 40,
+) -> KnapsackSolution:
+    """Pick items maximizing total value with total weight <= capacity.
+
+    Only items with positive value that fit on their own are candidates.
+    Solver choice:
+    - all candidates fit together: take them all
+    - n * (capacity + 1) <= exact_cells: exact DP table, O(n * capacity)
+    - at most exact_items candidates: exact sparse DP over reachable weight
+      sums, whose cost depends on the candidates, not the capacity (a few ms
+      for 40 items at any budget)
+    - otherwise: ratio-greedy, O(n log n), value >= max(OPT / 2, OPT - max(values))
+    """
+
+    if len(weights) != len(values):
+        raise ValueError("weights and values must have the same length")
+    if capacity < 0:
+        return KnapsackSolution(chosen=[], value=0.0, upper_bound=0.0, exact=True)
+
+    candidates = [i for i, (w, v) in enumerate(zip(weights, values)) if v > 0 and w <= capacity]
+    if sum(weights[i] for i in candidates) <= capacity:
+        chosen = candidates
+    elif len(weights) * (capacity + 1) <= exact_cells:
+        chosen = _solve_exact(weights, values, capacity)
+    elif len(candidates) <= exact_items:
+        chosen = _solve_sparse(weights, values, capacity, candidates)
+    else:
+        chosen, bound = _solve_greedy(weights, values, capacity)
+        value = sum(values[i] for i in chosen)
+        return KnapsackSolution(
+            chosen=chosen, value=value, upper_bound=max(bound, value), exact=False
+        )
+    value = sum(values[i] for i in chosen)
+    return KnapsackSolution(chosen=chosen, value=value, upper_bound=value, exact=True)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import json
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import cached_property
+
+from context_engineering.context.cache import content_key
+from context_engineering.context.digest import (
+    _CHUNK,
+    _DIGEST_VERSION,
+    DigestResult,
+    _finish,
+    _kept_text,
+    get_digest_cache,
+)
+
+# Bump whenever the ladder layout changes; _DIGEST_VERSION is part of the key too.
+_LADDER_VERSION = "ladder-v1"
+
+
+@dataclass(frozen=True)
+class DigestLadder:
+    """digest_text_deterministic at a geometric series of caps, from one pass.
+
+    Rung i has cap `min_chars << i`. Every digest of a text is either a prefix
+    of its uncapped digest or such a prefix plus "…", so the ladder stores
+    that prefix once (`text`, at most the top cap long) and, per rung, where
+    it ends and whether "…" follows.
+
+    Rung lengths never decrease, so fit(room) picks the largest rung that fits
+    with one bisect over them (a ladder has a few dozen rungs at most), and
+    digest(max_chars) rebuilds the exact digest_text_deterministic result for
+    any cap up to the top rung.
+    """
+
+    text: str
+    original_chars: int
+    min_chars: int
+    ends: tuple[int, ...]
+    marked: tuple[bool, ...]  # rung ends with "…"
+    complete: bool  # `text` is the whole uncapped digest
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+    @property
+    def caps(self) -> tuple[int, ...]:
+        return tuple(self.min_chars << i for i in range(len(self.ends)))
+
+    @cached_property
+    def _lengths(self) -> tuple[int, ...]:
+        return tuple(e + m for e, m in zip(self.ends, self.marked))
+
+    def rung_chars(self, i: int) -> int:
+        return self.ends[i] + self.marked[i]
+
+    def rung(self, i: int) -> str:
+        return self.text[: self.ends[i]] + ("…" if self.marked[i] else "")
+
+    def fit_index(self, room: int) -> int | None:
+        """Index of the largest rung whose digest is at most `room` chars, or None."""
+
+        # Not "the largest cap <= room, then climb": trimming whitespace at the
+        # cut can leave several rungs the same length well below their caps.
+        i = bisect_right(self._lengths, room) - 1
+        return i if i >= 0 else None
+
+    def fit(self, room: int) -> str | None:
+        """The largest rung whose digest is at most `room` chars, or None."""
+
+        i = self.fit_index(room)
+        return None if i is None else self.rung(i)
+
+    def digest(self, max_chars: int) -> DigestResult:
+        """digest_text_deterministic(text, max_chars=max_chars) from the ladder.
+
+        Exact for 0 <= max_chars <= the top cap, and for any cap when the ladder
+        is complete. Past the top cap of an incomplete ladder, the top rung is
+        returned (it fits, but a direct digest could keep more).
+        """
+
+        top = self.min_chars << (len(self.ends) - 1)
+        if self.complete or 0 <= max_chars <= top:
+            out = _finish(self.text, self.original_chars, max_chars)
+        else:
+            out = self.rung(len(self.ends) - 1)
+        return DigestResult(text=out, original_chars=self.original_chars, digest_chars=len(out))
+
+    def dumps(self) -> str:
+        return json.dumps(
+            [
+                self.original_chars,
+                self.min_chars,
+                self.complete,
+                self.ends,
+                self.marked,
+                self.text,
+            ],
+            ensure_ascii=False,
+        )
+
+    @classmethod
+    def loads(cls, data: str) -> DigestLadder:
+        original_chars, min_chars, complete, ends, marked, text = json.loads(data)
+        return cls(
+            text=text,
+            original_chars=original_chars,
+            min_chars=min_chars,
+            ends=tuple(ends),
+            marked=tuple(marked),
+            complete=complete,
+        )
+
+
+def _build(text: str, min_chars: int, max_chars: int) -> DigestLadder:
+    top = min_chars << ((max_chars // min_chars).bit_length() - 1)
+    chunks = (text[i : i + _CHUNK] for i in range(0, len(text), _CHUNK))
+    kept, original_chars, stopped = _kept_text(chunks, top, len(text))
+    # Digests up to the top cap only look at the first `top` chars of `kept`.
+    base = kept[:top] if stopped else kept
+
+    ends: list[int] = []
+    marked: list[bool] = []
+    cap = min_chars
+    while cap <= top:
+        out = _finish(base, original_chars, cap)
+        mark = not base.startswith(out)
+        ends.append(len(out) - mark)
+        marked.append(mark)
+        cap <<= 1
+    return DigestLadder(
+        text=base,
+        original_chars=original_chars,
+        min_chars=min_chars,
+        ends=tuple(ends),
+        marked=tuple(marked),
+        complete=not stopped,
+    )
+
+
+def digest_ladder(text: str, *, min_chars: int = 64, max_chars: int = 64 << 10) -> DigestLadder:
+    """Build the DigestLadder of `text` with caps min_chars, 2*min_chars, ... <= max_chars.
+
+    One linear pass, which stops once the kept text passes the top cap.
+    Ladders are stored in the digest cache (see set_digest_cache) in their
+    dumps() form, so a disk-backed cache keeps them across restarts.
+    """
+
+    if not 0 < min_chars <= max_chars:
+        raise ValueError("Need 0 < min_chars <= max_chars")
+    cache = get_digest_cache()
+    if cache is None:
+        return _build(text, min_chars, max_chars)
+    key = content_key(_LADDER_VERSION, text, _DIGEST_VERSION, min_chars, max_chars)
+    data = cache.get(key)
+    if data is None:
+        ladder = _build(text, min_chars, max_chars)
+        cache.set(key, ladder.dumps())
+        return ladder
+    return DigestLadder.loads(data)
+
@@ -1,52 +1,198 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Iterable
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from itertools import compress
 
 from context_engineering.context.budget import Budget, size_chars
+from context_engineering.context.buffer import ConversationBuffer
+from context_engineering.context.digest import _with_digest, digest_message
+from context_engineering.context.knapsack import solve_knapsack
+from context_engineering.context.ladder import DigestLadder
 from context_engineering.types import Message
 
+# Flips a 0/1 selection bytearray so dropped items can be pulled out with compress().
+_INVERT = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+
 
 @dataclass(frozen=True)
 class PackResult:
     packed: list[Message]
     dropped: list[Message]
     final_chars: int
+    final_tokens: int | None = None
 
 
-def pack_recency_first(messages: Iterable[Message], budget: Budget) -> PackResult:
-    """Keep newest non-system messages first, but always keep the first system message."""
+@dataclass(frozen=True)
+class ValuePackResult(PackResult):
+    kept_value: float = 0.0
+    total_value: float = 0.0
+    # Upper bound on kept_value for any packing that honors the pins.
+    value_upper_bound: float = 0.0
+    exact: bool = True
 
-    msgs = list(messages)
-    system = [m for m in msgs if m.role == "system"]
-    rest = [m for m in msgs if m.role != "system"]
 
-    packed_rev: list[Message] = []
-    dropped: list[Message] = []
+@dataclass(frozen=True)
+class DigestPackResult(PackResult):
+    # Originals that were packed as a digest instead of in full (chronological).
+    digested: list[Message] = field(default_factory=list)
+
+
+def _recency_indices(
+    roles: Sequence[str], sizes: Sequence[int], limit: int
+) -> tuple[int | None, list[int], list[int], int]:
+    """Index-level recency-first selection.
+
+    Returns (first system index, kept indices newest->oldest, dropped indices
+    newest->oldest, total size). Runs in O(n) using a running total instead of
+    re-measuring the candidate list for every message.
+    """
+
+    sys0: int | None = None
+    for i, role in enumerate(roles):
+        if role == "system":
+            sys0 = i
+            break
 
-    if system:
-        packed_rev.append(system[0])
+    # The first system message is always kept, even if it alone blows the budget.
+    total = sizes[sys0] if sys0 is not None else 0
+    kept: list[int] = []
+    dropped: list[int] = []
 
-    # Try to add from newest->oldest
-    for m in reversed(rest):
-        candidate = packed_rev + [m]
-        if size_chars(candidate) <= budget.max_chars:
-            packed_rev.append(m)
+    for i in range(len(roles) - 1, -1, -1):
+        if roles[i] == "system":
+            continue
+        t = total + sizes[i]
+        if t <= limit:
+            kept.append(i)
+            total = t
         else:
-            dropped.append(m)
+            dropped.append(i)
+
+    return sys0, kept, dropped, total
+
+
+def _priority_head(roles: Sequence[str]) -> tuple[int | None, list[int]]:
+    """First system index plus the priority groups 1-4 in the order they are attempted."""
+
+    idx_system0: int | None = None
+    developer_idxs: list[int] = []
+    tool_idxs: list[int] = []
+    latest_user_idx: int | None = None
+
+    for i, role in enumerate(roles):
+        if role == "system":
+            if idx_system0 is None:
+                idx_system0 = i
+        elif role == "developer":
+            developer_idxs.append(i)
+        elif role == "tool":
+            tool_idxs.append(i)
+        elif role == "user":
+            latest_user_idx = i
+
+    head: list[int] = []
+    if idx_system0 is not None:
+        head.append(idx_system0)
+    head.extend(developer_idxs)
+    if latest_user_idx is not None:
+        head.append(latest_user_idx)
+    head.extend(tool_idxs)
+    return idx_system0, head
+
+
+def _priority_selection(
+    roles: Sequence[str], sizes: Sequence[int], limit: int
+) -> tuple[bytearray, int]:
+    """Index-level priority-first selection.
+
+    Returns a 0/1 bytearray marking selected indices plus the total size.
+    Membership checks are O(1) lookups in the bytearray and the running total
+    replaces re-measuring, so the whole policy is O(n).
+    """
+
+    n = len(roles)
+    idx_system0, head = _priority_head(roles)
+
+    selected = bytearray(n)
+    total = 0
+
+    # 1-4) system, developer, latest user, tools
+    for i in head:
+        if selected[i]:
+            continue
+        t = total + sizes[i]
+        if t <= limit:
+            selected[i] = 1
+            total = t
+
+    # 5) fill remainder newest->oldest, skipping system (already attempted)
+    for i in range(n - 1, -1, -1):
+        if selected[i] or i == idx_system0:
+            continue
+        t = total + sizes[i]
+        if t <= limit:
+            selected[i] = 1
+            total = t
+
+    return selected, total
+
+
+def _result(
+    packed: list[Message], dropped: list[Message], total: int, budget: Budget
+) -> PackResult:
+    """Build a PackResult from a total measured in the budget's unit."""
+
+    if budget.unit == "tokens":
+        return PackResult(
+            packed=packed,
+            dropped=dropped,
+            final_chars=size_chars(packed),
+            final_tokens=total,
+        )
+    return PackResult(packed=packed, dropped=dropped, final_chars=total)
+
+
+def _columns(
+    messages: Iterable[Message] | ConversationBuffer, budget: Budget
+) -> tuple[Sequence[Message], Sequence[str], Sequence[int]]:
+    """Messages, roles and sizes; a ConversationBuffer is read from its arrays."""
+
+    if isinstance(messages, ConversationBuffer):
+        return messages, messages.roles(), budget.sizes(messages)  # type: ignore[return-value]
+    msgs = list(messages)
+    return msgs, [m.role for m in msgs], budget.sizes(msgs)
+
+
+def pack_recency_first(
+    messages: Iterable[Message] | ConversationBuffer, budget: Budget
+) -> PackResult:
+    """Keep newest non-system messages first, but always keep the first system message.
+
+    `messages` may be a ConversationBuffer: selection then runs on its arrays
+    and packed/dropped are MessageViews (index arrays into the buffer).
+
+    Runs in O(n). For many conversations whose sizes and roles are already
+    arrays (e.g. ConversationBuffer columns), batch.select_many selects them
+    all at once.
+    """
+
+    msgs, roles, sizes = _columns(messages, budget)
+
+    sys0, kept, dropped, total = _recency_indices(roles, sizes, budget.limit)
 
     # Restore chronological ordering
-    if packed_rev and packed_rev[0].role == "system":
-        sys0 = packed_rev[0]
-        others = list(reversed(packed_rev[1:]))
-        packed = [sys0] + others
-    else:
-        packed = list(reversed(packed_rev))
+    order = [sys0] if sys0 is not None else []
+    order.extend(reversed(kept))
 
-    return PackResult(packed=packed, dropped=dropped, final_chars=size_chars(packed))
+    if isinstance(msgs, ConversationBuffer):
+        return _result(msgs.take(order), msgs.take(dropped), total, budget)  # type: ignore[arg-type]
+    return _result([msgs[i] for i in order], [msgs[i] for i in dropped], total, budget)
 
 
-def pack_priority_first(messages: Iterable[Message], budget: Budget) -> PackResult:
+def pack_priority_first(
+    messages: Iterable[Message] | ConversationBuffer, budget: Budget
+) -> PackResult:
     """Pack by priority groups, then fill remaining space with recency.
 
     Priority order:
@@ -58,58 +204,187 @@ def pack_priority_first(messages: Iterable[Message], budget: Budget) -> PackResu
 
     Notes:
     - This is a *context engineering* policy, not a "best" policy.
-    - All decisions are budget-driven using a simple char counter.
+    - All decisions are budget-driven using a simple char (or token) counter.
+    - A ConversationBuffer is packed from its arrays, like pack_recency_first.
+    - Runs in O(n); see batch.select_many for many conversations held as arrays.
+    """
+
+    msgs, roles, sizes = _columns(messages, budget)
+
+    selected, total = _priority_selection(roles, sizes, budget.limit)
+
+    if isinstance(msgs, ConversationBuffer):
+        every = range(len(msgs))
+        packed = msgs.take(compress(every, selected))
+        dropped = msgs.take(compress(every, selected.translate(_INVERT)))
+        return _result(packed, dropped, total, budget)  # type: ignore[arg-type]
+
+    packed = list(compress(msgs, selected))
+    dropped = list(compress(msgs, selected.translate(_INVERT)))
+
+    return _result(packed, dropped, total, budget)
+
+
+def pack_value_weighted(
+    messages: Iterable[Message],
+    budget: Budget,
+    values: Sequence[float],
+    *,
+    exact_cells: int = 200_000,
+    exact_items: int = 40,
+) -> ValuePackResult:
+    """Pack the most valuable messages that fit, instead of filling by role group.
+
+    Hard pins (attempted first, in this order, kept if they fit):
+      1) first system message
+      2) latest user message
+
+    Everything else is a 0/1 knapsack over (size, value) with the remaining
+    budget, solved by solve_knapsack:
+    - exact when everything fits, when n * (remaining + 1) <= exact_cells
+      (DP table), or when at most exact_items messages compete (sparse DP
+      over reachable sizes, at any budget)
+    - ratio-greedy otherwise: O(n log n), keeps >= half the optimal value and
+      reports an LP upper bound so the gap is visible
+
+    Packed and dropped messages keep chronological order.
     """
 
     msgs = list(messages)
+    if len(values) != len(msgs):
+        raise ValueError("values must have one score per message")
     n = len(msgs)
+    sizes = budget.sizes(msgs)
+    limit = budget.limit
 
     idx_system0 = next((i for i, m in enumerate(msgs) if m.role == "system"), None)
-    developer_idxs = [i for i, m in enumerate(msgs) if m.role == "developer"]
-    tool_idxs = [i for i, m in enumerate(msgs) if m.role == "tool"]
+    latest_user_idx = next((i for i in range(n - 1, -1, -1) if msgs[i].role == "user"), None)
 
-    user_idxs = [i for i, m in enumerate(msgs) if m.role == "user"]
-    latest_user_idx = max(user_idxs) if user_idxs else None
+    pins = [i for i in (idx_system0, latest_user_idx) if i is not None]
+    selected = bytearray(n)
+    total = 0
+    pinned_value = 0.0
+    for i in pins:
+        if total + sizes[i] <= limit:
+            selected[i] = 1
+            total += sizes[i]
+            pinned_value += values[i]
 
-    selected: list[int] = []
+    # Pins are never offered to the solver; those that did not fit are dropped.
+    item_values = list(values)
+    for i in pins:
+        item_values[i] = 0.0
 
-    def try_add(i: int) -> bool:
-        nonlocal selected
-        if i in selected:
-            return True
-        candidate = [msgs[j] for j in selected] + [msgs[i]]
-        if size_chars(candidate) <= budget.max_chars:
-            selected.append(i)
-            return True
-        return False
+    solution = solve_knapsack(
+        sizes, item_values, limit - total, exact_cells=exact_cells, exact_items=exact_items
+    )
+    for i in solution.chosen:
+        selected[i] = 1
+        total += sizes[i]
 
-    # 1) system (first)
-    if idx_system0 is not None:
-        try_add(idx_system0)
+    base = _result(
+        list(compress(msgs, selected)),
+        list(compress(msgs, selected.translate(_INVERT))),
+        total,
+        budget,
+    )
+    return ValuePackResult(
+        packed=base.packed,
+        dropped=base.dropped,
+        final_chars=base.final_chars,
+        final_tokens=base.final_tokens,
+        kept_value=pinned_value + solution.value,
+        total_value=float(sum(values)),
+        value_upper_bound=pinned_value + solution.upper_bound,
+        exact=solution.exact,
+    )
 
-    # 2) developer
-    for i in developer_idxs:
-        try_add(i)
 
-    # 3) latest user
-    if latest_user_idx is not None:
-        try_add(latest_user_idx)
+def pack_priority_with_digests(
+    messages: Iterable[Message],
+    budget: Budget,
+    *,
+    digest_max: int,
+    ladders: Sequence[DigestLadder | None] | None = None,
+    fit_rungs: bool = False,
+) -> DigestPackResult:
+    """pack_priority_first, but fall back to a digest instead of dropping.
 
-    # 4) tools
-    for i in tool_idxs:
-        try_add(i)
+    Candidates are visited in the same priority order. When a message does
+    not fit in full and at least `digest_max` units (chars or tokens) are
+    still free, its digest (digest_text_deterministic, capped at digest_max)
+    is packed in its place and carries the usual meta["digest"] annotation.
+
+    Digests are computed lazily, only at that point, so every digest computed
+    is packed: a long history costs O(n) cheap size checks plus at most
+    ~limit / digest size digests, however many messages are dropped.
+
+    With a char budget, `ladders` (one DigestLadder or None per message, e.g.
+    kept alongside the history) supplies those digests without re-reading the
+    message; the result is the same. Token budgets ignore them.
+
+    With `fit_rungs`, a message with a ladder instead gets the largest rung
+    that fits both digest_max and the free room (DigestLadder.fit), so it is
+    still digested when less than digest_max is free. Rungs sit at power-of-two
+    caps, so this packs shorter digests than digest_max itself would.
+    """
+
+    if digest_max <= 0:
+        raise ValueError("digest_max must be positive")
+
+    msgs = list(messages)
+    roles = [m.role for m in msgs]
+    sizes = budget.sizes(msgs)
+    limit = budget.limit
+    if budget.unit == "tokens":
+        digest_budget = Budget(max_tokens=digest_max, counter=budget.counter)
+    else:
+        digest_budget = Budget(max_chars=digest_max)
+
+    chosen: list[Message | None] = [None] * len(msgs)
+    total = 0
+
+    def attempt(i: int) -> None:
+        nonlocal total
+        room = limit - total
+        ladder = ladders[i] if ladders is not None and budget.unit == "chars" else None
+        if sizes[i] <= room:
+            chosen[i] = msgs[i]
+            total += sizes[i]
+        elif fit_rungs and ladder is not None:
+            text = ladder.fit(min(room, digest_max))
+            if text:
+                chosen[i] = _with_digest(msgs[i], text)
+                total += len(text)
+        elif room >= digest_max:
+            # Past the top cap of an incomplete ladder, its top rung is not the
+            # digest_max digest.
+            if ladder is not None and (ladder.complete or digest_max <= ladder.caps[-1]):
+                d = _with_digest(msgs[i], ladder.digest(digest_max).text)
+            else:
+                d = digest_message(msgs[i], digest_budget)
+            chosen[i] = d
+            total += budget.measure(d.content)
+
+    # 1-4) system, developer, latest user, tools
+    idx_system0, head = _priority_head(roles)
+    for i in head:
+        attempt(i)
 
     # 5) fill remainder newest->oldest, skipping system (already attempted)
-    remaining = [i for i in range(n) if i not in selected]
-    remaining.sort(reverse=True)
-    for i in remaining:
-        # Don’t re-attempt system if it wasn’t selected (budget too small)
-        if idx_system0 is not None and i == idx_system0:
-            continue
-        try_add(i)
+    for i in range(len(msgs) - 1, -1, -1):
+        if chosen[i] is None and i != idx_system0:
+            attempt(i)
 
-    packed_idxs = sorted(selected)
-    packed = [msgs[i] for i in packed_idxs]
-    dropped = [msgs[i] for i in range(n) if i not in packed_idxs]
+    packed = [c for c in chosen if c is not None]
+    dropped = [m for m, c in zip(msgs, chosen) if c is None]
+    digested = [m for m, c in zip(msgs, chosen) if c is not None and c is not m]
 
-    return PackResult(packed=packed, dropped=dropped, final_chars=size_chars(packed))
+    base = _result(packed, dropped, total, budget)
+    return DigestPackResult(
+        packed=base.packed,
+        dropped=base.dropped,
+        final_chars=base.final_chars,
+        final_tokens=base.final_tokens,
+        digested=digested,
+    )
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+from context_engineering.context import injection, tool_log
+from context_engineering.context.injection import DEFAULT_RULES, InjectionScanner, ScanRule
+from context_engineering.context.tool_log import Redactor
+
+_FLAGS = {
+    "i": re.IGNORECASE,
+    "s": re.DOTALL,
+    "m": re.MULTILINE,
+    "x": re.VERBOSE,
+    "a": re.ASCII,
+}
+
+
+def _compile(pattern: str, flags: str, where: str) -> re.Pattern[str]:
+    try:
+        return re.compile(pattern, sum(_FLAGS[f] for f in set(flags.lower())))
+    except KeyError as e:
+        raise ValueError(f"{where}: unknown regex flag {e.args[0]!r}") from None
+    except re.error as e:
+        raise ValueError(f"{where}: invalid pattern {pattern!r}: {e}") from None
+
+
+def _flag_letters(flags: int) -> str:
+    return "".join(f for f, v in _FLAGS.items() if flags & v)
+
+
+# Bounds on the keyword check below; past them a prefix counts as unknown.
+_MAX_PREFIXES = 4096
+_MAX_CLASS = 64
+
+
+def _class_chars(items: list) -> set[str] | None:
+    """Lowercased chars of a small [...] class, or None when it is large or negated."""
+
+    chars: set[str] = set()
+    for kind, value in items:
+        if str(kind) == "LITERAL":
+            chars.add(chr(value).lower())
+        elif str(kind) == "RANGE" and value[1] - value[0] < _MAX_CLASS:
+            chars.update(chr(c).lower() for c in range(value[0], value[1] + 1))
+        else:
+            return None
+    return chars if len(chars) <= _MAX_CLASS else None
+
+
+def _prefixes(items: list, heads: set[str], limit: int) -> tuple[set[str], set[str]]:
+    """(open, closed) lowercased literal prefixes of matches of parsed `items` after `heads`.
+
+    Open prefixes are still being extended; closed ones are followed by
+    something unknown. Prefixes stop growing at `limit` chars.
+    """
+
+    closed: set[str] = set()
+    for op, arg in items:
+        closed |= {h for h in heads if len(h) >= limit}
+        heads = {h for h in heads if len(h) < limit}
+        if not heads:
+            break
+        name = str(op)
+        if name in tool_log._ZERO_WIDTH:
+            continue
+        if name == "LITERAL":
+            heads = {h + chr(arg).lower() for h in heads}
+        elif name == "IN" and (chars := _class_chars(arg)) is not None:
+            heads = {h + c for h in heads for c in chars}
+        elif name == "BRANCH":
+            walked = [_prefixes(branch, heads, limit) for branch in arg[1]]
+            heads = set().union(*(w[0] for w in walked))
+            closed = closed.union(*(w[1] for w in walked))
+        elif name in ("SUBPATTERN", "ATOMIC_GROUP"):
+            heads, inner = _prefixes(arg[-1] if name == "SUBPATTERN" else arg, heads, limit)
+            closed |= inner
+        elif name in tool_log._REPEATS:
+            lo, hi, sub = arg
+            reps = heads
+            for _ in range(min(max(lo, 1), limit)):
+                reps, inner = _prefixes(sub, reps, limit)
+                closed |= inner
+            if lo == 0 and hi == 1:
+                heads = heads | reps  # absent or present once
+            elif lo == 0:
+                closed |= reps  # absent, or present and then unknown repetitions
+            elif hi == lo:
+                heads = reps
+            else:
+                closed |= reps
+                heads = set()
+        else:
+            closed |= heads
+            heads = set()
+        if len(heads) > _MAX_PREFIXES:
+            closed |= heads
+            heads = set()
+    return heads, closed
+
+
+def _keywords_cover(pattern: re.Pattern[str], keywords: tuple[str, ...]) -> bool:
+    """Whether every match of `pattern` starts with one of the lowercase `keywords`.
+
+    Walks re's own parse of the pattern (no public API exposes it); without
+    that parser the check is skipped.
+    """
+
+    try:
+        from re import _parser  # type: ignore[attr-defined]
+
+        items = _parser.parse(pattern.pattern, pattern.flags).data
+    except (ImportError, AttributeError):
+        return True
+    heads, closed = _prefixes(items, {""}, max(map(len, keywords)))
+    return all(p.startswith(keywords) for p in heads | closed)
+
+
+@dataclass(frozen=True)
+class RulePack:
+    """A named set of injection and redaction rules, compiled once.
+
+    `scanner` (an InjectionScanner over `injection_rules`) and `redactor` (a
+    Redactor over `redactions`) are built when the pack is created, so loading
+    a pack pays for regex compilation and the keyword trie up front and every
+    later scan reuses them.
+    """
+
+    name: str
+    injection_rules: tuple[ScanRule, ...] = DEFAULT_RULES
+    redactions: tuple[tuple[str, re.Pattern[str]], ...] = ()
+    scanner: InjectionScanner = field(init=False, repr=False, compare=False)
+    redactor: Redactor = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "scanner", InjectionScanner(self.injection_rules))
+        object.__setattr__(self, "redactor", Redactor(self.redactions))
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any], *, where: str = "rule pack") -> RulePack:
+        """Build a pack from its JSON form:
+
+        {"name": "tenant-a",
+         "include_defaults": false,
+         "injection": [{"kind": "...", "pattern": "...", "flags": "is",
+                        "keywords": ["ignore", "..."]}],
+         "redaction": [{"label": "...", "pattern": "...", "flags": "i"}]}
+
+        `keywords` are optional literals every match starts with (see ScanRule);
+        rules with keywords are far cheaper to scan. A pattern that could match
+        text starting with none of them (as far as its literal prefixes show)
+        raises ValueError, since the scanner would miss those matches. With
+        include_defaults the built-in rules come first.
+        """
+
+        unknown = set(data) - {"name", "include_defaults", "injection", "redaction"}
+        if unknown:
+            raise ValueError(f"{where}: unknown keys {sorted(unknown)}")
+        include = bool(data.get("include_defaults", False))
+
+        rules = list(DEFAULT_RULES) if include else []
+        for i, r in enumerate(data.get("injection", [])):
+            at = f"{where}: injection[{i}]"
+            if "kind" not in r or "pattern" not in r:
+                raise ValueError(f"{at}: needs 'kind' and 'pattern'")
+            keywords = tuple(k.lower() for k in r.get("keywords", ()))
+            if not all(keywords):
+                raise ValueError(f"{at}: keywords must be non-empty")
+            pattern = _compile(r["pattern"], r.get("flags", ""), at)
+            if keywords and not _keywords_cover(pattern, keywords):
+                raise ValueError(f"{at}: the pattern can match text not starting with a keyword")
+            rules.append(ScanRule(r["kind"], pattern, keywords))
+
+        redactions = list(DEFAULT_PACK.redactions) if include else []
+        for i, r in enumerate(data.get("redaction", [])):
+            at = f"{where}: redaction[{i}]"
+            if "label" not in r or "pattern" not in r:
+                raise ValueError(f"{at}: needs 'label' and 'pattern'")
+            redactions.append((r["label"], _compile(r["pattern"], r.get("flags", ""), at)))
+
+        return cls(
+            name=str(data.get("name", "")),
+            injection_rules=tuple(rules),
+            redactions=tuple(redactions),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "injection": [
+                {
+                    "kind": r.kind,
+                    "pattern": r.pattern.pattern,
+                    "flags": _flag_letters(r.pattern.flags),
+                    "keywords": list(r.keywords),
+                }
+                for r in self.injection_rules
+            ],
+            "redaction": [
+                {"label": label, "pattern": p.pattern, "flags": _flag_letters(p.flags)}
+                for label, p in self.redactions
+            ],
+        }
+
+
+def load_rule_pack(path: str | os.PathLike[str]) -> RulePack:
+    """Read and compile a JSON rule pack (format: RulePack.from_dict)."""
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return RulePack.from_dict(data, where=os.fspath(path))
+
+
+DEFAULT_PACK = RulePack(
+    name="default",
+    injection_rules=DEFAULT_RULES,
+    redactions=tuple(tool_log._REDACTIONS),
+)
+_active = DEFAULT_PACK
+
+
+def get_active_rule_pack() -> RulePack:
+    return _active
+
+
+def set_active_rule_pack(pack: RulePack | None) -> None:
+    """Swap the process-wide rules; None restores the built-in ones.
+
+    The pack's rules back scan_for_injection, has_injection,
+    scan_all_injections, the streaming scans and the redact_secrets functions.
+    The swap takes effect for the next call, without a restart; each call uses
+    one pack throughout. Cached scan results are keyed by the rule-set version,
+    so results of the previous pack are not reused.
+
+    Worker processes forked after this call share the compiled pack instead
+    of compiling their own (call gc.freeze() before forking to keep the
+    pages shared); pools using "spawn" must call it in each worker.
+    """
+
+    global _active
+    pack = pack or DEFAULT_PACK
+    injection._SCANNER = pack.scanner
+    tool_log._REDACTIONS = list(pack.redactions)
+    tool_log._REDACTOR = pack.redactor
+    _active = pack
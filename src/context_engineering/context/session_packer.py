@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import chain, pairwise
+from typing import Literal, overload
+
+from context_engineering.context.budget import Budget
+from context_engineering.context.packer import PackResult, _result
+from context_engineering.types import Message
+
+Policy = Literal["priority", "recency"]
+
+# Marks slots that the fill phase must never pick.
+_BLOCKED = float("inf")
+
+
+class _MinTree:
+    """Growable min segment tree with "next slot whose size fits" searches.
+
+    Each search returns the nearest slot (left or right of a position) whose
+    value is <= a capacity, skipping whole subtrees of messages that cannot fit.
+    """
+
+    def __init__(self) -> None:
+        self.n = 0
+        self._cap = 1
+        self._tree: list[float] = [_BLOCKED, _BLOCKED]
+
+    def append(self, value: float) -> None:
+        if self.n == self._cap:
+            leaves = self._tree[self._cap : self._cap + self.n]
+            self._cap *= 2
+            self._tree = [_BLOCKED] * (2 * self._cap)
+            self._tree[self._cap : self._cap + self.n] = leaves
+            for i in range(self._cap - 1, 0, -1):
+                self._tree[i] = min(self._tree[2 * i], self._tree[2 * i + 1])
+        self.n += 1
+        self.set(self.n - 1, value)
+
+    def set(self, pos: int, value: float) -> None:
+        tree = self._tree
+        i = pos + self._cap
+        tree[i] = value
+        i >>= 1
+        while i:
+            tree[i] = min(tree[2 * i], tree[2 * i + 1])
+            i >>= 1
+
+    def find_first(self, lo: int, capacity: float) -> int:
+        """Smallest position >= lo whose value fits, or -1."""
+
+        if lo >= self.n:
+            return -1
+        tree = self._tree
+        i = lo + self._cap
+        while tree[i] > capacity:
+            while i & 1:  # right child: climb
+                i >>= 1
+            if i == 0:
+                return -1
+            i += 1
+        while i < self._cap:
+            i = 2 * i if tree[2 * i] <= capacity else 2 * i + 1
+        return i - self._cap
+
+    def find_last(self, hi: int, capacity: float) -> int:
+        """Largest position <= hi whose value fits, or -1."""
+
+        if hi < 0:
+            return -1
+        tree = self._tree
+        i = hi + self._cap
+        while tree[i] > capacity:
+            while not i & 1:  # left child: climb
+                i >>= 1
+            if i == 1:
+                return -1
+            i -= 1
+        while i < self._cap:
+            i = 2 * i + 1 if tree[2 * i + 1] <= capacity else 2 * i
+        return i - self._cap
+
+
+class _Dropped(Sequence[Message]):
+    """The messages of history[:n] that are not at the sorted `kept` indices.
+
+    Held as the kept index list, like MessageViews, so a result costs O(k) for
+    k kept messages however long the history is. The history list is only
+    ever appended to, so a view stays valid as the session grows. With
+    newest_first the messages are listed newest first, as pack_recency_first
+    reports them. Compares equal to any sequence with the same messages.
+    """
+
+    __slots__ = ("_items", "_kept", "_n", "_newest_first")
+
+    def __init__(
+        self, items: list[Message], n: int, kept: list[int], *, newest_first: bool = False
+    ) -> None:
+        self._items = items
+        self._n = n
+        self._kept = kept
+        self._newest_first = newest_first
+
+    def __len__(self) -> int:
+        return self._n - len(self._kept)
+
+    @overload
+    def __getitem__(self, j: int) -> Message: ...
+
+    @overload
+    def __getitem__(self, j: slice) -> list[Message]: ...
+
+    def __getitem__(self, j: int | slice) -> Message | list[Message]:
+        if isinstance(j, slice):
+            return [self[i] for i in range(*j.indices(len(self)))]
+        n = len(self)
+        if j < 0:
+            j += n
+        if not 0 <= j < n:
+            raise IndexError("dropped index out of range")
+        if self._newest_first:
+            j = n - 1 - j
+        # kept[t] - t dropped messages come before kept[t], and that count never
+        # decreases, so bisect for the number of kept messages before the j-th.
+        kept = self._kept
+        lo, hi = 0, len(kept)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if kept[mid] - mid <= j:
+                lo = mid + 1
+            else:
+                hi = mid
+        return self._items[j + lo]
+
+    def __iter__(self) -> Iterator[Message]:
+        bounds = [-1, *self._kept, self._n]
+        pairs = pairwise(bounds)
+        if self._newest_first:
+            gaps = (range(b - 1, a, -1) for a, b in reversed(list(pairs)))
+        else:
+            gaps = (range(a + 1, b) for a, b in pairs)
+        return map(self._items.__getitem__, chain.from_iterable(gaps))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"_Dropped({len(self)} messages)"
+
+
+class SessionPacker:
+    """Keep a packed context up to date as a conversation grows.
+
+    Produces the same PackResult as calling pack_priority_first (or
+    pack_recency_first) on the full history, without rescanning it each turn.
+
+    State kept between turns:
+    - per-message sizes (chars or tokens), measured once
+    - the latest user / first system indices
+    - min segment trees over developer, tool and fill-phase sizes
+    - the current selection (sorted kept indices), its total, and the room
+      left where a new developer, tool or fill message would be tried
+
+    Most appends are applied as a delta in O(1): a message that does not fit
+    where the policy tries it changes nothing else, and one that fits into the
+    space still free pushes nothing out, so it is just added. Anything else (a
+    new latest user message, or one that would evict kept messages) reruns the
+    selection along the eviction frontier: each group is scanned in policy
+    order but the trees jump straight to the next message that still fits, so
+    that costs O((k + 1) log n) for k packed messages.
+
+    `dropped` is a lazy view holding the kept indices, like MessageViews, so
+    no turn touches the whole history.
+    """
+
+    def __init__(self, budget: Budget, *, policy: Policy = "priority") -> None:
+        if policy not in ("priority", "recency"):
+            raise ValueError(f"Unknown policy: {policy!r}")
+        self.budget = budget
+        self.policy = policy
+        self._msgs: list[Message] = []
+        self._sizes: list[int] = []
+        self._idx_system0: int | None = None
+        self._latest_user_idx: int | None = None
+        # priority policy
+        self._developer_idxs: list[int] = []
+        self._tool_idxs: list[int] = []
+        self._developers = _MinTree()
+        self._tools = _MinTree()
+        self._fill = _MinTree()
+        # recency policy: non-system messages in chronological order
+        self._rest: list[Message] = []
+        self._rest_sizes: list[int] = []
+        # Selection carried between turns: sorted kept indices (into _msgs, or
+        # into _rest for recency), their total, and the room left after the
+        # developer group and before the fill phase. Stale while _dirty.
+        self._kept: list[int] = []
+        self._total = 0
+        self._developer_room = 0
+        self._fill_room = 0
+        self._dirty = True
+
+    @property
+    def messages(self) -> list[Message]:
+        return list(self._msgs)
+
+    def __len__(self) -> int:
+        return len(self._msgs)
+
+    def append(self, message: Message) -> PackResult:
+        return self.extend([message])
+
+    def extend(self, messages: Iterable[Message]) -> PackResult:
+        """Append messages to the session and return the updated packing."""
+
+        for m in messages:
+            self._add(m)
+        return self.pack()
+
+    def _add(self, m: Message) -> None:
+        i = len(self._msgs)
+        size = self.budget.measure(m.content)
+        self._msgs.append(m)
+        self._sizes.append(size)
+
+        if self.policy == "recency":
+            if m.role == "system":
+                if self._idx_system0 is None:
+                    self._idx_system0 = i
+                    self._dirty = True
+                # Later system messages are neither packed nor dropped.
+            else:
+                self._rest.append(m)
+                self._rest_sizes.append(size)
+                self._fill.append(size)
+                self._delta(len(self._rest) - 1, size, "fill")
+            return
+
+        fill_value: float = _BLOCKED
+        if m.role == "system":
+            if self._idx_system0 is None:
+                self._idx_system0 = i
+                self._dirty = True
+            else:
+                fill_value = size
+        elif m.role == "developer":
+            self._developer_idxs.append(i)
+            self._developers.append(size)
+        elif m.role == "tool":
+            self._tool_idxs.append(i)
+            self._tools.append(size)
+        elif m.role == "user":
+            # The previous latest user message drops back into the recency fill.
+            if self._latest_user_idx is not None:
+                self._fill.set(self._latest_user_idx, self._sizes[self._latest_user_idx])
+            self._latest_user_idx = i
+            self._dirty = True
+        else:
+            fill_value = size
+        self._fill.append(fill_value)
+
+        if m.role == "developer":
+            self._delta(i, size, "developer")
+        elif m.role == "tool":
+            self._delta(i, size, "tool")
+        elif fill_value != _BLOCKED:
+            self._delta(i, size, "fill")
+
+    def _delta(self, i: int, size: int, stage: Literal["developer", "tool", "fill"]) -> None:
+        """Apply the newest message i to the kept selection, if that is enough.
+
+        A new developer (tool) message is tried last in its group, and a new
+        fill message first in the fill phase.
+        """
+
+        if self._dirty:
+            return
+        room = self._developer_room if stage == "developer" else self._fill_room
+        if size > room:
+            # Not taken: every other decision sees the same room as before.
+            return
+        if self._total + size > self.budget.limit:
+            # Taking it would push kept messages out.
+            self._dirty = True
+            return
+        # Every later decision sees `size` less room, but each kept message
+        # left at least the final free room behind it, which covers `size`.
+        self._kept.append(i)
+        self._total += size
+        if stage == "developer":
+            self._developer_room -= size
+        if stage != "fill":
+            self._fill_room -= size
+
+    def pack(self) -> PackResult:
+        """Return the PackResult for the current history."""
+
+        if self.policy == "recency":
+            return self._pack_recency()
+        return self._pack_priority()
+
+    def _select_priority(self) -> None:
+        limit = self.budget.limit
+        sizes = self._sizes
+        selected: list[int] = []
+        total = 0
+
+        def take(i: int) -> None:
+            nonlocal total
+            selected.append(i)
+            total += sizes[i]
+
+        def fill_group(tree: _MinTree, idxs: list[int]) -> None:
+            pos = tree.find_first(0, limit - total)
+            while pos >= 0:
+                take(idxs[pos])
+                pos = tree.find_first(pos + 1, limit - total)
+
+        if self._idx_system0 is not None and sizes[self._idx_system0] <= limit:
+            take(self._idx_system0)
+        fill_group(self._developers, self._developer_idxs)
+        self._developer_room = limit - total
+        if self._latest_user_idx is not None and total + sizes[self._latest_user_idx] <= limit:
+            take(self._latest_user_idx)
+        fill_group(self._tools, self._tool_idxs)
+        self._fill_room = limit - total
+
+        i = self._fill.find_last(self._fill.n - 1, limit - total)
+        while i >= 0:
+            take(i)
+            i = self._fill.find_last(i - 1, limit - total)
+
+        selected.sort()
+        self._kept = selected
+        self._total = total
+        self._dirty = False
+
+    def _select_recency(self) -> None:
+        limit = self.budget.limit
+        sizes = self._rest_sizes
+        total = 0
+        if self._idx_system0 is not None:
+            # The first system message is always kept, even over budget.
+            total = self._sizes[self._idx_system0]
+        self._fill_room = limit - total
+
+        kept: list[int] = []  # positions in `rest`, newest->oldest
+        pos = self._fill.find_last(len(sizes) - 1, limit - total)
+        while pos >= 0:
+            kept.append(pos)
+            total += sizes[pos]
+            pos = self._fill.find_last(pos - 1, limit - total)
+
+        kept.reverse()
+        self._kept = kept
+        self._total = total
+        self._dirty = False
+
+    def _pack_priority(self) -> PackResult:
+        if self._dirty:
+            self._select_priority()
+        msgs = self._msgs
+        kept = list(self._kept)
+        packed = [msgs[i] for i in kept]
+        dropped = _Dropped(msgs, len(msgs), kept)
+        return _result(packed, dropped, self._total, self.budget)  # type: ignore[arg-type]
+
+    def _pack_recency(self) -> PackResult:
+        if self._dirty:
+            self._select_recency()
+        rest = self._rest
+        kept = list(self._kept)
+        packed = [] if self._idx_system0 is None else [self._msgs[self._idx_system0]]
+        packed.extend(rest[p] for p in kept)
+        # Dropped is reported newest->oldest, like pack_recency_first.
+        dropped = _Dropped(rest, len(rest), kept, newest_first=True)
+        return _result(packed, dropped, self._total, self.budget)  # type: ignore[arg-type]
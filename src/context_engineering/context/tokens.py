@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Protocol
+
+
+class Tokenizer(Protocol):
+    """Anything that can count tokens in a string (e.g. a wrapper around tiktoken)."""
+
+    def count(self, text: str) -> int: ...
+
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+class SimpleTokenizer:
+    """Offline approximation of a BPE tokenizer.
+
+    Words are split into pieces of up to `chars_per_piece` characters and each
+    punctuation mark counts as one token. For English prose this lands close to
+    real model tokenizers (~4 chars/token) without any downloads.
+    """
+
+    def __init__(self, chars_per_piece: int = 4) -> None:
+        if chars_per_piece <= 0:
+            raise ValueError("chars_per_piece must be positive")
+        self.chars_per_piece = chars_per_piece
+
+    def count(self, text: str) -> int:
+        step = self.chars_per_piece
+        return sum((len(tok) + step - 1) // step for tok in _TOKEN.findall(text))
+
+
+class TokenCounter:
+    """Memoized token counts, keyed by content.
+
+    Keep one counter for the whole session (it lives on the Budget) so each
+    message is tokenized once, not once per pack attempt.
+
+    The memo is an LRU bounded by `max_entries` and by `max_chars` of keys, so
+    a long-lived budget does not hold every string it ever measured; a text
+    longer than max_chars is counted but not memoized. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        tokenizer: Tokenizer | None = None,
+        *,
+        max_entries: int = 100_000,
+        max_chars: int = 64 << 20,
+    ) -> None:
+        if max_entries <= 0 or max_chars <= 0:
+            raise ValueError("max_entries and max_chars must be positive")
+        self.tokenizer: Tokenizer = tokenizer or SimpleTokenizer()
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._cache: OrderedDict[str, int] = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    def count(self, text: str) -> int:
+        cache = self._cache
+        n = cache.get(text)
+        if n is not None:
+            try:
+                cache.move_to_end(text)
+            except KeyError:  # evicted by another thread meanwhile
+                pass
+            return n
+        n = self.tokenizer.count(text)
+        if len(text) > self.max_chars:
+            return n
+        with self._lock:
+            if text not in cache:
+                cache[text] = n
+                self._chars += len(text)
+                while len(cache) > self.max_entries or self._chars > self.max_chars:
+                    self._chars -= len(cache.popitem(last=False)[0])
+        return n
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __getstate__(self) -> dict[str, object]:
+        # Budgets (and their counters) are pickled to pool workers; locks are not.
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict[str, object]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._chars = 0
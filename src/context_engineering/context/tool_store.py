@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import json
+import math
+import mmap
+import os
+import struct
+from collections.abc import Iterator
+from datetime import UTC, datetime
+from typing import Self
+
+from context_engineering.context.tool_log import ToolEvent
+
+# Record: payload length, created_at as a UTC timestamp (NaN if unset), payload.
+_RECORD = struct.Struct("<Id")
+# Index entry per full block: byte offset, min and max timestamp in the block.
+_ENTRY = struct.Struct("<Qdd")
+# Records per index block.
+_BLOCK = 64
+
+
+def _aware(dt: datetime) -> bool:
+    return dt.utcoffset() is not None
+
+
+def _timestamp(created_at: datetime | None) -> float:
+    """Seconds since the epoch; naive values are read as UTC wall time.
+
+    Unlike datetime.timestamp(), naive values never go through the local
+    time zone, so the order of stored values does not depend on where (or
+    across which DST change) the store is written and read.
+    """
+
+    if created_at is None:
+        return math.nan
+    if not _aware(created_at):
+        created_at = created_at.replace(tzinfo=UTC)
+    return created_at.timestamp()
+
+
+def _encode(ev: ToolEvent) -> bytes:
+    created = ev.created_at.isoformat() if ev.created_at else None
+    payload = json.dumps(
+        [ev.tool_name, ev.tool_input, ev.tool_output, created], ensure_ascii=False
+    ).encode("utf-8", "surrogatepass")
+    return _RECORD.pack(len(payload), _timestamp(ev.created_at)) + payload
+
+
+def _decode(buf: mmap.mmap | bytes, pos: int, size: int) -> ToolEvent:
+    name, tool_input, tool_output, created = json.loads(
+        buf[pos : pos + size].decode("utf-8", "surrogatepass")
+    )
+    return ToolEvent(
+        tool_name=name,
+        tool_input=tool_input,
+        tool_output=tool_output,
+        created_at=datetime.fromisoformat(created) if created else None,
+    )
+
+
+class ToolEventStore:
+    """Append-only on-disk ToolEvent log with a sparse block index.
+
+    Files in the store directory:
+    - events.log: length-prefixed records, each with its created_at timestamp
+      in the header, so range filters do not decode payloads
+    - events.idx: per block of 64 records, its byte offset and min/max
+      timestamp
+
+    Appends go through a buffered file (call flush() or close(), or use the
+    store as a context manager); reads flush first, then memory-map the log.
+    newest(n) jumps to the block holding the n-th newest event; between()
+    skips blocks whose timestamps are out of range. Neither loads the whole
+    log. Both return events oldest first, as render_tool_transcript expects.
+
+    A record cut short by a crash is dropped when the store is reopened, and
+    index entries lost the same way are rebuilt from the log.
+
+    created_at values must be all naive or all aware, as they would have to
+    be to compare them; mixing them raises TypeError.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = os.fspath(path)
+        os.makedirs(self.path, exist_ok=True)
+        self._log_path = os.path.join(self.path, "events.log")
+        self._idx_path = os.path.join(self.path, "events.idx")
+        for p in (self._log_path, self._idx_path):
+            if not os.path.exists(p):
+                open(p, "ab").close()
+        self._offsets: list[int] = []  # byte offset of each full block
+        self._ranges: list[tuple[float, float]] = []  # (min, max) timestamp per block
+        self._recover()
+        # Held open for appends until close().
+        self._log = open(self._log_path, "ab")  # noqa: SIM115
+        self._idx = open(self._idx_path, "ab")  # noqa: SIM115
+        # Whether stored created_at values are aware; None until one is stored.
+        self._aware = self._stored_awareness()
+
+    def _recover(self) -> None:
+        with open(self._idx_path, "rb") as f:
+            data = f.read()
+        whole = len(data) - len(data) % _ENTRY.size
+        for offset, lo, hi in _ENTRY.iter_unpack(data[:whole]):
+            self._offsets.append(offset)
+            self._ranges.append((lo, hi))
+
+        # Drop index entries for blocks the log does not fully hold.
+        log_size = os.path.getsize(self._log_path)
+        pos = 0
+        while self._offsets:
+            end = self._skip(self._offsets[-1], _BLOCK, log_size)
+            if end is not None:
+                pos = end
+                break
+            self._offsets.pop()
+            self._ranges.pop()
+            whole -= _ENTRY.size
+
+        # Records after the last indexed block: the open block, plus any blocks
+        # whose index entries were lost.
+        self._tail_start = pos
+        self._tail: list[float] = []
+        entries = []
+        with open(self._log_path, "rb") as f:
+            f.seek(pos)
+            while True:
+                header = f.read(_RECORD.size)
+                if len(header) < _RECORD.size:
+                    break
+                size, ts = _RECORD.unpack(header)
+                if pos + _RECORD.size + size > log_size:
+                    break
+                f.seek(size, os.SEEK_CUR)
+                pos += _RECORD.size + size
+                self._tail.append(ts)
+                if len(self._tail) == _BLOCK:
+                    entries.append(self._close_block(pos))
+        if pos < log_size:
+            os.truncate(self._log_path, pos)
+        with open(self._idx_path, "r+b") as f:
+            f.truncate(whole)
+            f.seek(whole)
+            f.writelines(entries)
+        self._size = pos
+
+    def _skip(self, pos: int, records: int, limit: int) -> int | None:
+        """Byte offset `records` records after `pos`, or None past `limit`."""
+
+        with open(self._log_path, "rb") as f:
+            for _ in range(records):
+                f.seek(pos)
+                header = f.read(_RECORD.size)
+                if len(header) < _RECORD.size:
+                    return None
+                pos += _RECORD.size + _RECORD.unpack(header)[0]
+        return pos if pos <= limit else None
+
+    def _close_block(self, end: int) -> bytes:
+        """Index the full tail block, which ends at byte `end`."""
+
+        known = [t for t in self._tail if not math.isnan(t)]
+        lo, hi = (min(known), max(known)) if known else (math.inf, -math.inf)
+        entry = _ENTRY.pack(self._tail_start, lo, hi)
+        self._offsets.append(self._tail_start)
+        self._ranges.append((lo, hi))
+        self._tail = []
+        self._tail_start = end
+        return entry
+
+    def _stored_awareness(self) -> bool | None:
+        """Awareness of the first stored created_at, or None if there is none."""
+
+        starts = [off for off, (lo, _) in zip(self._offsets, self._ranges) if lo != math.inf]
+        if not starts:
+            if all(math.isnan(t) for t in self._tail):
+                return None
+            starts.append(self._tail_start)
+        buf = self._map()
+        try:
+            for at, size, ts in self._records(buf, starts[0], self._size):
+                if not math.isnan(ts):
+                    return _aware(_decode(buf, at, size).created_at)  # type: ignore[arg-type]
+            return None  # pragma: no cover - the block index says otherwise
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+    def _check(self, dt: datetime) -> None:
+        if self._aware is not None and _aware(dt) != self._aware:
+            stored = "aware" if self._aware else "naive"
+            raise TypeError(f"Stored created_at values are {stored}, got {dt!r}")
+
+    def __len__(self) -> int:
+        return len(self._offsets) * _BLOCK + len(self._tail)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def append(self, event: ToolEvent) -> None:
+        if event.created_at is not None:
+            self._check(event.created_at)
+            self._aware = _aware(event.created_at)
+        record = _encode(event)
+        self._log.write(record)
+        self._size += len(record)
+        self._tail.append(_timestamp(event.created_at))
+        if len(self._tail) == _BLOCK:
+            self._idx.write(self._close_block(self._size))
+
+    def extend(self, events: list[ToolEvent]) -> None:
+        for event in events:
+            self.append(event)
+
+    def flush(self) -> None:
+        # The log first; on reopen, index entries past the log are dropped anyway.
+        self._log.flush()
+        self._idx.flush()
+
+    def close(self) -> None:
+        self._log.close()
+        self._idx.close()
+
+    def _records(
+        self, buf: mmap.mmap | bytes, pos: int, end: int
+    ) -> Iterator[tuple[int, int, float]]:
+        """(payload offset, payload size, timestamp) of each record in buf[pos:end]."""
+
+        while pos < end:
+            size, ts = _RECORD.unpack_from(buf, pos)
+            pos += _RECORD.size
+            yield pos, size, ts
+            pos += size
+
+    def _map(self) -> mmap.mmap | bytes:
+        self.flush()
+        if not self._size:
+            return b""
+        with open(self._log_path, "rb") as f:
+            return mmap.mmap(f.fileno(), self._size, access=mmap.ACCESS_READ)
+
+    def newest(self, n: int) -> list[ToolEvent]:
+        """The newest n events, oldest first."""
+
+        total = len(self)
+        n = max(0, min(n, total))
+        if n == 0:
+            return []
+        first = total - n
+        block = first // _BLOCK
+        pos = self._offsets[block] if block < len(self._offsets) else self._tail_start
+        skip = first - block * _BLOCK
+        buf = self._map()
+        try:
+            records = self._records(buf, pos, self._size)
+            return [
+                _decode(buf, at, size) for i, (at, size, _) in enumerate(records) if i >= skip
+            ]
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+    def between(self, start: datetime, end: datetime) -> list[ToolEvent]:
+        """Events with start <= created_at < end, in log order.
+
+        Events without created_at never match. start/end must be naive or
+        aware like the stored created_at values, else TypeError is raised.
+        """
+
+        if _aware(start) != _aware(end):
+            raise TypeError("start and end must both be naive or both be aware")
+        self._check(start)
+        lo, hi = _timestamp(start), _timestamp(end)
+        buf = self._map()
+        try:
+            spans = [
+                (offset, self._offsets[i + 1] if i + 1 < len(self._offsets) else self._tail_start)
+                for i, (offset, (b_lo, b_hi)) in enumerate(zip(self._offsets, self._ranges))
+                if b_lo < hi and b_hi >= lo
+            ]
+            spans.append((self._tail_start, self._size))
+            events = []
+            for a, b in spans:
+                for at, size, ts in self._records(buf, a, b):
+                    if lo <= ts < hi:
+                        events.append(_decode(buf, at, size))
+            return events
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 
+import sys
+from collections.abc import Mapping
 from dataclasses import dataclass
+from types import MappingProxyType
 from typing import Any, Literal
 
 
@@ -15,4 +18,33 @@ class Message:
     role: Role
     content: str
     name: str | None = None
-    meta: dict[str, Any] | None = None
\ No newline at end of file
+    meta: dict[str, Any] | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class CompactMessage:
+    """Memory-compact drop-in for Message, for large in-memory histories.
+
+    Same constructor and fields, but:
+    - __slots__ instead of a per-instance __dict__
+    - the role string is interned, so a million messages share five roles
+    - meta is a read-only mapping; an existing MappingProxyType is shared as-is
+
+    `length` is len(content). CPython strings already cache their length, so
+    it is exposed as a property rather than stored in another slot.
+    """
+
+    role: Role
+    content: str
+    name: str | None = None
+    meta: Mapping[str, Any] | None = None
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "role", sys.intern(self.role))
+        meta = self.meta
+        if meta is not None and not isinstance(meta, MappingProxyType):
+            object.__setattr__(self, "meta", MappingProxyType(dict(meta)))
+
+    @property
+    def length(self) -> int:
+        return len(self.content)
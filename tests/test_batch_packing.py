@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from context_engineering.context.batch import role_codes, select_many
+from context_engineering.context.packer import _priority_selection, _recency_indices
+
+np = pytest.importorskip("numpy")
+
+ROLES = ["system", "developer", "user", "assistant", "tool", "critic"]
+
+
+def _expected(
+    roles: list[str], sizes: list[int], limit: int, policy: str
+) -> tuple[list[bool], int]:
+    if policy == "recency":
+        sys0, kept, _, total = _recency_indices(roles, sizes, limit)
+        keep = set(kept) | ({sys0} if sys0 is not None else set())
+        return [i in keep for i in range(len(roles))], total
+    selected, total = _priority_selection(roles, sizes, limit)
+    return [bool(b) for b in selected], total
+
+
+@pytest.mark.parametrize("policy", ["recency", "priority"])
+def test_select_many_matches_scalar_policies(policy: str) -> None:
+    rng = random.Random(5)
+    for n_conv, max_len in [(0, 0), (3, 12), (200, 40), (80, 400)]:
+        convs = [
+            ([rng.choice(ROLES) for _ in range(n)], [rng.randint(0, 80) for _ in range(n)])
+            for n in (rng.randint(0, max_len) for _ in range(n_conv))
+        ]
+        limit = rng.randint(50, 1500)
+        sel = select_many(
+            [s for _, sizes in convs for s in sizes],
+            role_codes(r for roles, _ in convs for r in roles),
+            [len(roles) for roles, _ in convs],
+            limit,
+            policy=policy,
+        )
+        accepted = sel.accepted.tolist()
+        start = 0
+        for ci, (roles, sizes) in enumerate(convs):
+            keep, total = _expected(roles, sizes, limit, policy)
+            assert accepted[start : start + len(roles)] == keep
+            assert sel.totals[ci] == total
+            start += len(roles)
+
+
+def test_select_many_rejects_unknown_policy() -> None:
+    with pytest.raises(ValueError):
+        select_many([1], role_codes(["user"]), [1], 10, policy="fifo")  # type: ignore[arg-type]
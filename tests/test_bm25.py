@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import math
+import random
+import re
+from collections import Counter
+
+import pytest
+
+from context_engineering.context.bm25 import BM25Index
+from context_engineering.context.retrieval_bundle import RetrievedChunk, bundle_retrieved_chunks
+
+pytest.importorskip("numpy")
+
+
+def _reference_scores(chunks: list[RetrievedChunk], query: str, k1=1.2, b=0.75) -> list[float]:
+    docs = [Counter(re.findall(r"\w+", c.text.lower())) for c in chunks]
+    avgdl = sum(sum(d.values()) for d in docs) / len(docs)
+    scores = []
+    for d in docs:
+        dl = sum(d.values())
+        s = 0.0
+        for term in re.findall(r"\w+", query.lower()):
+            df = sum(term in other for other in docs)
+            if d[term]:
+                idf = math.log1p((len(docs) - df + 0.5) / (df + 0.5))
+                s += idf * d[term] * (k1 + 1) / (d[term] + k1 * (1 - b + b * dl / avgdl))
+        scores.append(s)
+    return scores
+
+
+def test_bm25_matches_reference_scoring_and_round_trips(tmp_path) -> None:
+    rng = random.Random(3)
+    words = [
+        "ramp",
+        "hotel",
+        "access",
+        "station",
+        "lift",
+        "stairs",
+        "quiet",
+        "route",
+        "map",
+        "café",
+    ]
+    chunks = [
+        RetrievedChunk(
+            chunk_id=f"doc{i}",
+            text=" ".join(rng.choices(words, k=rng.randint(3, 40))),
+            source=None if i % 3 == 0 else f"kb/{i}",
+        )
+        for i in range(300)
+    ]
+    index = BM25Index.build(chunks)
+    index.save(tmp_path / "idx")
+    loaded = BM25Index.load(tmp_path / "idx")
+
+    for query in ["ramp", "Hotel ACCESS lift", "café café map", "missing words"]:
+        ref = _reference_scores(chunks, query)
+        expected = sorted((i for i, s in enumerate(ref) if s > 0), key=lambda i: (-ref[i], i))
+        for idx in (index, loaded):
+            docs, scores = idx.top_k(query, 10)
+            assert [ref[i] for i in docs] == pytest.approx([ref[i] for i in expected[:10]])
+            assert scores.tolist() == pytest.approx([ref[i] for i in docs], rel=1e-5)
+
+    hits = loaded.search("quiet stairs", k=3)
+    assert [h.chunk_id for h in hits] == [h.chunk_id for h in index.search("quiet stairs", k=3)]
+    assert hits[0] == chunks[int(loaded.top_k("quiet stairs", 1)[0][0])]
+    assert "BEGIN RETRIEVED DATA" in bundle_retrieved_chunks(hits).bundled_text
+
+
+def test_bm25_ties_break_by_document_position() -> None:
+    rng = random.Random(4)
+    texts = ["ramp hotel", "hotel lift", "ramp", "lift lift stairs"]
+    chunks = [RetrievedChunk(chunk_id=f"doc{i}", text=rng.choice(texts)) for i in range(300)]
+    index = BM25Index.build(chunks)
+
+    for query in ["ramp", "hotel lift", "ramp lift stairs"]:
+        all_docs, all_scores = index.top_k(query, len(chunks))
+        ranked = list(zip((-all_scores).tolist(), all_docs.tolist()))
+        assert ranked == sorted(ranked)
+        for k in (1, 5, 37, 120):
+            assert index.top_k(query, k)[0].tolist() == all_docs[:k].tolist()
@@ -1,7 +1,19 @@
 from __future__ import annotations
 
-from context_engineering.context.budget import Budget
-from context_engineering.context.packer import pack_recency_first
+import random
+
+import pytest
+
+from context_engineering.context import packer
+from context_engineering.context.budget import Budget, size_chars
+from context_engineering.context.knapsack import solve_knapsack
+from context_engineering.context.packer import (
+    PackResult,
+    pack_priority_first,
+    pack_priority_with_digests,
+    pack_recency_first,
+    pack_value_weighted,
+)
 from context_engineering.types import Message
 
 
@@ -31,3 +43,303 @@ def test_packer_prefers_newest() -> None:
 
     packed_text = " ".join(m.content for m in result.packed)
     assert "new" in packed_text
+
+
+# --- Reference (original quadratic) policies, used to lock behavior of the linear engine ---
+
+
+def _reference_recency_first(msgs: list[Message], budget: Budget) -> PackResult:
+    system = [m for m in msgs if m.role == "system"]
+    rest = [m for m in msgs if m.role != "system"]
+    packed_rev: list[Message] = []
+    dropped: list[Message] = []
+    if system:
+        packed_rev.append(system[0])
+    for m in reversed(rest):
+        if size_chars(packed_rev + [m]) <= budget.max_chars:
+            packed_rev.append(m)
+        else:
+            dropped.append(m)
+    if packed_rev and packed_rev[0].role == "system":
+        packed = [packed_rev[0]] + list(reversed(packed_rev[1:]))
+    else:
+        packed = list(reversed(packed_rev))
+    return PackResult(packed=packed, dropped=dropped, final_chars=size_chars(packed))
+
+
+def _reference_priority_first(msgs: list[Message], budget: Budget) -> PackResult:
+    n = len(msgs)
+    idx_system0 = next((i for i, m in enumerate(msgs) if m.role == "system"), None)
+    user_idxs = [i for i, m in enumerate(msgs) if m.role == "user"]
+    selected: list[int] = []
+
+    def try_add(i: int) -> None:
+        if i in selected:
+            return
+        if size_chars([msgs[j] for j in selected] + [msgs[i]]) <= budget.max_chars:
+            selected.append(i)
+
+    if idx_system0 is not None:
+        try_add(idx_system0)
+    for i in [i for i, m in enumerate(msgs) if m.role == "developer"]:
+        try_add(i)
+    if user_idxs:
+        try_add(max(user_idxs))
+    for i in [i for i, m in enumerate(msgs) if m.role == "tool"]:
+        try_add(i)
+    for i in sorted((i for i in range(n) if i not in selected), reverse=True):
+        if i != idx_system0:
+            try_add(i)
+
+    packed = [msgs[i] for i in sorted(selected)]
+    dropped = [msgs[i] for i in range(n) if i not in selected]
+    return PackResult(packed=packed, dropped=dropped, final_chars=size_chars(packed))
+
+
+def _random_history(rng: random.Random, n: int) -> list[Message]:
+    roles = ["system", "developer", "user", "assistant", "tool"]
+    return [
+        Message(role=rng.choice(roles), content=f"{i}:" + "x" * rng.randint(0, 60))
+        for i in range(n)
+    ]
+
+
+def test_linear_packers_match_reference_policies() -> None:
+    rng = random.Random(1234)
+    for _ in range(300):
+        msgs = _random_history(rng, rng.randint(0, 30))
+        budget = Budget(max_chars=rng.randint(0, 600))
+        assert pack_recency_first(msgs, budget) == _reference_recency_first(msgs, budget)
+        assert pack_priority_first(msgs, budget) == _reference_priority_first(msgs, budget)
+
+
+def test_recency_first_keeps_oversized_system_message() -> None:
+    msgs = [
+        Message(role="system", content="S" * 50),
+        Message(role="user", content="u"),
+    ]
+    result = pack_recency_first(msgs, Budget(max_chars=10))
+    assert [m.content for m in result.packed] == ["S" * 50]
+    assert result.final_chars == 50
+
+
+class _CountingTokenizer:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def count(self, text: str) -> int:
+        self.calls += 1
+        return len(text.split())
+
+
+def test_token_budget_packs_by_tokens_and_memoizes_counts() -> None:
+    tokenizer = _CountingTokenizer()
+    budget = Budget.tokens(6, tokenizer=tokenizer)
+    msgs = [
+        Message(role="system", content="be brief"),
+        Message(role="user", content="one two three four"),
+        Message(role="assistant", content="a b c d e f g h i j"),
+        Message(role="user", content="five six"),
+    ]
+
+    for pack in (pack_priority_first, pack_recency_first, pack_priority_first):
+        result = pack(msgs, budget)
+        assert result.final_tokens is not None and result.final_tokens <= 6
+        assert result.final_chars == size_chars(result.packed)
+
+    # Each distinct message was tokenized exactly once across all pack attempts.
+    assert tokenizer.calls == len(msgs)
+
+
+def test_token_counter_memo_is_a_bounded_lru() -> None:
+    from context_engineering.context.tokens import TokenCounter
+
+    tokenizer = _CountingTokenizer()
+    counter = TokenCounter(tokenizer, max_entries=3, max_chars=20)
+    for text in ["a", "b", "c", "a", "d"]:
+        counter.count(text)
+    assert len(counter) == 3 and tokenizer.calls == 4
+    counter.count("a")  # most recently used: still memoized
+    assert tokenizer.calls == 4
+    counter.count("b")  # evicted by "d"
+    assert tokenizer.calls == 5
+
+    counter.count("x" * 15)  # over max_chars with the rest: evicts the oldest
+    assert len(counter) <= 3 and counter._chars <= 20
+    counter.count("y" * 21)  # longer than max_chars: counted, not memoized
+    assert "y" * 21 not in counter._cache
+
+
+def test_budget_requires_exactly_one_limit() -> None:
+    with pytest.raises(ValueError):
+        Budget()
+    with pytest.raises(ValueError):
+        Budget(max_chars=10, max_tokens=10)
+
+
+def test_value_weighted_prefers_several_small_valuable_turns() -> None:
+    msgs = [
+        Message(role="system", content="S" * 10),
+        Message(role="assistant", content="a" * 20),
+        Message(role="tool", content="T" * 60),
+        Message(role="assistant", content="b" * 20),
+        Message(role="assistant", content="c" * 20),
+        Message(role="user", content="U" * 10),
+    ]
+    values = [0.0, 3.0, 5.0, 3.0, 3.0, 0.0]
+
+    result = pack_value_weighted(msgs, Budget(max_chars=80), values)
+
+    assert [m.content[0] for m in result.packed] == ["S", "a", "b", "c", "U"]
+    assert result.kept_value == 9.0
+    assert result.exact is True
+    assert result.value_upper_bound == result.kept_value
+
+
+def test_value_weighted_greedy_reports_bounded_gap() -> None:
+    rng = random.Random(3)
+    msgs = _random_history(rng, 500)
+    values = [rng.random() for _ in msgs]
+
+    result = pack_value_weighted(msgs, Budget(max_chars=5_000), values, exact_cells=0)
+
+    assert result.exact is False
+    assert result.final_chars <= 5_000
+    assert result.kept_value <= result.value_upper_bound
+    assert result.kept_value >= result.value_upper_bound / 2
+
+
+def test_knapsack_dp_matches_brute_force() -> None:
+    rng = random.Random(11)
+    for _ in range(100):
+        n = rng.randint(0, 8)
+        weights = [rng.randint(0, 12) for _ in range(n)]
+        values = [float(rng.randint(-2, 9)) for _ in range(n)]
+        capacity = rng.randint(0, 30)
+        best = max(
+            sum(values[i] for i in range(n) if mask >> i & 1)
+            for mask in range(1 << n)
+            if sum(weights[i] for i in range(n) if mask >> i & 1) <= capacity
+        )
+        solution = solve_knapsack(weights, values, capacity)
+        assert solution.exact
+        assert sum(weights[i] for i in solution.chosen) <= capacity
+        assert solution.value == max(best, 0.0)
+
+
+def test_knapsack_sparse_dp_is_exact_at_large_capacities() -> None:
+    rng = random.Random(12)
+    for _ in range(30):
+        n = rng.randint(1, 25)
+        weights = [rng.randint(0, 300) for _ in range(n)]
+        values = [float(rng.randint(-2, 40)) for _ in range(n)]
+        capacity = rng.randint(0, sum(weights))
+        table = solve_knapsack(weights, values, capacity, exact_cells=10**9)
+        sparse = solve_knapsack(weights, values, capacity, exact_cells=0)
+        assert sparse.exact
+        assert sum(weights[i] for i in sparse.chosen) <= capacity
+        assert sparse.value == sum(values[i] for i in sparse.chosen) == table.value
+
+    # 40 messages of ~1.6k chars at a 32k budget: exact, not greedy.
+    msgs = [Message(role="assistant", content="x" * rng.randint(200, 3000)) for _ in range(40)]
+    values = [rng.random() for _ in msgs]
+    budget = Budget(max_chars=32_000)
+    assert pack_value_weighted(msgs, budget, values).exact
+    assert not pack_value_weighted(msgs, budget, values, exact_items=0).exact
+
+
+def test_digest_fallback_packs_digests_instead_of_dropping(monkeypatch) -> None:
+    digested = []
+    real = packer.digest_message
+
+    def spy(message: Message, budget: Budget) -> Message:
+        digested.append(message)
+        return real(message, budget)
+
+    monkeypatch.setattr(packer, "digest_message", spy)
+    doc = "# Notes\n" + "".join(f"- point {i}\n" for i in range(40))
+    msgs = [Message(role="system", content="sys")]
+    msgs += [Message(role="assistant", content=f"{i}\n{doc}") for i in range(2000)]
+    msgs.append(Message(role="user", content="latest question"))
+
+    budget = Budget(max_chars=400)
+    result = pack_priority_with_digests(msgs, budget, digest_max=100)
+
+    assert result.final_chars <= 400
+    assert result.packed[0] is msgs[0] and result.packed[-1] is msgs[-1]
+    # Only the newest few candidates were digested, and every digest was packed.
+    assert 0 < len(digested) <= 4
+    assert result.digested == sorted(digested, key=msgs.index)
+    for m in result.packed[1:-1]:
+        assert m.meta["digest"]["digest_chars"] <= 100
+        assert m.content.startswith(("1999", "1998", "1997", "1996"))
+    assert len(result.packed) + len(result.dropped) == len(msgs)
+
+
+def test_digest_fallback_matches_priority_first_when_no_room() -> None:
+    rng = random.Random(7)
+    for _ in range(100):
+        msgs = _random_history(rng, rng.randint(0, 30))
+        budget = Budget(max_chars=rng.randint(0, 600))
+        result = pack_priority_with_digests(msgs, budget, digest_max=budget.max_chars + 1)
+        expected = pack_priority_first(msgs, budget)
+        assert (result.packed, result.dropped, result.digested) == (
+            expected.packed,
+            expected.dropped,
+            [],
+        )
+
+
+def test_digest_fallback_can_use_precomputed_ladders() -> None:
+    from context_engineering.context.ladder import digest_ladder
+
+    rng = random.Random(11)
+    for _ in range(50):
+        msgs = _random_history(rng, rng.randint(0, 30))
+        ladders = [digest_ladder(m.content, max_chars=256) for m in msgs]
+        budget = Budget(max_chars=rng.randint(0, 600))
+        digest_max = rng.randint(1, 200)
+        result = pack_priority_with_digests(msgs, budget, digest_max=digest_max, ladders=ladders)
+        assert result == pack_priority_with_digests(msgs, budget, digest_max=digest_max)
+
+    # digest_max above the top cap of an incomplete ladder.
+    msgs = [Message(role="user", content="A long line of text. " * 40)]
+    ladders = [digest_ladder(msgs[0].content, min_chars=16, max_chars=64)]
+    assert not ladders[0].complete
+    budget = Budget(max_chars=200)
+    result = pack_priority_with_digests(msgs, budget, digest_max=150, ladders=ladders)
+    assert result == pack_priority_with_digests(msgs, budget, digest_max=150)
+    assert result.final_chars > 64
+
+
+def test_digest_fallback_fit_rungs_packs_largest_fitting_rung() -> None:
+    from context_engineering.context.ladder import digest_ladder
+
+    rng = random.Random(12)
+    for _ in range(50):
+        msgs = _random_history(rng, rng.randint(0, 30))
+        ladders = [digest_ladder(m.content, max_chars=256) for m in msgs]
+        budget = Budget(max_chars=rng.randint(0, 600))
+        digest_max = rng.randint(1, 200)
+        result = pack_priority_with_digests(
+            msgs, budget, digest_max=digest_max, ladders=ladders, fit_rungs=True
+        )
+        assert result.final_chars <= budget.max_chars
+        assert len(result.packed) + len(result.dropped) == len(msgs)
+        digests = [p for p in result.packed if p.meta and "digest" in p.meta]
+        assert len(digests) == len(result.digested)
+        for m, d in zip(result.digested, digests):
+            ladder = ladders[msgs.index(m)]
+            assert len(d.content) <= digest_max
+            assert d.content in {ladder.rung(i) for i in range(len(ladder))}
+
+    # Less than digest_max free still leaves room for a smaller rung.
+    msgs = [Message(role="user", content="- point\n" * 40)]
+    ladders = [digest_ladder(msgs[0].content, min_chars=8, max_chars=256)]
+    budget = Budget(max_chars=40)
+    assert pack_priority_with_digests(msgs, budget, digest_max=100).packed == []
+    result = pack_priority_with_digests(
+        msgs, budget, digest_max=100, ladders=ladders, fit_rungs=True
+    )
+    assert result.packed[0].content == ladders[0].fit(40)
+    assert result.digested == msgs
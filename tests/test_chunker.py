@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from context_engineering.context import chunker
+from context_engineering.context.chunker import chunk_file, chunk_files, chunk_text_stream
+
+
+def _doc(seed: int) -> str:
+    rng = random.Random(seed)
+    parts = []
+    for i in range(40):
+        parts.append(f"## Section {i}\n")
+        parts.append("".join(rng.choice("abc de\n") for _ in range(rng.randint(20, 400))) + "\n")
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("align_headings", [False, True])
+def test_chunks_cover_text_with_stable_offsets(align_headings: bool) -> None:
+    text = _doc(1)
+    rng = random.Random(2)
+    cuts = sorted(rng.sample(range(1, len(text)), 30))
+    pieces = [text[a:b] for a, b in zip([0, *cuts], [*cuts, len(text)])]
+
+    chunks = list(
+        chunk_text_stream(
+            pieces, source="doc", max_chars=300, overlap=40, align_headings=align_headings
+        )
+    )
+    whole = list(
+        chunk_text_stream(
+            [text], source="doc", max_chars=300, overlap=40, align_headings=align_headings
+        )
+    )
+    assert chunks == whole
+
+    covered = 0
+    for c in chunks:
+        offset = int(c.chunk_id.removeprefix("doc#"))
+        assert c.source == "doc" and 0 < len(c.text) <= 300
+        assert text[offset : offset + len(c.text)] == c.text
+        assert offset <= covered  # no gaps
+        covered = offset + len(c.text)
+    assert covered == len(text)
+
+    if align_headings:
+        # Each chunk ends right before a heading unless its second half has none.
+        for c in chunks[:-1]:
+            offset = int(c.chunk_id.removeprefix("doc#"))
+            at_heading = text.startswith("## ", offset + len(c.text))
+            assert at_heading or "\n## " not in c.text[150:]
+    with pytest.raises(ValueError):
+        list(chunk_text_stream([text], source="doc", max_chars=10, overlap=10))
+
+
+def test_chunk_files_matches_per_file_chunking(tmp_path) -> None:
+    paths = []
+    for i in range(3):
+        p = tmp_path / f"f{i}.md"
+        p.write_text(_doc(i).replace("\n", "\r\n", 5), encoding="utf-8", newline="")
+        paths.append(p)
+
+    expected = [c for p in paths for c in chunk_file(p, max_chars=500, overlap=50)]
+    assert expected[0].chunk_id == f"{paths[0]}#0"
+    with ThreadPoolExecutor(2) as pool:
+        got = list(chunk_files(paths, executor=pool, max_chars=500, overlap=50))
+    assert got == expected
+    assert list(chunk_files(paths, workers=1, max_chars=500, overlap=50)) == expected
+
+
+def test_chunk_files_resumes_files_in_bounded_parts(tmp_path, monkeypatch) -> None:
+    paths = []
+    for i in range(5):
+        p = tmp_path / f"f{i}.md"
+        p.write_text(_doc(i) + "é€" * 50, encoding="utf-8")
+        paths.append(p)
+    expected = [c for p in paths for c in chunk_file(p, max_chars=300, overlap=40)]
+
+    # Parts of two 97-char reads, so every file takes many tasks.
+    monkeypatch.setattr(chunker, "_READ", 97)
+    monkeypatch.setattr(chunker, "_PART_READS", 2)
+    futures: list = []
+    peak = 0
+
+    class Counting(ThreadPoolExecutor):
+        def submit(self, fn, /, *args, **kwargs):  # type: ignore[override]
+            nonlocal peak
+            peak = max(peak, 1 + sum(not f.done() for f in futures))
+            futures.append(super().submit(fn, *args, **kwargs))
+            return futures[-1]
+
+    with Counting(2) as pool:
+        got = list(chunk_files(paths, executor=pool, workers=2, max_chars=300, overlap=40))
+    assert got == expected
+    assert peak <= 4  # one running part per file in flight, 2 * workers files
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import sys
+from types import MappingProxyType
+
+import pytest
+
+from context_engineering.context.budget import Budget
+from context_engineering.context.digest import digest_messages
+from context_engineering.context.packer import pack_priority_first
+from context_engineering.types import CompactMessage, Message
+
+
+def test_compact_message_is_slotted_interned_and_read_only() -> None:
+    role = b"user".decode()  # built at runtime, so not interned already
+    m = CompactMessage(role=role, content="hello", meta={"k": 1})
+
+    assert not hasattr(m, "__dict__")
+    assert m.role is sys.intern("user")
+    assert m.length == 5
+    assert m.meta == {"k": 1}
+    with pytest.raises(TypeError):
+        m.meta["k"] = 2  # type: ignore[index]
+
+    shared = MappingProxyType({"source": "import"})
+    a = CompactMessage(role="tool", content="a", meta=shared)
+    b = CompactMessage(role="tool", content="b", meta=shared)
+    assert a.meta is b.meta is shared
+
+
+def test_compact_messages_pack_and_digest_like_messages() -> None:
+    rows = [
+        ("system", "rules"),
+        ("user", "# Q\n" + "- detail\n" * 30),
+        ("assistant", "answer " * 20),
+        ("user", "follow up"),
+    ]
+    plain = [Message(role=r, content=c) for r, c in rows]
+    compact = [CompactMessage(role=r, content=c) for r, c in rows]
+    budget = Budget(max_chars=150)
+
+    a, b = pack_priority_first(plain, budget), pack_priority_first(compact, budget)
+    assert [m.content for m in a.packed] == [m.content for m in b.packed]
+    assert a.final_chars == b.final_chars
+
+    digested = digest_messages(compact, max_chars_per_message=60)
+    assert all(type(m) is CompactMessage for m in digested)
+    assert digested[1].meta["digest"]["digest_chars"] <= 60
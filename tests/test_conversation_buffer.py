@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from context_engineering.context.budget import Budget, size_chars
+from context_engineering.context.buffer import ConversationBuffer
+from context_engineering.context.inspector import compute_stats
+from context_engineering.context.packer import pack_priority_first, pack_recency_first
+from context_engineering.types import Message
+
+ROLES = ["system", "developer", "user", "assistant", "tool"]
+
+
+def _history(rng: random.Random, n: int) -> list[Message]:
+    return [
+        Message(
+            role=rng.choice(ROLES),
+            content=f"{i}:" + rng.choice("xé🙂 ") * rng.randint(0, 60),
+            name="fn" if i % 7 == 0 else None,
+            meta={"turn": i} if i % 5 == 0 else None,
+        )
+        for i in range(n)
+    ]
+
+
+def _plain(messages) -> list[Message]:
+    return [Message(role=m.role, content=m.content, name=m.name, meta=m.meta) for m in messages]
+
+
+def test_buffer_round_trips_through_a_memory_mapped_file(tmp_path) -> None:
+    msgs = _history(random.Random(3), 200) + [Message(role="critic", content="odd role")]  # type: ignore[arg-type]
+    buf = ConversationBuffer(msgs)
+    path = tmp_path / "session.cebuf"
+    buf.save(path)
+
+    with ConversationBuffer.open(path) as opened:
+        for b in (buf, opened):
+            assert len(b) == len(msgs)
+            assert _plain(b) == msgs
+            assert b[-1].role == "critic"
+            assert bytes(b.content_bytes(3)) == msgs[3].content.encode("utf-8")
+            assert [v.length for v in b] == [len(m.content) for m in msgs]
+            assert size_chars(b) == size_chars(msgs)
+            assert compute_stats(b) == compute_stats(msgs)
+        with pytest.raises(TypeError):
+            opened.append("user", "more")
+
+
+@pytest.mark.parametrize("pack", [pack_priority_first, pack_recency_first])
+def test_packers_on_buffer_match_message_lists(tmp_path, pack) -> None:
+    rng = random.Random(11)
+    for trial in range(30):
+        msgs = _history(rng, rng.randint(0, 40))
+        buf = ConversationBuffer(msgs)
+        path = tmp_path / f"{trial}.cebuf"
+        buf.save(path)
+        with ConversationBuffer.open(path) as opened:
+            budgets = (Budget(max_chars=rng.randint(0, 600)), Budget.tokens(rng.randint(0, 80)))
+            for budget in budgets:
+                expected = pack(msgs, budget)
+                for b in (buf, opened):
+                    got = pack(b, budget)
+                    assert _plain(got.packed) == expected.packed
+                    assert _plain(got.dropped) == expected.dropped
+                    assert (got.final_chars, got.final_tokens) == (
+                        expected.final_chars,
+                        expected.final_tokens,
+                    )
+
+
+def test_buffer_arrays_feed_select_many() -> None:
+    pytest.importorskip("numpy")
+    from context_engineering.context.batch import select_many
+
+    msgs = _history(random.Random(5), 100)
+    buf = ConversationBuffer(msgs)
+    for policy, pack in (("priority", pack_priority_first), ("recency", pack_recency_first)):
+        sel = select_many(buf.char_lengths, buf.role_codes, [len(buf)], 500, policy=policy)
+        expected = pack(msgs, Budget(max_chars=500))
+        assert sorted(m.content for m, keep in zip(msgs, sel.accepted) if keep) == sorted(
+            m.content for m in expected.packed
+        )
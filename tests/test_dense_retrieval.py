@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from context_engineering.context.dense import DenseIndex, embed_texts
+from context_engineering.context.retrieval_bundle import RetrievedChunk
+
+np = pytest.importorskip("numpy")
+
+
+def test_dense_block_scan_matches_brute_force(tmp_path) -> None:
+    rng = random.Random(5)
+    words = [
+        "ramp",
+        "hotel",
+        "access",
+        "station",
+        "lift",
+        "stairs",
+        "quiet",
+        "route",
+        "map",
+        "café",
+        "entrance",
+    ]
+    chunks = [
+        RetrievedChunk(
+            chunk_id=f"doc{i}",
+            text=" ".join(rng.choices(words, k=rng.randint(2, 12))),
+            source=None if i % 4 == 0 else "kb",
+        )
+        for i in range(500)
+    ]
+    index = DenseIndex.build(iter(chunks), tmp_path / "dense")
+    queries = ["step-free hotel entrance", "Quiet   ROUTE", "lift", ""]
+
+    q = embed_texts(queries)
+    assert np.allclose(np.linalg.norm(q[:3], axis=1), 1.0) and not q[3].any()
+    expected = q @ embed_texts([c.text for c in chunks]).T
+    for block_rows in (7, 64, None):
+        rows, scores = index.top_k(queries, 5, block_rows=block_rows)
+        assert rows.shape == (4, 5)
+        for i in range(len(queries)):
+            best = np.sort(expected[i])[::-1][:5]
+            assert np.allclose(scores[i], best, atol=1e-5)
+            assert np.allclose(expected[i][rows[i]], scores[i], atol=1e-5)
+
+    reopened = DenseIndex(tmp_path / "dense")
+    hits = reopened.search(["lift"], k=3)[0]
+    assert [h.chunk_id for h in hits] == [f"doc{r}" for r in index.top_k(["lift"], 3)[0][0]]
+    assert hits[0] == chunks[int(index.top_k(["lift"], 1)[0][0, 0])]
+
+
+def test_dense_top_k_ties_break_by_row(tmp_path) -> None:
+    rng = random.Random(6)
+    texts = ["ramp hotel", "hotel lift", "ramp", "lift lift stairs"]
+    chunks = [RetrievedChunk(chunk_id=f"doc{i}", text=rng.choice(texts)) for i in range(300)]
+    index = DenseIndex.build(iter(chunks), tmp_path / "dense")
+    queries = ["ramp", "hotel lift", "stairs"]
+
+    for block_rows in (7, 64, None):
+        all_rows, all_scores = index.top_k(queries, len(chunks), block_rows=block_rows)
+        for k in (1, 5, 37, 120):
+            rows, scores = index.top_k(queries, k, block_rows=block_rows)
+            assert rows.tolist() == all_rows[:, :k].tolist()
+            assert scores.tolist() == all_scores[:, :k].tolist()
@@ -1,6 +1,16 @@
 from __future__ import annotations
 
-from context_engineering.context.digest import digest_text_deterministic
+import random
+import re
+
+from context_engineering.context.budget import Budget
+from context_engineering.context.digest import (
+    digest_file,
+    digest_messages,
+    digest_stream,
+    digest_text_deterministic,
+)
+from context_engineering.types import Message
 
 
 def test_digest_respects_max_chars() -> None:
@@ -28,3 +38,133 @@ def test_digest_truncates_with_ellipsis_when_needed() -> None:
     d = digest_text_deterministic(text, max_chars=80)
     assert d.text.endswith("…")
     assert len(d.text) <= 80
+
+
+def test_digest_messages_fits_token_budget() -> None:
+    budget = Budget.tokens(12)
+    msgs = [Message(role="tool", content="# Results\n" + ("- result line here\n" * 40))]
+    out = digest_messages(msgs, budget_per_message=budget)
+
+    assert budget.measure(out[0].content) <= 12
+    assert out[0].meta["digest"]["digest_tokens"] <= 12
+    assert out[0].content.endswith("…")
+
+
+_heading = re.compile(r"^\s{0,3}#{1,6}\s+.+")
+_bullet = re.compile(r"^\s{0,8}([-*]|\d+\.)\s+.+")
+
+
+def _reference_digest(text: str, max_chars: int) -> tuple[str, int]:
+    """The original list-based (quadratic) digest, kept as the output spec."""
+
+    lines = [ln.rstrip() for ln in text.splitlines()]
+    keep = [ln for ln in lines if ln.strip()][:6]
+    for ln in lines:
+        if (_heading.match(ln) or _bullet.match(ln)) and ln not in keep:
+            keep.append(ln)
+    out = "\n".join(keep).strip()
+    if len(text) > len(out) and max_chars > 0:
+        if len(out) >= max_chars:
+            out = out[: max(0, max_chars - 1)].rstrip() + "…"
+        elif not out.endswith("…"):
+            if len(out) + 1 <= max_chars:
+                out = out + "…"
+            else:
+                out = out[: max(0, max_chars - 1)].rstrip() + "…"
+    if len(out) > max_chars > 0:
+        out = out[: max(0, max_chars - 1)].rstrip() + "…"
+    elif max_chars == 0:
+        out = ""
+    return out, len(text)
+
+
+def test_streaming_digest_matches_reference_on_random_documents(tmp_path) -> None:
+    pieces = ["# H", "  - b", "* s", "1. n", "text", "", "   ", "x" * 30, "…", "- b", "é🙂"]
+    breaks = ["\n", "\r\n", "\r", "\x0b", "\x85", " ", "\t\n"]
+    rng = random.Random(9)
+    for trial in range(2000):
+        text = "".join(rng.choice(pieces) + rng.choice(breaks) for _ in range(rng.randint(0, 40)))
+        max_chars = rng.randint(-2, 200)
+        expected = _reference_digest(text, max_chars)
+
+        d = digest_text_deterministic(text, max_chars=max_chars)
+        assert (d.text, d.original_chars) == expected
+
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 6))))
+        chunks = [text[a:b] for a, b in zip([0, *cuts], [*cuts, len(text)])]
+        d = digest_stream(chunks, max_chars=max_chars)
+        assert (d.text, d.original_chars) == expected
+
+        if trial % 50 == 0:
+            path = tmp_path / f"{trial}.txt"
+            path.write_bytes(text.encode("utf-8"))
+            d = digest_file(path, max_chars=max_chars)
+            assert (d.text, d.original_chars) == expected
+
+
+def test_parallel_digest_matches_digest_messages() -> None:
+    from concurrent.futures import ProcessPoolExecutor
+
+    from context_engineering.context.bulk_digest import digest_messages_parallel
+
+    rng = random.Random(4)
+    msgs = [
+        Message(
+            role="tool",
+            content=f"# Out {i}\n" + "- row\n" * rng.randint(0, 30) + "x" * rng.randint(0, 300),
+            meta={"id": i},
+        )
+        for i in range(300)
+    ]
+    for kwargs in ({"max_chars_per_message": 90}, {"budget_per_message": Budget.tokens(20)}):
+        expected = digest_messages(msgs, **kwargs)
+        assert digest_messages_parallel(msgs, **kwargs) == expected  # small: in-process
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            got = digest_messages_parallel(
+                msgs, **kwargs, executor=pool, batch_size=37, min_parallel=0
+            )
+        assert got == expected
+
+
+def test_parallel_digest_workers_skip_the_digest_cache() -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    from context_engineering.context import digest
+    from context_engineering.context.bulk_digest import digest_messages_parallel
+    from context_engineering.context.cache import LRUCache
+
+    msgs = [Message(role="tool", content=f"# Out {i}\n" + "- row\n" * i) for i in range(50)]
+    cache = LRUCache()
+    digest.set_digest_cache(cache)
+    try:
+        for kwargs in ({"max_chars_per_message": 40}, {"budget_per_message": Budget.tokens(8)}):
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                got = digest_messages_parallel(msgs, **kwargs, executor=pool, min_parallel=0)
+            assert len(cache) == 0
+            digest.set_digest_cache(None)
+            assert got == digest_messages(msgs, **kwargs)
+            digest.set_digest_cache(cache)
+    finally:
+        digest.set_digest_cache(None)
+
+
+def test_digest_ladder_matches_direct_digests() -> None:
+    from context_engineering.context.ladder import DigestLadder, digest_ladder
+
+    pieces = ["# H\n", "- b\n", "plain\n", "  \n", "x" * 50 + "\n", "1. n…\n", "   - i\n"]
+    # Whitespace trimmed at the cut leaves runs of equal-length rungs.
+    pieces += [" " * 40 + "y\n", "a" + " " * 30 + "b\n", "p " * 20 + "\n"]
+    rng = random.Random(13)
+    for _ in range(500):
+        text = "".join(rng.choices(pieces, k=rng.randint(0, 60)))
+        ladder = digest_ladder(text, min_chars=rng.choice([1, 3, 8]), max_chars=rng.randint(8, 300))
+        top = ladder.caps[-1]
+        for i, cap in enumerate(ladder.caps):
+            assert ladder.rung(i) == digest_text_deterministic(text, max_chars=cap).text
+        for cap in range(top + 1):
+            assert ladder.digest(cap) == digest_text_deterministic(text, max_chars=cap)
+        for room in range(top + 2):
+            fitting = [i for i in range(len(ladder)) if len(ladder.rung(i)) <= room]
+            assert ladder.fit_index(room) == (fitting[-1] if fitting else None)
+        assert DigestLadder.loads(ladder.dumps()) == ladder
+        assert digest_ladder(text, min_chars=ladder.min_chars, max_chars=top) == ladder
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from context_engineering.context.budget import Budget
+from context_engineering.context.digest import digest_messages
+from context_engineering.context.extractive import digest_text_extractive
+from context_engineering.types import Message
+
+pytest.importorskip("numpy")
+
+SEARCH_RESULTS = (
+    "## Search Results\n"
+    "1. Hotel A - accessible\n"
+    "2. Hotel B - accessible\n" + ("filler result\n" * 60) + "3. Hotel C - step-free entrance\n"
+)
+
+
+def test_extractive_skips_repeated_filler_and_keeps_order() -> None:
+    d = digest_text_extractive(SEARCH_RESULTS, max_chars=120)
+    lines = d.text.removesuffix("…").splitlines()
+
+    assert d.digest_chars <= 120 and d.text.endswith("…")
+    assert lines.count("filler result") <= 1
+    assert "3. Hotel C - step-free entrance" in lines
+    assert lines == sorted(lines, key=SEARCH_RESULTS.index)
+
+
+def test_extractive_respects_budget_and_is_deterministic() -> None:
+    rng = random.Random(2)
+    words = ["alpha", "beta", "gamma", "délta", "eps", "zeta", "eta", "theta"]
+    for _ in range(200):
+        text = "\n".join(
+            rng.choice(["# ", "- ", "", "  "])
+            + ". ".join(" ".join(rng.choices(words, k=rng.randint(1, 6))) for _ in range(2))
+            for _ in range(rng.randint(0, 40))
+        )
+        max_chars = rng.randint(0, 300)
+        d = digest_text_extractive(text, max_chars=max_chars)
+        assert d.digest_chars == len(d.text) <= max_chars
+        assert d.original_chars == len(text)
+        assert digest_text_extractive(text, max_chars=max_chars) == d
+
+    assert digest_text_extractive("a\n\nb c. Dd e", max_chars=-1).text == "a\nb c. Dd e"
+
+
+def test_digest_messages_can_use_extractive_with_token_budgets() -> None:
+    msgs = [Message(role="tool", content=SEARCH_RESULTS)]
+    budget = Budget.tokens(20)
+    out = digest_messages(msgs, budget_per_message=budget, algorithm="extractive")
+    assert out[0].meta["digest"]["digest_tokens"] <= 20
+    assert "filler result\nfiller result" not in out[0].content
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from context_engineering.context.budget import Budget
+from context_engineering.context.packer import pack_priority_first, pack_recency_first
+from context_engineering.context.session_packer import SessionPacker
+from context_engineering.types import Message
+
+ROLES = ["system", "developer", "user", "assistant", "tool"]
+
+
+@pytest.mark.parametrize("policy", ["priority", "recency"])
+def test_session_packer_matches_full_repack_on_random_appends(policy: str) -> None:
+    full = pack_priority_first if policy == "priority" else pack_recency_first
+    rng = random.Random(7)
+    for _ in range(60):
+        budget = Budget(max_chars=rng.randint(0, 800))
+        session = SessionPacker(budget, policy=policy)
+        history: list[Message] = []
+        for turn in range(rng.randint(1, 25)):
+            batch = [
+                Message(role=rng.choice(ROLES), content=f"{turn}:" + "x" * rng.randint(0, 90))
+                for _ in range(rng.randint(1, 3))
+            ]
+            history.extend(batch)
+            assert session.extend(batch) == full(history, budget)
+
+
+def test_session_packer_tracks_latest_user_message() -> None:
+    session = SessionPacker(Budget(max_chars=10))
+    session.append(Message(role="user", content="old"))
+    session.append(Message(role="assistant", content="A" * 8))
+    result = session.append(Message(role="user", content="new"))
+
+    assert [m.content for m in result.packed] == ["old", "new"]
+    assert [m.content for m in result.dropped] == ["A" * 8]
+
+
+def test_session_packer_rejects_unknown_policy() -> None:
+    with pytest.raises(ValueError):
+        SessionPacker(Budget(max_chars=10), policy="fifo")  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize("policy", ["priority", "recency"])
+def test_session_packer_dropped_view_indexes_like_a_list(policy: str) -> None:
+    rng = random.Random(3)
+    session = SessionPacker(Budget(max_chars=300), policy=policy)
+    for turn in range(200):
+        session.append(Message(role=rng.choice(ROLES), content="x" * rng.randint(0, 60)))
+    result = session.pack()
+    dropped = list(result.dropped)
+
+    assert len(result.dropped) == len(dropped)
+    assert [result.dropped[i] for i in range(-len(dropped), len(dropped))] == dropped * 2
+    assert result.dropped[3:40:7] == dropped[3:40:7]
+    with pytest.raises(IndexError):
+        result.dropped[len(dropped)]
+
+    # Earlier results keep describing the history as it was.
+    session.append(Message(role="user", content="y" * 250))
+    assert list(result.dropped) == dropped
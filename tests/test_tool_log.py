@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from context_engineering.context.budget import Budget
 from context_engineering.context.tool_log import ToolEvent, redact_secrets, render_tool_transcript
 
 
@@ -31,3 +32,133 @@ def test_render_transcript_prefers_newest_events() -> None:
     assert "tool=new" in out
     # Under a tight budget, the older big output should be dropped.
     assert "tool=old" not in out
+
+
+def test_render_transcript_respects_token_budget() -> None:
+    events = [
+        ToolEvent(tool_name=f"t{i}", tool_input="query " * 10, tool_output="row " * 50)
+        for i in range(5)
+    ]
+    budget = Budget.tokens(60)
+
+    out = render_tool_transcript(events, budget=budget)
+    assert budget.measure(out) <= 60
+    assert "tool=t4" in out
+
+
+def test_tool_log_renders_like_render_tool_transcript() -> None:
+    from datetime import datetime
+
+    from context_engineering.context.tool_log import ToolLog
+
+    events = [
+        ToolEvent(
+            tool_name=f"t{i}",
+            tool_input=f"query {i} token=abc{i}",
+            tool_output="row " * (i % 7 * 10),
+            created_at=datetime(2024, 1, 1, 12, i) if i % 2 else None,
+        )
+        for i in range(40)
+    ]
+    log = ToolLog(max_events=25)
+    log.extend(events)
+    assert len(log) == 25 and log.events == events[-25:]
+    for max_chars in (0, 60, 120, 400, 2_000, 100_000):
+        assert log.render(max_chars=max_chars) == render_tool_transcript(
+            events[-25:], max_chars=max_chars
+        )
+    budget = Budget.tokens(80)
+    assert log.render(budget=budget) == render_tool_transcript(events[-25:], budget=budget)
+
+    small = ToolLog(max_bytes=300)
+    small.extend(events)
+    assert small.bytes <= 300 or len(small) == 1
+    assert small.events == events[-len(small) :]
+    assert "abc39" not in small.render(max_chars=1_000)
+
+
+def test_tool_log_renders_do_not_grow_the_token_memo() -> None:
+    from context_engineering.context.tool_log import ToolLog
+
+    budget = Budget.tokens(200)
+    log = ToolLog(max_events=5)
+    for i in range(200):
+        log.append(ToolEvent(tool_name="t", tool_input=f"q{i}", tool_output="row " * 20))
+        log.render(budget=budget)
+    assert len(budget.counter) <= 2  # header and footer
+    assert len(log._tokens) <= 5
+
+
+def test_single_pass_redaction_matches_sequential_and_streams() -> None:
+    import random
+    import re
+
+    from context_engineering.context.tool_log import (
+        _REDACTIONS,
+        RedactionReport,
+        Redactor,
+        redact_secrets_report,
+        redact_secrets_stream,
+    )
+
+    def sequential(text: str) -> str:
+        for label, pat in _REDACTIONS:
+            text = pat.sub(f"<{label}_REDACTED>", text)
+        return text
+
+    rng = random.Random(7)
+    parts = [
+        "log line ok\n",
+        "sk-ABCDEFGHIJKLMNOP ",
+        "token = abc123 ",
+        "Password:hunter2\n",
+        "api  key: k-1 ",
+        "tokens are fine ",
+        "x" * 50 + " ",
+        "secret=sk-QWERTYUIOPASDF\n",
+    ]
+    text = "".join(rng.choice(parts) for _ in range(400))
+
+    redacted, report = redact_secrets_report(text)
+    assert redacted == sequential(text) == redact_secrets(text)
+    assert sum(report.counts.values()) == len(report.matches) > 0
+    for m in report.matches:
+        assert re.fullmatch(dict(_REDACTIONS)[m.label], text[m.start : m.end])
+
+    for _ in range(5):
+        cuts = sorted(rng.sample(range(1, len(text)), 60))
+        chunks = [text[a:b] for a, b in zip([0, *cuts], [*cuts, len(text)])]
+        streamed = RedactionReport()
+        assert "".join(redact_secrets_stream(chunks, report=streamed, hold=64)) == redacted
+        assert streamed == report
+
+    # Rules that cannot share one alternation (backreferences) take the
+    # fallback path, with the same results as the combined pattern.
+    fallback = Redactor([("RUN", re.compile(r"(x)\1{3,}")), *_REDACTIONS])
+    combined = Redactor([("RUN", re.compile(r"x{4,}")), *_REDACTIONS])
+    assert fallback._combined is None and combined._combined is not None
+    assert fallback.redact_report(text) == combined.redact_report(text)
+    assert "<RUN_REDACTED>" in fallback.redact(text)
+
+
+def test_redactor_first_char_gate_keeps_every_match() -> None:
+    import re
+
+    from context_engineering.context.tool_log import Redactor
+
+    rules = [
+        ("A", re.compile(r"\b(?:foo)?bar")),
+        ("B", re.compile(r"[x-z]+Q|(?i:é)t", re.IGNORECASE)),
+        ("C", re.compile(r"(?=k)k\d+")),
+    ]
+    redactor = Redactor(rules)
+    assert redactor._combined is not None
+    assert redactor._combined.pattern.startswith("(?=(?i:[")
+    text = "foobar bar xyzq ÉT Ét k12 bark kk zQ"
+    plain = re.compile("|".join(f"({p.pattern})" for _, p in rules), re.IGNORECASE)
+    # Same matches as the ungated alternation (every rule here tolerates re.I).
+    assert [(m.start, m.end) for m in redactor.redact_report(text)[1].matches] == [
+        m.span() for m in plain.finditer(text)
+    ]
+    # "\w" cannot be listed as first chars: no gate, same results.
+    assert not Redactor([("W", re.compile(r"\w+@x"))])._combined.pattern.startswith("(?=")
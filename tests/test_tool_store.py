@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import time
+from datetime import UTC, datetime, timedelta, timezone
+
+import pytest
+
+from context_engineering.context.tool_log import ToolEvent, render_tool_transcript
+from context_engineering.context.tool_store import ToolEventStore
+
+T0 = datetime(2024, 5, 1, 9, 0, 0)
+
+
+def _events(n: int) -> list[ToolEvent]:
+    return [
+        ToolEvent(
+            tool_name=f"t{i}",
+            tool_input=f"q{i} é",
+            tool_output="row\n" * (i % 5),
+            created_at=None if i % 10 == 3 else T0 + timedelta(minutes=i),
+        )
+        for i in range(n)
+    ]
+
+
+def test_store_newest_and_time_range_queries(tmp_path) -> None:
+    events = _events(300)
+    with ToolEventStore(tmp_path / "store") as store:
+        store.extend(events[:200])
+        assert store.newest(5) == events[195:200]  # reads see buffered appends
+        store.extend(events[200:])
+        assert len(store) == 300
+        for n in (0, 1, 63, 64, 65, 299, 300, 500):
+            assert store.newest(n) == events[max(0, 300 - n) :]
+
+        start, end = T0 + timedelta(minutes=70), T0 + timedelta(minutes=140)
+        expected = [e for e in events if e.created_at and start <= e.created_at < end]
+        assert store.between(start, end) == expected and len(expected) == 63
+
+    reopened = ToolEventStore(tmp_path / "store")
+    assert reopened.newest(300) == events
+    assert render_tool_transcript(reopened.newest(20), max_chars=500) == render_tool_transcript(
+        events, max_chars=500
+    )
+    reopened.close()
+
+
+def test_store_recovers_from_torn_writes(tmp_path) -> None:
+    path = tmp_path / "store"
+    events = _events(150)
+    with ToolEventStore(path) as store:
+        store.extend(events)
+    # A half-written record, and the index entry of the second block lost.
+    with open(path / "events.log", "ab") as f:
+        f.write(b"\x40\x00\x00\x00partial")
+    idx = (path / "events.idx").read_bytes()
+    (path / "events.idx").write_bytes(idx[: len(idx) // 2])
+
+    with ToolEventStore(path) as store:
+        assert len(store) == 150 and store.newest(150) == events
+        assert (path / "events.idx").read_bytes() == idx
+        store.append(events[0])
+        assert store.newest(2) == [events[-1], events[0]]
+
+
+def test_store_drops_index_entries_past_the_log(tmp_path) -> None:
+    path = tmp_path / "store"
+    events = _events(200)
+    with ToolEventStore(path) as store:
+        store.extend(events)
+    # The index reached disk, the last records of the log did not.
+    with ToolEventStore(path) as store:
+        third_block = store._offsets[2]
+    log = (path / "events.log").read_bytes()
+    (path / "events.log").write_bytes(log[: third_block + 10])
+
+    with ToolEventStore(path) as store:
+        assert len(store) == 128 and store.newest(200) == events[:128]
+        store.extend(events[128:])
+        assert store.newest(200) == events
+
+
+def test_store_time_ranges_ignore_the_local_time_zone(tmp_path, monkeypatch) -> None:
+    if not hasattr(time, "tzset"):
+        pytest.skip("needs time.tzset")
+    # 02:00-03:00 local time did not exist on 2024-03-10 in New York.
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    try:
+        gap = datetime(2024, 3, 10, 2, 50)
+        events = [
+            ToolEvent(tool_name=f"t{i}", tool_input="", tool_output="", created_at=at)
+            for i, at in enumerate([gap, datetime(2024, 3, 10, 3, 30)])
+        ]
+        with ToolEventStore(tmp_path / "store") as store:
+            store.extend(events)
+            assert store.between(datetime(2024, 3, 10, 2, 45), datetime(2024, 3, 10, 3)) == [
+                events[0]
+            ]
+            assert store.between(datetime(2024, 3, 10, 3), datetime(2024, 3, 10, 4)) == [
+                events[1]
+            ]
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_store_rejects_mixing_naive_and_aware_times(tmp_path) -> None:
+    aware = T0.replace(tzinfo=UTC)
+    path = tmp_path / "store"
+    with ToolEventStore(path) as store:
+        store.append(ToolEvent(tool_name="t", tool_input="", tool_output="", created_at=None))
+        store.append(ToolEvent(tool_name="t", tool_input="", tool_output="", created_at=T0))
+        with pytest.raises(TypeError):
+            store.append(ToolEvent(tool_name="t", tool_input="", tool_output="", created_at=aware))
+        with pytest.raises(TypeError):
+            store.between(aware, aware + timedelta(hours=1))
+        with pytest.raises(TypeError):
+            store.between(T0, aware)
+
+    # Awareness is read back from the log on reopen.
+    with ToolEventStore(path) as store:
+        with pytest.raises(TypeError):
+            store.between(aware, aware + timedelta(hours=1))
+        assert len(store.between(T0, T0 + timedelta(hours=1))) == 1
+
+    with ToolEventStore(tmp_path / "aware") as store:
+        store.append(ToolEvent(tool_name="t", tool_input="", tool_output="", created_at=aware))
+        local = aware.astimezone(timezone(timedelta(hours=-5)))
+        assert len(store.between(local, local + timedelta(seconds=1))) == 1
+        with pytest.raises(TypeError):
+            store.between(T0, T0 + timedelta(hours=1))